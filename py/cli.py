@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Command line tools for DCI icons
+
+Usage:
+    python py/cli.py build SOURCE_DIR OUTPUT_DIR [--format webp] [--scales 1,1.25,1.5,2] [--workers 0]
+    python py/cli.py unpack ICON.dci|THEME_DIR OUTPUT_DIR [--force] [--workers 0]
+    python py/cli.py pack TREE_DIR ICON.dci | THEME_TREE_DIR OUTPUT_DIR [--workers 0]
+    python py/cli.py optimize ICON.dci|THEME_DIR [--output PATH] [--dry-run] [--workers 0]
+
+build converts a tree of PNG files into DCI icons without ComfyUI. Each source
+file is mapped to an icon and a variant by its name, by default
+``<name>[_<size>][.<state>][.<tone>][@<scale>x].png``, for example
+``edit_16.hover.dark@2x.png``. All files with the same name in one directory
+go into ``OUTPUT_DIR/<directory>/<name>.dci``. Without a size in the name the
+source width is used, and without a scale the icon is built at every scale of
+--scales. Icons whose sources and settings did not change since the last
+build are skipped.
+
+unpack extracts a DCI file into its ``size/state.tone/scale/layer`` tree, with
+links as symlinks, and pack turns such a tree back into the same DCI bytes.
+Given a directory, unpack extracts every ``*.dci`` file below it to a
+directory of the same relative name, and pack packs every ``*.dci`` directory
+below its source into a file of the same relative name.
+
+optimize losslessly shrinks DCI files in place (or into --output): PNG and
+lossless WebP layers are recompressed, duplicate layers become links and
+entries are put in natural order, and every layer is checked to show the
+same pixels before a file is written.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from PIL import Image
+
+try:
+    from .dci_format import DCIIconBuilder
+    from .dci_tree import unpack_dci, pack_dci
+    from .dci_optimizer import optimize_dci_file
+    from .utils.dir_scanner import scan_directory
+    from .utils.load_cache import DirectoryManifest
+except ImportError:
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    from dci_format import DCIIconBuilder
+    from dci_tree import unpack_dci, pack_dci
+    from dci_optimizer import optimize_dci_file
+    from utils.dir_scanner import scan_directory
+    from utils.load_cache import DirectoryManifest
+
+DEFAULT_NAME_PATTERN = (r"(?P<name>.+?)(?:[_-](?P<size>\d+))?"
+                        r"(?:\.(?P<state>normal|disabled|hover|pressed))?"
+                        r"(?:\.(?P<tone>universal|light|dark))?"
+                        r"(?:@(?P<scale>\d+(?:\.\d+)?)x)?\.png")
+
+BUILD_STATE_DIR = ".dci-build"
+BUILD_STATE_VERSION = 1
+
+
+def parse_scales(text):
+    """Parse a comma separated list of scale factors"""
+    scales = [float(value) for value in text.replace(";", ",").split(",") if value.strip()]
+    if not scales or any(scale <= 0 for scale in scales):
+        raise ValueError(f"Invalid scales: {text}")
+    return scales
+
+
+def map_sources(source_dir, source_files, name_pattern=DEFAULT_NAME_PATTERN, state="normal", tone="universal"):
+    """Group source files into icons by their names
+
+    Returns ({output relative path: [(path, size, state, tone, scale)]}, unmatched
+    paths). size and scale are None when the name does not contain them.
+    """
+    pattern = re.compile(name_pattern)
+    icons = {}
+    unmatched = []
+    for path in source_files:
+        relative_path = os.path.relpath(path, source_dir)
+        match = pattern.fullmatch(os.path.basename(path))
+        if not match or not match.group("name"):
+            unmatched.append(path)
+            continue
+
+        groups = match.groupdict()
+        output = os.path.join(os.path.dirname(relative_path), groups["name"] + ".dci")
+        icons.setdefault(output, []).append((
+            path,
+            int(groups["size"]) if groups.get("size") else None,
+            groups.get("state") or state,
+            groups.get("tone") or tone,
+            float(groups["scale"]) if groups.get("scale") else None,
+        ))
+    return icons, unmatched
+
+
+def build_icon(output_path, variants, options):
+    """Build one DCI file from its source variants
+
+    Runs in a worker process. Returns a dict with output, bytes, source_bytes,
+    layers, seconds and error.
+    """
+    start_time = time.perf_counter()
+    result = {"output": output_path, "bytes": 0, "source_bytes": 0, "layers": 0, "seconds": 0.0, "error": None}
+    try:
+        layers = []
+        sources = {}
+        for path, size, state, tone, scale in variants:
+            with Image.open(path) as image:
+                image.load()
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA')
+            result["source_bytes"] += os.path.getsize(path)
+
+            scales = [scale] if scale else options["scales"]
+            # Without a size in the name the source is taken as the 1x image of its scale
+            base_size = size or options["size"] or max(1, round(image.width / (scale or 1.0)))
+            for layer_scale in scales:
+                key = (base_size, state, tone, layer_scale)
+                if key in sources:
+                    raise ValueError(f"{os.path.basename(path)} and {os.path.basename(sources[key])} "
+                                     f"both map to {base_size}/{state}.{tone}/{layer_scale:g}")
+                sources[key] = path
+                layers.append((image, key))
+
+        builder = DCIIconBuilder()
+        for image, (base_size, state, tone, layer_scale) in layers:
+            if tone == 'universal':
+                # A universal layer fills the light tone and the dark one through a link,
+                # except for the tones that have a source of their own
+                tones = [layer_tone for layer_tone in ('light', 'dark')
+                         if (base_size, state, layer_tone, layer_scale) not in sources]
+                if not tones:
+                    continue
+                tone = tones[0] if len(tones) == 1 else 'universal'
+            builder.add_icon_image(image, base_size, state, tone, layer_scale, options["format"],
+                                   options["quality"], options["webp_lossless"],
+                                   options["webp_alpha_quality"], options["png_compress_level"])
+            result["layers"] += 1
+
+        data = builder.to_binary()
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path + ".tmp", 'wb') as f:
+            f.write(data)
+        os.replace(output_path + ".tmp", output_path)
+        result["bytes"] = len(data)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def run_jobs(function, jobs, workers):
+    """Run jobs on a process pool, or in this process for a single worker
+
+    Returns the results in job order. Falls back to sequential execution when
+    worker processes cannot be started.
+    """
+    workers = max(1, min(workers, len(jobs)))
+    if workers > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Batch small jobs so thousands of icons do not cost one round trip each
+                chunksize = max(1, len(jobs) // (workers * 8))
+                return list(executor.map(function, *zip(*jobs), chunksize=chunksize))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Process pool unavailable, running sequentially: {e}", file=sys.stderr)
+    return [function(*job) for job in jobs]
+
+
+class BuildState:
+    """Digest of the sources and settings of every built icon, kept in the output directory"""
+
+    def __init__(self, output_dir):
+        self.state_dir = os.path.join(output_dir, BUILD_STATE_DIR)
+        self.state_path = os.path.join(self.state_dir, "outputs.json")
+        self.outputs = {}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get("version") == BUILD_STATE_VERSION:
+                self.outputs = state.get("outputs", {})
+        except (OSError, ValueError):
+            pass
+
+    def save(self, outputs):
+        os.makedirs(self.state_dir, exist_ok=True)
+        with open(self.state_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"version": BUILD_STATE_VERSION, "outputs": outputs}, f, indent=1, sort_keys=True)
+        os.replace(self.state_path + ".tmp", self.state_path)
+
+
+def build(source_dir, output_dir, options, name_pattern=DEFAULT_NAME_PATTERN, file_filter="*.png",
+          workers=0, force=False, log=print):
+    """Convert the PNG files under source_dir into DCI icons under output_dir
+
+    Returns a stats dict with icons, built, skipped, failed, unmatched,
+    sources, source_bytes, output_bytes, layers and seconds.
+    """
+    start_time = time.perf_counter()
+    workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+    source_dir = os.path.abspath(source_dir)
+    output_dir = os.path.abspath(output_dir)
+
+    source_files, _ = scan_directory(source_dir, file_filter, workers=min(workers, 8))
+    icons, unmatched = map_sources(source_dir, source_files, name_pattern, options["state"], options["tone"])
+    for path in unmatched:
+        log(f"skipped {os.path.relpath(path, source_dir)}: name does not match the pattern")
+
+    # Sources are hashed only when their size or mtime changed since the last build
+    manifest = DirectoryManifest(os.path.join(output_dir, BUILD_STATE_DIR, "sources"), source_dir)
+    state = BuildState(output_dir)
+    settings = json.dumps([BUILD_STATE_VERSION, name_pattern, options], sort_keys=True)
+
+    digests = {}
+    outputs = {}
+    jobs = []
+    for output in sorted(icons):
+        variants = sorted(icons[output], key=lambda variant: variant[0])
+        digest = hashlib.sha256((settings + manifest.fingerprint([variant[0] for variant in variants]))
+                                .encode('utf-8')).hexdigest()
+        digests[output] = digest
+        output_path = os.path.join(output_dir, output)
+        if not force and state.outputs.get(output) == digest and os.path.exists(output_path):
+            outputs[output] = digest
+            continue
+        jobs.append((output_path, variants, options))
+    manifest.save()
+
+    stats = {"icons": len(icons), "built": 0, "skipped": len(icons) - len(jobs), "failed": 0,
+             "unmatched": len(unmatched), "sources": len(source_files), "source_bytes": 0,
+             "output_bytes": 0, "layers": 0, "seconds": 0.0}
+
+    for result in run_jobs(build_icon, jobs, workers):
+        output = os.path.relpath(result["output"], output_dir)
+        if result["error"]:
+            stats["failed"] += 1
+            log(f"failed {output}: {result['error']}")
+            continue
+        stats["built"] += 1
+        stats["source_bytes"] += result["source_bytes"]
+        stats["output_bytes"] += result["bytes"]
+        stats["layers"] += result["layers"]
+        outputs[output] = digests[output]
+
+    state.save(outputs)
+    stats["seconds"] = time.perf_counter() - start_time
+    return stats
+
+
+def format_build_stats(stats):
+    """One line summary with throughput"""
+    seconds = max(stats["seconds"], 1e-9)
+    mib = 1024 * 1024
+    return (f"{stats['icons']} icons from {stats['sources']} sources: {stats['built']} built, "
+            f"{stats['skipped']} unchanged, {stats['failed']} failed, {stats['unmatched']} unmatched; "
+            f"{stats['layers']} layers, {stats['source_bytes'] / mib:.1f} MiB in, "
+            f"{stats['output_bytes'] / mib:.1f} MiB out in {stats['seconds']:.2f}s "
+            f"({stats['built'] / seconds:.1f} icons/s, {stats['source_bytes'] / mib / seconds:.1f} MiB/s)")
+
+
+def build_command(args):
+    options = {
+        "format": args.format,
+        "quality": args.quality,
+        "webp_lossless": args.webp_lossless,
+        "webp_alpha_quality": args.webp_alpha_quality,
+        "png_compress_level": args.png_compress_level,
+        "scales": parse_scales(args.scales),
+        "size": args.size,
+        "state": args.state,
+        "tone": args.tone,
+    }
+    stats = build(args.source_dir, args.output_dir, options, args.pattern, args.filter, args.workers, args.force)
+    print(format_build_stats(stats))
+    return 1 if stats["failed"] else 0
+
+
+def tree_job(operation, source, target, replace=False):
+    """Unpack or pack one icon; runs in a worker process
+
+    Returns a dict with source, target, files, links, bytes, seconds and error.
+    """
+    start_time = time.perf_counter()
+    result = {"source": source, "target": target, "files": 0, "links": 0, "bytes": 0, "seconds": 0.0, "error": None}
+    try:
+        if operation == "unpack":
+            stats = unpack_dci(source, target, replace)
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(target)), exist_ok=True)
+            stats = pack_dci(source, target)
+        result.update(files=stats["files"], links=stats["links"], bytes=stats["bytes"])
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def find_icon_trees(directory):
+    """Find the unpacked icon trees (directories named *.dci) below directory"""
+    trees = []
+    for root, dirs, _ in os.walk(directory):
+        dirs.sort()
+        for name in [name for name in dirs if name.endswith(".dci")]:
+            trees.append(os.path.join(root, name))
+            # An icon tree holds no further icons
+            dirs.remove(name)
+    return trees
+
+
+def run_tree_jobs(operation, pairs, workers=0, replace=False, log=print):
+    """Unpack or pack (source, target) pairs on a process pool
+
+    Returns a stats dict with icons, done, failed, files, links, bytes and seconds.
+    """
+    start_time = time.perf_counter()
+    workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+    jobs = [(operation, source, target, replace) for source, target in pairs]
+
+    stats = {"icons": len(jobs), "done": 0, "failed": 0, "files": 0, "links": 0, "bytes": 0, "seconds": 0.0}
+    for result in run_jobs(tree_job, jobs, workers):
+        if result["error"]:
+            stats["failed"] += 1
+            log(f"failed {result['source']}: {result['error']}")
+            continue
+        stats["done"] += 1
+        for key in ("files", "links", "bytes"):
+            stats[key] += result[key]
+    stats["seconds"] = time.perf_counter() - start_time
+    return stats
+
+
+def format_tree_stats(operation, stats):
+    """One line summary with throughput"""
+    seconds = max(stats["seconds"], 1e-9)
+    mib = 1024 * 1024
+    return (f"{operation} {stats['done']} of {stats['icons']} icons, {stats['failed']} failed; "
+            f"{stats['files']} files, {stats['links']} links, {stats['bytes'] / mib:.1f} MiB "
+            f"in {stats['seconds']:.2f}s ({stats['done'] / seconds:.1f} icons/s, "
+            f"{stats['bytes'] / mib / seconds:.1f} MiB/s)")
+
+
+def unpack_command(args):
+    if os.path.isdir(args.source):
+        dci_files, _ = scan_directory(args.source, "*.dci")
+        pairs = [(path, os.path.join(args.output, os.path.relpath(path, args.source))) for path in dci_files]
+    else:
+        pairs = [(args.source, args.output)]
+    stats = run_tree_jobs("unpack", pairs, args.workers, args.force)
+    print(format_tree_stats("unpacked", stats))
+    return 1 if stats["failed"] else 0
+
+
+def pack_command(args):
+    if args.output.endswith(".dci"):
+        pairs = [(args.source, args.output)]
+    else:
+        pairs = [(tree, os.path.join(args.output, os.path.relpath(tree, args.source)))
+                 for tree in find_icon_trees(args.source)]
+    stats = run_tree_jobs("pack", pairs, args.workers)
+    print(format_tree_stats("packed", stats))
+    return 1 if stats["failed"] else 0
+
+
+def optimize_job(source, target, dry_run=False):
+    """Optimize one DCI file; runs in a worker process"""
+    start_time = time.perf_counter()
+    try:
+        result = optimize_dci_file(source, target, dry_run)
+        result["error"] = None
+    except Exception as e:
+        result = {"original_bytes": 0, "optimized_bytes": 0, "recompressed": 0, "linked": 0, "written": False,
+                  "error": f"{type(e).__name__}: {e}"}
+    result.update(source=source, seconds=time.perf_counter() - start_time)
+    return result
+
+
+def optimize_files(pairs, workers=0, dry_run=False, log=print):
+    """Optimize (source, target) pairs on a process pool, logging the bytes saved per file
+
+    A target of None optimizes the source in place. Returns a stats dict with
+    files, written, failed, original_bytes, optimized_bytes, recompressed,
+    linked and seconds.
+    """
+    start_time = time.perf_counter()
+    workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+    jobs = [(source, target, dry_run) for source, target in pairs]
+
+    stats = {"files": len(jobs), "written": 0, "failed": 0, "original_bytes": 0, "optimized_bytes": 0,
+             "recompressed": 0, "linked": 0, "seconds": 0.0}
+    for result in run_jobs(optimize_job, jobs, workers):
+        if result["error"]:
+            stats["failed"] += 1
+            log(f"failed {result['source']}: {result['error']}")
+            continue
+        saved = result["original_bytes"] - result["optimized_bytes"]
+        log(f"{result['source']}: {result['original_bytes']} -> {result['optimized_bytes']} bytes, "
+            f"saved {saved} ({saved * 100.0 / max(result['original_bytes'], 1):.1f}%), "
+            f"{result['recompressed']} recompressed, {result['linked']} linked")
+        stats["written"] += 1 if result["written"] else 0
+        for key in ("original_bytes", "optimized_bytes", "recompressed", "linked"):
+            stats[key] += result[key]
+    stats["seconds"] = time.perf_counter() - start_time
+    return stats
+
+
+def optimize_command(args):
+    if os.path.isdir(args.source):
+        dci_files, _ = scan_directory(args.source, "*.dci")
+        pairs = [(path, os.path.join(args.output, os.path.relpath(path, args.source)) if args.output else None)
+                 for path in dci_files]
+    else:
+        pairs = [(args.source, args.output)]
+    stats = optimize_files(pairs, args.workers, args.dry_run)
+
+    saved = stats["original_bytes"] - stats["optimized_bytes"]
+    mib = 1024 * 1024
+    print(f"optimized {stats['files'] - stats['failed']} of {stats['files']} files, {stats['failed']} failed, "
+          f"{stats['written']} written; {stats['original_bytes'] / mib:.1f} MiB -> "
+          f"{stats['optimized_bytes'] / mib:.1f} MiB, saved {saved} bytes "
+          f"({saved * 100.0 / max(stats['original_bytes'], 1):.1f}%); {stats['recompressed']} layers recompressed, "
+          f"{stats['linked']} linked in {stats['seconds']:.2f}s")
+    return 1 if stats["failed"] else 0
+
+
+def create_parser():
+    parser = argparse.ArgumentParser(prog="dci", description="Command line tools for DCI icons")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="convert a tree of PNG files into DCI icons")
+    build_parser.add_argument("source_dir", help="directory with the source PNG files")
+    build_parser.add_argument("output_dir", help="directory for the DCI files")
+    build_parser.add_argument("--pattern", default=DEFAULT_NAME_PATTERN,
+                              help="regular expression for source file names with the groups name, size, state, "
+                                   "tone and scale")
+    build_parser.add_argument("--filter", default="*.png", help="source file filter (default: *.png)")
+    build_parser.add_argument("--format", choices=DCIIconBuilder.SUPPORTED_FORMATS, default="webp",
+                              help="layer image format")
+    build_parser.add_argument("--quality", type=int, default=90, help="webp/jpg quality 1-100")
+    build_parser.add_argument("--webp-lossless", action="store_true", help="use lossless webp")
+    build_parser.add_argument("--webp-alpha-quality", type=int, default=100, help="webp alpha quality 0-100")
+    build_parser.add_argument("--png-compress-level", type=int, default=6, help="png compression level 0-9")
+    build_parser.add_argument("--scales", default="1",
+                              help="comma separated scales for sources without a scale in their name")
+    build_parser.add_argument("--size", type=int, default=0,
+                              help="icon size for sources without a size in their name (0 = source width)")
+    build_parser.add_argument("--state", choices=DCIIconBuilder.ICON_STATES, default="normal",
+                              help="state for sources without a state in their name")
+    build_parser.add_argument("--tone", choices=DCIIconBuilder.TONE_TYPES, default="universal",
+                              help="tone for sources without a tone in their name")
+    build_parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = one per CPU core)")
+    build_parser.add_argument("--force", action="store_true", help="rebuild unchanged icons")
+    build_parser.set_defaults(handler=build_command)
+
+    unpack_parser = subparsers.add_parser("unpack", help="extract DCI files into directory trees")
+    unpack_parser.add_argument("source", help="a DCI file, or a directory to unpack every *.dci file below")
+    unpack_parser.add_argument("output", help="directory for the tree, or for one tree per DCI file")
+    unpack_parser.add_argument("--force", action="store_true", help="replace existing trees")
+    unpack_parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = one per CPU core)")
+    unpack_parser.set_defaults(handler=unpack_command)
+
+    pack_parser = subparsers.add_parser("pack", help="pack directory trees into DCI files")
+    pack_parser.add_argument("source", help="an unpacked tree, or a directory with *.dci trees below it")
+    pack_parser.add_argument("output", help="a .dci file, or a directory for one DCI file per tree")
+    pack_parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = one per CPU core)")
+    pack_parser.set_defaults(handler=pack_command)
+
+    optimize_parser = subparsers.add_parser("optimize", help="losslessly shrink DCI files")
+    optimize_parser.add_argument("source", help="a DCI file, or a directory to optimize every *.dci file below")
+    optimize_parser.add_argument("--output", help="write to this file or directory instead of in place")
+    optimize_parser.add_argument("--dry-run", action="store_true", help="report the savings without writing")
+    optimize_parser.add_argument("--workers", type=int, default=0, help="worker processes (0 = one per CPU core)")
+    optimize_parser.set_defaults(handler=optimize_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = create_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
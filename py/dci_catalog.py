@@ -0,0 +1,408 @@
+"""
+SQLite catalogue of the DCI icons in a directory tree or Debian package
+
+Every DCI file is recorded once in the icons table (source, relative path,
+size, mtime and content hash) and each of its layers in the layers table
+(icon size, state, tone, scale, layer parameters, payload hash and byte size).
+Links are stored with their target and the payload of the resolved file.
+
+Updates are incremental: files whose size and mtime match their row are not
+read, files with a changed mtime but the same content hash are not parsed
+again, and rows of files that disappeared are removed. A Debian package whose
+own size and mtime are unchanged is skipped without opening it. Parsing never
+decodes images, so coverage and size questions are answered from indexed
+tables instead of reparsing every DCI.
+"""
+
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .dci_reader import DCIReader
+    from .utils.dir_scanner import scan_directory
+    from .utils.file_utils import compile_file_filter
+    from .utils.ar_archive import ArArchive
+    from .utils.deb_reader import tar_stream_mode, tar_member_path, iter_tar_stream
+except ImportError:
+    from dci_reader import DCIReader
+    from utils.dir_scanner import scan_directory
+    from utils.file_utils import compile_file_filter
+    from utils.ar_archive import ArArchive
+    from utils.deb_reader import tar_stream_mode, tar_member_path, iter_tar_stream
+
+SCHEMA_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    file_filter TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    updated REAL
+);
+CREATE TABLE IF NOT EXISTS icons (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    path TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    valid INTEGER NOT NULL,
+    UNIQUE (source, path)
+);
+CREATE TABLE IF NOT EXISTS layers (
+    icon_id INTEGER NOT NULL REFERENCES icons(id) ON DELETE CASCADE,
+    icon_size INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    tone TEXT NOT NULL,
+    scale REAL NOT NULL,
+    layer TEXT NOT NULL,
+    priority INTEGER,
+    padding INTEGER,
+    palette INTEGER,
+    hue INTEGER,
+    saturation INTEGER,
+    brightness INTEGER,
+    red INTEGER,
+    green INTEGER,
+    blue INTEGER,
+    alpha INTEGER,
+    format TEXT,
+    alpha8 INTEGER,
+    is_link INTEGER NOT NULL,
+    link_target TEXT,
+    payload_sha256 TEXT,
+    payload_size INTEGER
+);
+CREATE INDEX IF NOT EXISTS layers_icon ON layers (icon_id, icon_size, state, tone, scale);
+CREATE INDEX IF NOT EXISTS layers_variant ON layers (icon_size, state, tone, scale);
+CREATE INDEX IF NOT EXISTS layers_payload ON layers (payload_sha256);
+"""
+
+LAYER_COLUMNS = ("icon_size", "state", "tone", "scale", "layer", "priority", "padding", "palette", "hue", "saturation",
+                 "brightness", "red", "green", "blue", "alpha", "format", "alpha8", "is_link", "link_target",
+                 "payload_sha256", "payload_size")
+
+# Columns size_report may group by
+REPORT_COLUMNS = ("format", "icon_size", "state", "tone", "scale", "is_link")
+
+
+def catalog_layers(content):
+    """Parse DCI content into layer rows in LAYER_COLUMNS order, without decoding images
+
+    Returns None if the content is not a valid DCI file.
+    """
+    reader = DCIReader(binary_data=content)
+    if not reader.read():
+        return None
+
+    rows = []
+    for entry in reader.get_layer_entries():
+        layer = entry['layer']
+        payload = entry['content']
+        rows.append((
+            entry['size'], entry['state'], entry['tone'], entry['scale'], entry['filename'],
+            layer.get('priority'), layer.get('padding'), layer.get('palette'), layer.get('hue'),
+            layer.get('saturation'), layer.get('brightness'), layer.get('red'), layer.get('green'),
+            layer.get('blue'), layer.get('alpha'), layer.get('format'), int(layer.get('is_alpha8', False)),
+            int(entry['is_symlink']), entry.get('symlink_target'),
+            hashlib.sha256(payload).hexdigest() if payload is not None else None,
+            len(payload) if payload is not None else None,
+        ))
+    return rows
+
+
+def _catalog_content(content, known_sha256=None):
+    """Hash one file's content on a worker thread and parse it unless the hash is known"""
+    sha256 = hashlib.sha256(content).hexdigest()
+    if sha256 == known_sha256:
+        return sha256, None
+    return sha256, catalog_layers(content)
+
+
+class DCICatalog:
+    """Incrementally updated SQLite index of DCI files and their layers"""
+
+    def __init__(self, database_path):
+        self.database_path = database_path
+        directory = os.path.dirname(os.path.abspath(database_path))
+        os.makedirs(directory, exist_ok=True)
+
+        self.connection = sqlite3.connect(database_path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            # Rebuild catalogues written by other schema versions
+            self.connection.executescript("DROP TABLE IF EXISTS layers; DROP TABLE IF EXISTS icons; "
+                                          "DROP TABLE IF EXISTS sources;")
+        self.connection.executescript(SCHEMA)
+        self.connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.connection.commit()
+
+    def close(self):
+        # Refresh query planner statistics after updates
+        self.connection.execute("PRAGMA optimize")
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Updating
+
+    def update(self, source, file_filter="*.dci", workers=0):
+        """Update the catalogue from a directory or a .deb file; returns update statistics"""
+        if os.path.isdir(source):
+            return self.update_directory(source, file_filter, workers)
+        return self.update_deb(source, file_filter, workers)
+
+    def update_directory(self, root, file_filter="*.dci", workers=0):
+        """Catalogue the DCI files under root whose relative path matches file_filter"""
+        start_time = time.time()
+        source = os.path.abspath(root)
+        known = self._known_icons(source)
+
+        files, _ = scan_directory(source, file_filter)
+        seen = set()
+        changed = []
+        for file_path in files:
+            relative_path = os.path.relpath(file_path, source).replace(os.sep, '/')
+            try:
+                stat = os.stat(file_path)
+            except OSError:
+                continue
+            seen.add(relative_path)
+            row = known.get(relative_path)
+            if row is None or row[1] != stat.st_size or row[2] != stat.st_mtime_ns:
+                changed.append((relative_path, stat.st_size, stat.st_mtime_ns, file_path))
+
+        def read_and_catalog(item):
+            try:
+                with open(item[3], 'rb') as f:
+                    content = f.read()
+            except OSError as e:
+                print(f"警告：无法读取文件: {item[3]} - {str(e)}")
+                return None
+            row = known.get(item[0])
+            return _catalog_content(content, row[3] if row else None)
+
+        results = self._map(read_and_catalog, changed, workers)
+        stats = self._store(source, "directory", file_filter, None, known, seen, changed, results)
+        stats["seconds"] = time.time() - start_time
+        return stats
+
+    def update_deb(self, deb_path, file_filter="*.dci", workers=0):
+        """Catalogue the DCI files in the data archive of a Debian package"""
+        start_time = time.time()
+        source = os.path.abspath(deb_path)
+        stat = os.stat(source)
+        row = self.connection.execute("SELECT kind, file_filter, size, mtime_ns FROM sources WHERE path = ?",
+                                      (source,)).fetchone()
+        if row == ("deb", file_filter, stat.st_size, stat.st_mtime_ns):
+            total = self.connection.execute("SELECT COUNT(*) FROM icons WHERE source = ?", (source,)).fetchone()[0]
+            return {"scanned": total, "unchanged": total, "parsed": 0, "rehashed": 0, "removed": 0,
+                    "invalid": 0, "seconds": time.time() - start_time}
+
+        known = self._known_icons(source)
+        matches = compile_file_filter(file_filter)
+        seen = set()
+        selected = set()
+        changed = []
+        contents = []
+
+        def select(member):
+            relative_path = tar_member_path(member.name)
+            if not matches(relative_path):
+                return False
+            seen.add(relative_path)
+            row = known.get(relative_path)
+            if row is None or row[1] != member.size or row[2] != int(member.mtime) * 1000000000:
+                selected.add(relative_path)
+                return True
+            return False
+
+        def add_changed(member, content):
+            relative_path = tar_member_path(member.name)
+            row = known.get(relative_path)
+            changed.append((relative_path, member.size, int(member.mtime) * 1000000000, None))
+            contents.append((content, row[3] if row else None))
+
+        with ArArchive(source) as archive:
+            data_name = archive.find("data.tar")
+            if data_name is None:
+                raise ValueError(f"no data.tar member in {deb_path}")
+            mode = tar_stream_mode(data_name)
+            # Hardlinks come with the size and content of their target
+            link_names = {}
+            unread_links = []
+            for member, content in iter_tar_stream(archive.open(data_name), mode, select):
+                if member.islnk():
+                    link_names[tar_member_path(member.name)] = tar_member_path(member.linkname)
+                if content is not None:
+                    add_changed(member, content)
+                elif member.islnk() and tar_member_path(member.name) in selected:
+                    unread_links.append(tar_member_path(member.name))
+
+            if unread_links:
+                # New links to unchanged files were not given the target's data, which was
+                # skipped, so a second pass reads those targets along with the links
+                needed = set(unread_links)
+                for path in unread_links:
+                    while path in link_names:
+                        path = link_names[path]
+                    needed.add(path)
+                for member, content in iter_tar_stream(archive.open(data_name), mode,
+                                                       lambda member: tar_member_path(member.name) in needed):
+                    if member.islnk() and content is not None:
+                        add_changed(member, content)
+
+        results = self._map(lambda item: _catalog_content(*item), contents, workers)
+        stats = self._store(source, "deb", file_filter, stat, known, seen, changed, results)
+        stats["seconds"] = time.time() - start_time
+        return stats
+
+    def _known_icons(self, source):
+        return {path: (icon_id, size, mtime_ns, sha256) for icon_id, path, size, mtime_ns, sha256 in
+                self.connection.execute("SELECT id, path, size, mtime_ns, sha256 FROM icons WHERE source = ?",
+                                        (source,))}
+
+    @staticmethod
+    def _map(function, items, workers):
+        # Hashing releases the GIL, so reading and hashing overlap on threads
+        workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+        if workers == 1 or len(items) < 2:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(function, items))
+
+    def _store(self, source, kind, file_filter, source_stat, known, seen, changed, results):
+        """Write changed icons and drop vanished ones in one transaction"""
+        stats = {"scanned": len(seen), "unchanged": len(seen) - len(changed), "parsed": 0, "rehashed": 0,
+                 "removed": 0, "invalid": 0}
+        placeholders = ", ".join("?" for _ in LAYER_COLUMNS)
+
+        with self.connection:
+            for (relative_path, size, mtime_ns, _), result in zip(changed, results):
+                if result is None:
+                    continue
+                sha256, rows = result
+                row = known.get(relative_path)
+                if row is not None and row[3] == sha256:
+                    # Touched but identical, only the stat changed
+                    self.connection.execute("UPDATE icons SET size = ?, mtime_ns = ? WHERE id = ?",
+                                            (size, mtime_ns, row[0]))
+                    stats["rehashed"] += 1
+                    continue
+
+                if row is not None:
+                    self.connection.execute("DELETE FROM icons WHERE id = ?", (row[0],))
+                name = os.path.splitext(os.path.basename(relative_path))[0]
+                icon_id = self.connection.execute(
+                    "INSERT INTO icons (source, path, name, size, mtime_ns, sha256, valid) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (source, relative_path, name, size, mtime_ns, sha256, int(rows is not None))).lastrowid
+                if rows is None:
+                    stats["invalid"] += 1
+                    continue
+                self.connection.executemany(
+                    f"INSERT INTO layers (icon_id, {', '.join(LAYER_COLUMNS)}) VALUES (?, {placeholders})",
+                    [(icon_id,) + layer for layer in rows])
+                stats["parsed"] += 1
+
+            for relative_path in set(known) - seen:
+                self.connection.execute("DELETE FROM icons WHERE id = ?", (known[relative_path][0],))
+                stats["removed"] += 1
+
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sources (path, kind, file_filter, size, mtime_ns, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                (source, kind, file_filter, source_stat.st_size if source_stat else None,
+                 source_stat.st_mtime_ns if source_stat else None, time.time()))
+        return stats
+
+    # Queries
+
+    @staticmethod
+    def _variant_filter(size=None, state=None, tone=None, scale=None):
+        conditions = []
+        params = []
+        for column, value in (("icon_size", size), ("state", state), ("tone", tone), ("scale", scale)):
+            if value is not None and value != "":
+                conditions.append(f"l.{column} = ?")
+                params.append(value)
+        return " AND ".join(conditions) or "1", params
+
+    @staticmethod
+    def _source_filter(source):
+        if not source:
+            return "1", []
+        return "i.source = ?", [os.path.abspath(source)]
+
+    def missing_variants(self, size=None, state=None, tone=None, scale=None, source=None):
+        """Return (source, path) of every valid icon that has no layer for the given variant
+
+        Unset criteria match anything, e.g. scale=2, state="hover", tone="dark"
+        lists icons without any 2x hover dark layer.
+        """
+        variant, variant_params = self._variant_filter(size, state, tone, scale)
+        source_condition, source_params = self._source_filter(source)
+        return self.connection.execute(
+            f"SELECT i.source, i.path FROM icons i WHERE i.valid AND {source_condition} AND NOT EXISTS "
+            f"(SELECT 1 FROM layers l WHERE l.icon_id = i.id AND {variant}) ORDER BY i.source, i.path",
+            source_params + variant_params).fetchall()
+
+    def coverage(self, size=None, state=None, tone=None, scale=None, source=None):
+        """Return (icons with a layer for the variant, valid icons)"""
+        variant, variant_params = self._variant_filter(size, state, tone, scale)
+        source_condition, source_params = self._source_filter(source)
+        covered = self.connection.execute(
+            f"SELECT COUNT(DISTINCT l.icon_id) FROM layers l JOIN icons i ON i.id = l.icon_id "
+            f"WHERE i.valid AND {source_condition} AND {variant}", source_params + variant_params).fetchone()[0]
+        total = self.connection.execute(f"SELECT COUNT(*) FROM icons i WHERE i.valid AND {source_condition}",
+                                        source_params).fetchone()[0]
+        return covered, total
+
+    def variant_counts(self, source=None):
+        """Return (icon_size, state, tone, scale, icons, layers) for every variant present"""
+        source_condition, source_params = self._source_filter(source)
+        return self.connection.execute(
+            f"SELECT l.icon_size, l.state, l.tone, l.scale, COUNT(DISTINCT l.icon_id), COUNT(*) FROM layers l "
+            f"JOIN icons i ON i.id = l.icon_id WHERE {source_condition} "
+            f"GROUP BY l.icon_size, l.state, l.tone, l.scale ORDER BY l.icon_size, l.state, l.tone, l.scale",
+            source_params).fetchall()
+
+    def size_report(self, group_by="format", source=None):
+        """Return (value, layers, payload bytes, unique payload bytes) grouped by a layer column
+
+        Link layers count the size of their target in payload bytes; unique
+        bytes count every distinct payload once.
+        """
+        if group_by not in REPORT_COLUMNS:
+            raise ValueError(f"cannot group by {group_by!r}, expected one of {REPORT_COLUMNS}")
+        source_condition, source_params = self._source_filter(source)
+        unique = dict(self.connection.execute(
+            f"SELECT value, SUM(payload_size) FROM (SELECT DISTINCT l.{group_by} AS value, l.payload_sha256, "
+            f"l.payload_size FROM layers l JOIN icons i ON i.id = l.icon_id WHERE l.is_link = 0 AND {source_condition}) "
+            f"GROUP BY value", source_params))
+        rows = self.connection.execute(
+            f"SELECT l.{group_by}, COUNT(*), COALESCE(SUM(l.payload_size), 0) FROM layers l "
+            f"JOIN icons i ON i.id = l.icon_id WHERE {source_condition} GROUP BY l.{group_by} ORDER BY l.{group_by}",
+            source_params).fetchall()
+        return [(value, layers, total, unique.get(value) or 0) for value, layers, total in rows]
+
+    def largest_icons(self, limit=20, source=None):
+        """Return (source, path, size) of the largest DCI files"""
+        source_condition, source_params = self._source_filter(source)
+        return self.connection.execute(
+            f"SELECT i.source, i.path, i.size FROM icons i WHERE {source_condition} ORDER BY i.size DESC, i.path LIMIT ?",
+            source_params + [limit]).fetchall()
+
+    def query(self, sql, params=()):
+        """Run an SQL query against the catalogue and return all rows"""
+        return self.connection.execute(sql, params).fetchall()
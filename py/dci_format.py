@@ -7,6 +7,21 @@ import tempfile
 import re
 
 
+def natural_sort_key(text: str):
+    """Natural sorting key for filenames"""
+    def convert(text):
+        return int(text) if text.isdigit() else text.lower()
+    return [convert(c) for c in re.split('([0-9]+)', text)]
+
+
+def pack_entry_header(file_type: int, name: str, size: int) -> bytes:
+    """Pack the 72 byte header of a file entry: type, null-padded name and content size"""
+    name_bytes = name.encode('utf-8')
+    if len(name_bytes) > 62:  # 63 bytes - 1 for null terminator
+        raise ValueError(f"File name too long: {name}")
+    return struct.pack('<B63sQ', file_type, name_bytes, size)
+
+
 class DCIFile:
     """DCI (DSG Combined Icons) file format implementation"""
 
@@ -68,9 +83,7 @@ class DCIFile:
 
     def _natural_sort_key(self, text: str):
         """Natural sorting key for filenames"""
-        def convert(text):
-            return int(text) if text.isdigit() else text.lower()
-        return [convert(c) for c in re.split('([0-9]+)', text)]
+        return natural_sort_key(text)
 
     def write(self, output_path: str):
         """Write DCI file to disk"""
@@ -113,6 +126,44 @@ class DCIFile:
         return output.getvalue()
 
 
+class DCIStreamWriter:
+    """Write a DCI file entry by entry to a binary stream
+
+    Entry sizes are written before their content, so callers pass the size of
+    each entry up front (a directory's size is the sum of its children's
+    headers and contents) and then write its content or children. Nothing is
+    buffered, so payloads can be copied straight from other files.
+    """
+
+    ENTRY_HEADER_SIZE = 72
+
+    def __init__(self, stream, file_count: int):
+        self.stream = stream
+        stream.write(DCIFile.MAGIC)
+        stream.write(struct.pack('<B', DCIFile.VERSION))
+        stream.write(struct.pack('<I', file_count)[:3])
+
+    def write_entry(self, file_type: int, name: str, size: int, content: Optional[bytes] = None):
+        """Write an entry header, followed by content if it is given"""
+        if '/' in name:
+            raise ValueError(f"File name cannot contain '/': {name}")
+        if content is not None and len(content) != size:
+            raise ValueError(f"Content of {name} is {len(content)} bytes, expected {size}")
+        self.stream.write(pack_entry_header(file_type, name, size))
+        if content is not None:
+            self.stream.write(content)
+
+    def write_content(self, source, size: int, buffer_size: int = 1024 * 1024):
+        """Copy size bytes of entry content from a readable binary file"""
+        remaining = size
+        while remaining:
+            block = source.read(min(buffer_size, remaining))
+            if not block:
+                raise ValueError(f"Content ended {remaining} bytes early")
+            self.stream.write(block)
+            remaining -= len(block)
+
+
 class DCIIconBuilder:
     """Builder for DCI icon files following the icon specification"""
 
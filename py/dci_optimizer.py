@@ -0,0 +1,230 @@
+"""
+Lossless DCI optimizer
+
+Rewrites an existing DCI file without changing any pixel:
+
+- PNG and lossless WebP layers are re-encoded at the encoder's maximum effort
+  and the smaller payload is kept if it decodes to the same pixels,
+- layers with identical payloads become links to the first of them, and
+  existing links are pointed at real files so no link chains appear,
+- entries are written in the natural name order of the specification.
+
+Lossy WebP and JPEG layers are kept byte for byte. The rewritten file is read
+back and every layer is compared with the original before it is written.
+"""
+
+import os
+import posixpath
+from io import BytesIO
+
+from PIL import Image
+
+try:
+    from .dci_format import DCIFile, natural_sort_key, pack_entry_header
+    from .dci_reader import DCIReader, resolve_link_path
+except ImportError:
+    from dci_format import DCIFile, natural_sort_key, pack_entry_header
+    from dci_reader import DCIReader, resolve_link_path
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def is_lossless_webp(data):
+    """Whether data is a still WebP image with a lossless (VP8L) bitstream"""
+    if data[:4] != b'RIFF' or data[8:12] != b'WEBP':
+        return False
+    offset = 12
+    lossless = False
+    while offset + 8 <= len(data):
+        fourcc = data[offset:offset + 4]
+        size = int.from_bytes(data[offset + 4:offset + 8], 'little')
+        if fourcc in (b'VP8 ', b'ANMF'):
+            return False
+        if fourcc == b'VP8L':
+            lossless = True
+        offset += 8 + size + (size & 1)
+    return lossless
+
+
+def pixels_equal(data, other):
+    """Whether two encoded images decode to the same size, mode, palette and pixels"""
+    with Image.open(BytesIO(data)) as image, Image.open(BytesIO(other)) as other_image:
+        image.load()
+        other_image.load()
+        return (image.size == other_image.size and image.mode == other_image.mode
+                and image.getpalette() == other_image.getpalette()
+                and image.info.get('transparency') == other_image.info.get('transparency')
+                and image.tobytes() == other_image.tobytes())
+
+
+def recompress_layer(data):
+    """Re-encode a PNG or lossless WebP payload at maximum effort
+
+    Returns the new payload if it is smaller and decodes to the same pixels,
+    otherwise the original payload. PNGs with more than 8 bits per sample are
+    never re-encoded.
+    """
+    output = BytesIO()
+    try:
+        with Image.open(BytesIO(data)) as image:
+            image.load()
+            if data.startswith(PNG_SIGNATURE):
+                # Pillow decodes 16-bit colour PNGs to 8 bits, so they are kept as they are
+                if len(data) < 25 or data[24] > 8:
+                    return data
+                params = {key: image.info[key] for key in ('transparency', 'icc_profile', 'dpi') if key in image.info}
+                image.save(output, format='PNG', optimize=True, **params)
+            elif is_lossless_webp(data):
+                # exact keeps the colour of fully transparent pixels
+                image.save(output, format='WEBP', lossless=True, quality=100, method=6, exact=True,
+                           icc_profile=image.info.get('icc_profile'))
+            else:
+                return data
+    except Exception:
+        return data
+
+    recompressed = output.getvalue()
+    if len(recompressed) < len(data) and pixels_equal(data, recompressed):
+        return recompressed
+    return data
+
+
+def _path_key(path):
+    return [natural_sort_key(part) for part in path.split('/')]
+
+
+def _serialize_directory(tree, dir_path):
+    """Pack the entries of one directory in natural name order"""
+    entries = [(name, DCIFile.FILE_TYPE_DIRECTORY, None) for name in tree["dirs"].get(dir_path, ())]
+    entries.extend((name, file_type, content) for name, (file_type, content) in tree["files"].get(dir_path, {}).items())
+    entries.sort(key=lambda entry: (natural_sort_key(entry[0]), entry[0]))
+
+    content = bytearray()
+    for name, file_type, payload in entries:
+        if file_type == DCIFile.FILE_TYPE_DIRECTORY:
+            payload = _serialize_directory(tree, f"{dir_path}/{name}")
+        content += pack_entry_header(file_type, name, len(payload))
+        content += payload
+    return bytes(content)
+
+
+def optimize_dci(data, recompress=True, dedupe=True):
+    """Optimize DCI file data without changing any pixel
+
+    Returns (optimized data, stats) where stats has original_bytes,
+    optimized_bytes, recompressed (layer payloads that shrank) and linked
+    (layers turned into links). Raises ValueError if the data cannot be read
+    or the result does not verify.
+    """
+    reader = DCIReader(binary_data=data)
+    if not reader.read():
+        raise ValueError("Invalid DCI file")
+
+    # Rebuild the tree: every directory with its subdirectories and (type, content) files
+    tree = {"dirs": {"": set()}, "files": {"": {}}}
+    for file_info in reader.files:
+        if file_info['type'] == DCIFile.FILE_TYPE_DIRECTORY:
+            tree["dirs"][""].add(file_info['name'])
+        else:
+            tree["files"][""][file_info['name']] = (file_info['type'], file_info['content'])
+    for dir_path, files in reader.directory_structure.items():
+        tree["dirs"].setdefault(dir_path, set())
+        parent, _, name = dir_path.rpartition('/')
+        tree["dirs"].setdefault(parent, set()).add(name)
+        tree["files"][dir_path] = {name: (file_info['type'], file_info['content']) for name, file_info in files.items()}
+
+    # Layer files live at least three levels deep (size/state.tone/scale); links only resolve there
+    layers = sorted(((dir_path, name) for dir_path, files in tree["files"].items() if dir_path.count('/') >= 2
+                     for name, (file_type, _) in files.items() if file_type == DCIFile.FILE_TYPE_FILE),
+                    key=lambda layer: _path_key(f"{layer[0]}/{layer[1]}"))
+
+    stats = {"original_bytes": len(data), "optimized_bytes": len(data), "recompressed": 0, "linked": 0}
+    recompressed = {}
+    for dir_path, name in layers:
+        content = tree["files"][dir_path][name][1]
+        if content not in recompressed:
+            recompressed[content] = recompress_layer(content) if recompress else content
+        new_content = recompressed[content]
+        if new_content is not content:
+            stats["recompressed"] += 1
+        tree["files"][dir_path][name] = (DCIFile.FILE_TYPE_FILE, new_content)
+
+    if dedupe:
+        canonical = {}
+        replaced = {}
+        for dir_path, name in layers:
+            content = tree["files"][dir_path][name][1]
+            first = canonical.setdefault(content, (dir_path, name))
+            if first == (dir_path, name):
+                continue
+            target = posixpath.relpath(f"{first[0]}/{first[1]}", dir_path).encode('utf-8')
+            if len(target) < len(content):
+                tree["files"][dir_path][name] = (DCIFile.FILE_TYPE_LINK, target)
+                replaced[(dir_path, name)] = first
+                stats["linked"] += 1
+
+        # Existing links to a layer that became a link now point at its canonical copy
+        for dir_path, files in tree["files"].items():
+            for name, (file_type, content) in list(files.items()):
+                if file_type != DCIFile.FILE_TYPE_LINK or (dir_path, name) in replaced:
+                    continue
+                resolved = resolve_link_path(dir_path, content.decode('utf-8', errors='replace'))
+                if resolved in replaced:
+                    first = replaced[resolved]
+                    files[name] = (file_type, posixpath.relpath(f"{first[0]}/{first[1]}", dir_path).encode('utf-8'))
+
+    dci = DCIFile()
+    for name in tree["dirs"][""]:
+        dci.add_file(name, _serialize_directory(tree, name), DCIFile.FILE_TYPE_DIRECTORY)
+    for name, (file_type, content) in tree["files"][""].items():
+        dci.add_file(name, content, file_type)
+    optimized = dci.to_binary()
+
+    _verify(reader, optimized)
+    stats["optimized_bytes"] = len(optimized)
+    return optimized, stats
+
+
+def _verify(reader, optimized):
+    """Check that every layer of the optimized data shows the same pixels as before"""
+    optimized_reader = DCIReader(binary_data=optimized)
+    if not optimized_reader.read():
+        raise ValueError("Optimized DCI cannot be read back")
+
+    before = {(entry['path'], entry['filename']): entry['content'] for entry in reader.get_layer_entries()}
+    after = {(entry['path'], entry['filename']): entry['content'] for entry in optimized_reader.get_layer_entries()}
+    if before.keys() != after.keys():
+        raise ValueError("Optimized DCI has different layers")
+    verified = set()
+    for key, content in before.items():
+        new_content = after[key]
+        if content == new_content or (content, new_content) in verified:
+            continue
+        if content is None or new_content is None:
+            raise ValueError(f"Layer {'/'.join(key)} does not resolve after optimizing")
+        if not pixels_equal(content, new_content):
+            raise ValueError(f"Layer {'/'.join(key)} changed after optimizing")
+        # Layers sharing a payload are decoded once
+        verified.add((content, new_content))
+
+
+def optimize_dci_file(path, output_path=None, dry_run=False, recompress=True, dedupe=True):
+    """Optimize a DCI file in place, or into output_path
+
+    The file is only written when the optimized data differs, and never with
+    dry_run. Returns the stats of optimize_dci with written added.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    optimized, stats = optimize_dci(data, recompress, dedupe)
+
+    output_path = output_path or path
+    stats["written"] = False
+    if not dry_run and (optimized != data or output_path != path):
+        if os.path.dirname(output_path):
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        with open(output_path + ".tmp", 'wb') as f:
+            f.write(optimized)
+        os.replace(output_path + ".tmp", output_path)
+        stats["written"] = True
+    return stats
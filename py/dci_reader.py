@@ -5,6 +5,37 @@ from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont
 import re
 
+try:
+    from .utils.image_utils import load_thumbnail
+except ImportError:
+    from utils.image_utils import load_thumbnail
+
+
+def resolve_link_path(current_dir: str, target_path: str) -> Optional[Tuple[str, str]]:
+    """Resolve a DCI link target relative to its directory into (directory, filename)
+
+    Returns None when the target does not lie at least three levels deep
+    (size/state.tone/scale), where layer files live.
+    """
+    # Parse target path (e.g., "../../normal.light/1/1.0p.-1.0_0_0_0_0_0_0.webp")
+    resolved_parts = current_dir.split('/')
+
+    for part in target_path.split('/'):
+        if part == '..':
+            # Go up one directory level
+            if resolved_parts:
+                resolved_parts.pop()
+        elif part == '.':
+            # Stay in current directory
+            continue
+        elif part:
+            # Add directory or filename
+            resolved_parts.append(part)
+
+    if len(resolved_parts) < 3:
+        return None
+    return '/'.join(resolved_parts[:-1]), resolved_parts[-1]
+
 
 class DCIReader:
     """DCI file reader and parser"""
@@ -202,6 +233,7 @@ class DCIReader:
                                 'path': dir_path,
                                 'filename': filename,
                                 'file_size': file_info['size'],
+                                'content': file_info['content'],
 
                                 # Layer information
                                 'layer_priority': layer_info.get('priority', 1),
@@ -260,6 +292,7 @@ class DCIReader:
                                 'path': dir_path,
                                 'filename': filename,
                                 'file_size': resolved_image['file_size'],
+                                'content': resolved_image['content'],
                                 'is_symlink': True,
                                 'symlink_target': target_path,
 
@@ -291,6 +324,51 @@ class DCIReader:
         print(f"DCIReader.get_icon_images: 共提取 {len(images)} 个图像")
         return images
 
+    def get_layer_entries(self) -> List[Dict]:
+        """List every layer file with its parsed metadata, without decoding images
+
+        Each entry has path, filename, size, state, tone, scale, layer (the
+        parsed layer filename), is_symlink and content. For links, content is
+        the resolved target's payload (None if it cannot be resolved) and
+        symlink_target holds the link text.
+        """
+        entries = []
+        for dir_path, files in self.directory_structure.items():
+            path_parts = dir_path.split('/')
+            if len(path_parts) < 3:
+                continue
+
+            # Expected format: size/state.tone/scale
+            size = int(path_parts[0]) if path_parts[0].isdigit() else 0
+            state, tone = self._parse_state_tone(path_parts[1])
+            try:
+                scale = float(path_parts[2]) if path_parts[2] else 1.0
+            except ValueError:
+                scale = 1.0
+
+            for filename, file_info in files.items():
+                entry = {
+                    'path': dir_path,
+                    'filename': filename,
+                    'size': size,
+                    'state': state,
+                    'tone': tone,
+                    'scale': scale,
+                    'layer': self._parse_layer_filename(filename),
+                    'is_symlink': file_info['type'] == self.FILE_TYPE_LINK,
+                    'content': file_info['content'],
+                }
+                if entry['is_symlink']:
+                    entry['symlink_target'] = file_info['content'].decode('utf-8', errors='replace')
+                    resolved = resolve_link_path(dir_path, entry['symlink_target'])
+                    target = self.directory_structure.get(resolved[0], {}).get(resolved[1]) if resolved else None
+                    entry['content'] = target['content'] if target and target['type'] == self.FILE_TYPE_FILE else None
+                elif file_info['type'] != self.FILE_TYPE_FILE:
+                    continue
+                entries.append(entry)
+
+        return entries
+
     def _parse_state_tone(self, state_tone_str: str) -> Tuple[str, str]:
         """Parse state.tone string"""
         if '.' in state_tone_str:
@@ -446,34 +524,12 @@ class DCIReader:
     def _resolve_symlink(self, current_dir: str, target_path: str) -> Optional[Dict]:
         """Resolve symlink target and return image data"""
         try:
-            # Parse target path (e.g., "../../normal.light/1/1.0p.-1.0_0_0_0_0_0_0.webp")
-            # Split current directory path
-            current_parts = current_dir.split('/')
-
-            # Process target path
-            target_parts = target_path.split('/')
-            resolved_parts = current_parts.copy()
-
-            for part in target_parts:
-                if part == '..':
-                    # Go up one directory level
-                    if resolved_parts:
-                        resolved_parts.pop()
-                elif part == '.':
-                    # Stay in current directory
-                    continue
-                elif part:
-                    # Add directory or filename
-                    resolved_parts.append(part)
-
-            # Reconstruct the resolved path
-            if len(resolved_parts) < 3:
-                print(f"Invalid resolved path: {resolved_parts}")
+            resolved = resolve_link_path(current_dir, target_path)
+            if resolved is None:
+                print(f"Invalid resolved path: {current_dir} + {target_path}")
                 return None
 
-            # Extract filename from resolved path
-            filename = resolved_parts[-1]
-            resolved_dir = '/'.join(resolved_parts[:-1])
+            resolved_dir, filename = resolved
 
             try:
                 print(f"解析符号链接: {current_dir} + {target_path} -> {resolved_dir}/{filename}")
@@ -604,6 +660,180 @@ class DCIPreviewGenerator:
 
         return canvas
 
+    def create_preview_pages(self, images: List[Dict], grid_cols: int = 4, background_color=None,
+                             max_canvas_width: int = 4096, max_canvas_height: int = 4096,
+                             max_cell_image_size: int = 256, max_pages: int = 0) -> List[Image.Image]:
+        """Create a paged grid preview with bounded canvas and thumbnail sizes
+
+        Every page is at most max_canvas_width x max_canvas_height pixels and all
+        pages share the same size so they can be emitted as one batch. Icons are
+        decoded as thumbnails no larger than max_cell_image_size, so the memory
+        used per page does not depend on the size of the icons in the DCI file.
+        max_pages limits the number of pages (0 means no limit).
+        """
+        if not images:
+            return [self._create_empty_preview(background_color)]
+
+        # Update background color if provided
+        if background_color is not None:
+            self.background_color = background_color
+            self.text_color = self._get_contrasting_text_color(background_color)
+
+        # Sort images by size, state, tone, scale
+        sorted_images = sorted(images, key=lambda x: (
+            x['size'], x['state'], x['tone'], x['scale']
+        ))
+
+        # Cap the cell image size, image.size only reads the header so this is cheap
+        max_image_size = min(max(img['image'].size[0] for img in sorted_images), max_cell_image_size)
+        # A cell with its label and margins must also fit on the canvas
+        max_image_size = max(1, min(max_image_size, min(max_canvas_width, max_canvas_height - self.label_height)
+                                    - self.margin * 2))
+        max_text_width = self._calculate_max_text_width(sorted_images)
+
+        cell_width = min(max(max_image_size + self.margin * 2, max_text_width + self.margin * 2), max_canvas_width)
+        cell_height = max_image_size + self.label_height + self.margin * 2
+
+        # Fit as many columns and rows as the canvas limits allow
+        page_cols = max(1, min(grid_cols, max_canvas_width // cell_width))
+        rows_needed = (len(sorted_images) + page_cols - 1) // page_cols
+        page_rows = max(1, min(rows_needed, max_canvas_height // cell_height))
+        cells_per_page = page_cols * page_rows
+
+        page_count = (len(sorted_images) + cells_per_page - 1) // cells_per_page
+        if max_pages and page_count > max_pages:
+            print(f"预览分页数 {page_count} 超过上限 {max_pages}，仅渲染前 {max_pages} 页")
+            page_count = max_pages
+
+        pages = []
+        for page_index in range(page_count):
+            canvas = Image.new('RGB', (cell_width * page_cols, cell_height * page_rows), self.background_color)
+            page_images = sorted_images[page_index * cells_per_page:(page_index + 1) * cells_per_page]
+
+            for i, img_info in enumerate(page_images):
+                row = i // page_cols
+                col = i % page_cols
+
+                x = col * cell_width + self.margin
+                y = row * cell_height + self.margin
+
+                # Draw from a thumbnail instead of the full resolution image
+                cell_info = dict(img_info)
+                cell_info['image'] = self._load_cell_thumbnail(img_info, max_image_size)
+                self._draw_image_cell(canvas, cell_info, x, y, max_image_size, cell_width - self.margin * 2)
+
+            pages.append(canvas)
+
+        return pages
+
+    def _load_cell_thumbnail(self, img_info: Dict, target_size: int) -> Image.Image:
+        """Decode an icon image at reduced resolution for a preview cell
+
+        Uses the shared thumbnail cache, so icons that appear in several previews
+        or share content through symlinks are decoded only once per size.
+        """
+        return load_thumbnail(img_info.get('content'), target_size, img_info['image'])
+
+    def create_atlas(self, images: List[Dict], max_atlas_size: int = 2048, max_cell_image_size: int = 128,
+                     padding: int = 2, background_color=None) -> Tuple[List[Image.Image], List[Dict]]:
+        """Pack icon thumbnails into one or more atlas images using shelf packing
+
+        Thumbnails are sorted by height and placed left to right on shelves; a new
+        shelf starts when a row is full and a new atlas starts when the atlas is
+        full. All atlases share the same size so they can be emitted as one batch.
+        Returns the atlas images and one placement dict per icon with the atlas
+        index, rectangle and icon metadata. A 'source' key of the input dicts is
+        carried over to the placements.
+        """
+        if not images:
+            return [], []
+
+        # A thumbnail plus its padding must fit in one atlas, or the atlas grows past its cap
+        max_cell_image_size = max(1, min(max_cell_image_size, max_atlas_size - padding))
+
+        # Decode every thumbnail once, capped at max_cell_image_size
+        thumbnails = []
+        for img_info in images:
+            thumbnail = self._load_cell_thumbnail(img_info, max_cell_image_size)
+            if max(thumbnail.size) > max_cell_image_size:
+                thumbnail = thumbnail.copy()
+                thumbnail.thumbnail((max_cell_image_size, max_cell_image_size), Image.Resampling.LANCZOS)
+            if thumbnail.mode != 'RGBA':
+                thumbnail = thumbnail.convert('RGBA')
+            thumbnails.append((img_info, thumbnail))
+
+        # Tallest first keeps the wasted space on each shelf small
+        order = sorted(range(len(thumbnails)),
+                       key=lambda i: (-thumbnails[i][1].height, -thumbnails[i][1].width, i))
+
+        placements = []
+        atlas_extents = []
+        atlas_index = 0
+        shelf_x = shelf_y = shelf_height = 0
+        used_width = used_height = 0
+
+        for i in order:
+            img_info, thumbnail = thumbnails[i]
+            width, height = thumbnail.width + padding, thumbnail.height + padding
+
+            # Start a new shelf when the current one is full
+            if shelf_x + width > max_atlas_size and shelf_x > 0:
+                shelf_y += shelf_height
+                shelf_x = shelf_height = 0
+
+            # Start a new atlas when the next shelf does not fit
+            if shelf_y + height > max_atlas_size and shelf_y > 0:
+                atlas_extents.append((used_width, used_height))
+                atlas_index += 1
+                shelf_x = shelf_y = shelf_height = 0
+                used_width = used_height = 0
+
+            placements.append({
+                'index': i,
+                'atlas': atlas_index,
+                'x': shelf_x,
+                'y': shelf_y,
+                'width': thumbnail.width,
+                'height': thumbnail.height,
+            })
+
+            shelf_x += width
+            shelf_height = max(shelf_height, height)
+            used_width = max(used_width, shelf_x)
+            used_height = max(used_height, shelf_y + shelf_height)
+
+        atlas_extents.append((used_width, used_height))
+
+        # Use one common size for all atlases
+        atlas_width = max(1, max(extent[0] for extent in atlas_extents))
+        atlas_height = max(1, max(extent[1] for extent in atlas_extents))
+        fill = tuple(background_color) + (255,) if background_color is not None else (0, 0, 0, 0)
+        atlases = [Image.new('RGBA', (atlas_width, atlas_height), fill) for _ in atlas_extents]
+
+        atlas_map = []
+        for placement in sorted(placements, key=lambda p: p['index']):
+            img_info, thumbnail = thumbnails[placement['index']]
+            atlases[placement['atlas']].alpha_composite(thumbnail, (placement['x'], placement['y']))
+
+            entry = {
+                'path': f"{img_info.get('path', '')}/{img_info.get('filename', '')}",
+                'size': img_info.get('size'),
+                'state': img_info.get('state'),
+                'tone': img_info.get('tone'),
+                'scale': img_info.get('scale'),
+                'format': img_info.get('format'),
+                'atlas': placement['atlas'],
+                'x': placement['x'],
+                'y': placement['y'],
+                'width': placement['width'],
+                'height': placement['height'],
+            }
+            if 'source' in img_info:
+                entry = {'source': img_info['source'], **entry}
+            atlas_map.append(entry)
+
+        return atlases, atlas_map
+
     def _calculate_max_text_width(self, images: List[Dict]) -> int:
         """Calculate the maximum text width needed for metadata display"""
         # Try to load a font for measurement
@@ -648,6 +878,9 @@ class DCIPreviewGenerator:
         # Resize image to fit cell while maintaining aspect ratio
         image_size = min(cell_size, max(image.size))
         if image.size[0] != image_size or image.size[1] != image_size:
+            if max(image.size) > image_size:
+                # Shrink during decoding before the final high quality resize
+                image = self._load_cell_thumbnail(img_info, image_size)
             image = image.resize((image_size, image_size), Image.Resampling.LANCZOS)
 
         # Position image at left side of cell instead of center
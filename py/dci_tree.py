@@ -0,0 +1,174 @@
+"""
+Unpack DCI files to filesystem trees and pack them back
+
+A DCI file is a tree of directories (``size/state.tone/scale``), layer files
+and links. unpack_dci mirrors that tree on disk, with ``FILE_TYPE_LINK``
+entries as real symlinks, by walking the entry headers and copying payloads
+straight from the DCI file. pack_dci streams such a tree back into a DCI file
+in the natural name order used by DCIFile, so unpacking and packing a file
+written by this package gives the same bytes.
+"""
+
+import os
+import shutil
+import struct
+
+try:
+    from .dci_format import DCIFile, DCIStreamWriter, natural_sort_key
+except ImportError:
+    from dci_format import DCIFile, DCIStreamWriter, natural_sort_key
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _new_stats():
+    return {"files": 0, "links": 0, "directories": 0, "bytes": 0}
+
+
+def _read_entry_header(f):
+    header = f.read(DCIStreamWriter.ENTRY_HEADER_SIZE)
+    if len(header) < DCIStreamWriter.ENTRY_HEADER_SIZE:
+        raise ValueError("Truncated DCI entry header")
+    file_type, name_bytes, size = struct.unpack('<B63sQ', header)
+    name = name_bytes.rstrip(b'\x00').decode('utf-8')
+    # Names become path components, so anything that could leave the tree is rejected
+    if not name or name in ('.', '..') or '/' in name or '\\' in name or '\x00' in name:
+        raise ValueError(f"Invalid DCI entry name: {name!r}")
+    return file_type, name, size
+
+
+def _copy_payload(f, out, size):
+    remaining = size
+    while remaining:
+        block = f.read(min(COPY_BUFFER_SIZE, remaining))
+        if not block:
+            raise ValueError("Truncated DCI entry content")
+        out.write(block)
+        remaining -= len(block)
+
+
+def _unpack_entries(f, directory, stats, count=None, end=None):
+    """Unpack count entries, or the entries up to offset end, into directory"""
+    index = 0
+    while (index < count) if count is not None else (f.tell() < end):
+        file_type, name, size = _read_entry_header(f)
+        content_end = f.tell() + size
+        if end is not None and content_end > end:
+            raise ValueError(f"DCI entry {name} overruns its directory")
+        path = os.path.join(directory, name)
+
+        # mkdir and exclusive creates fail on duplicate names instead of following an earlier link
+        if file_type == DCIFile.FILE_TYPE_DIRECTORY:
+            os.mkdir(path)
+            stats["directories"] += 1
+            _unpack_entries(f, path, stats, end=content_end)
+        elif file_type == DCIFile.FILE_TYPE_LINK:
+            target = f.read(size)
+            if len(target) < size:
+                raise ValueError("Truncated DCI entry content")
+            os.symlink(target.decode('utf-8'), path)
+            stats["links"] += 1
+        elif file_type == DCIFile.FILE_TYPE_FILE:
+            with open(path, 'xb') as out:
+                _copy_payload(f, out, size)
+            stats["files"] += 1
+            stats["bytes"] += size
+        else:
+            raise ValueError(f"Unsupported DCI entry type {file_type}: {name}")
+        index += 1
+
+
+def unpack_dci(dci_path, output_dir, replace=False):
+    """Extract a DCI file into output_dir without decoding any image
+
+    output_dir must not exist or be empty, unless replace is set, in which
+    case an existing tree is removed first. Returns a stats dict with files,
+    links, directories and bytes.
+    """
+    if os.path.lexists(output_dir) and (not os.path.isdir(output_dir) or os.listdir(output_dir)):
+        if not replace or os.path.islink(output_dir) or not os.path.isdir(output_dir):
+            raise FileExistsError(f"Output directory is not empty: {output_dir}")
+        shutil.rmtree(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    stats = _new_stats()
+    try:
+        with open(dci_path, 'rb') as f:
+            magic = f.read(4)
+            if magic != DCIFile.MAGIC:
+                raise ValueError(f"Invalid DCI file: wrong magic header {magic}")
+            version = f.read(1)
+            if version != struct.pack('<B', DCIFile.VERSION):
+                raise ValueError(f"Unsupported DCI version: {version}")
+            file_count = struct.unpack('<I', f.read(3) + b'\x00')[0]
+            _unpack_entries(f, output_dir, stats, count=file_count)
+    except Exception:
+        # Leave no half-extracted tree behind
+        shutil.rmtree(output_dir, ignore_errors=True)
+        raise
+    return stats
+
+
+def _scan_tree(directory, stats):
+    """List a tree as (type, name, size, payload) nodes in DCI entry order
+
+    payload is the child list of a directory, the target of a link or the
+    path of a file.
+    """
+    nodes = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_symlink():
+                target = os.readlink(entry.path).encode('utf-8')
+                nodes.append((DCIFile.FILE_TYPE_LINK, entry.name, len(target), target))
+                stats["links"] += 1
+            elif entry.is_dir():
+                children = _scan_tree(entry.path, stats)
+                size = sum(DCIStreamWriter.ENTRY_HEADER_SIZE + child[2] for child in children)
+                nodes.append((DCIFile.FILE_TYPE_DIRECTORY, entry.name, size, children))
+                stats["directories"] += 1
+            elif entry.is_file():
+                size = entry.stat().st_size
+                nodes.append((DCIFile.FILE_TYPE_FILE, entry.name, size, entry.path))
+                stats["files"] += 1
+                stats["bytes"] += size
+    nodes.sort(key=lambda node: (natural_sort_key(node[1]), node[1]))
+    return nodes
+
+
+def _write_nodes(writer, nodes):
+    for file_type, name, size, payload in nodes:
+        if file_type == DCIFile.FILE_TYPE_DIRECTORY:
+            writer.write_entry(file_type, name, size)
+            _write_nodes(writer, payload)
+        elif file_type == DCIFile.FILE_TYPE_LINK:
+            writer.write_entry(file_type, name, size, payload)
+        else:
+            writer.write_entry(file_type, name, size)
+            with open(payload, 'rb') as source:
+                writer.write_content(source, size)
+                if source.read(1):
+                    raise ValueError(f"File changed while packing: {payload}")
+
+
+def pack_dci(tree_dir, output_path):
+    """Stream an unpacked tree back into a DCI file
+
+    Symlinks are stored as links with their target text and never followed.
+    The file is written next to output_path and renamed into place. Returns
+    a stats dict with files, links, directories and bytes.
+    """
+    stats = _new_stats()
+    nodes = _scan_tree(tree_dir, stats)
+
+    temporary_path = output_path + ".tmp"
+    try:
+        with open(temporary_path, 'wb') as f:
+            writer = DCIStreamWriter(f, len(nodes))
+            _write_nodes(writer, nodes)
+        os.replace(temporary_path, output_path)
+    except Exception:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+        raise
+    return stats
@@ -13,6 +13,7 @@ try:
     from .directory_loader_node import DirectoryLoader
     from .deb_packager_node import DebPackager
     from .deb_loader_node import DebLoader
+    from .catalog_node import DCICatalogQuery
     from ..utils.i18n import t
 except ImportError as e:
     print(f"Warning: Could not import ComfyUI nodes: {e}")
@@ -31,6 +32,7 @@ except ImportError as e:
     class DirectoryLoader: pass
     class DebPackager: pass
     class DebLoader: pass
+    class DCICatalogQuery: pass
 
     def t(text):
         return text
@@ -50,6 +52,7 @@ NODE_CLASS_MAPPINGS = {
     "DirectoryLoader": DirectoryLoader,
     "DebPackager": DebPackager,
     "DebLoader": DebLoader,
+    "DCICatalogQuery": DCICatalogQuery,
 }
 
 NODE_DISPLAY_NAME_MAPPINGS = {
@@ -67,6 +70,7 @@ NODE_DISPLAY_NAME_MAPPINGS = {
     "DirectoryLoader": t("Directory Loader"),
     "DebPackager": t("Deb Packager"),
     "DebLoader": t("Deb Loader"),
+    "DCICatalogQuery": t("DCI Catalog Query"),
 }
 
 __all__ = [
@@ -84,6 +88,7 @@ __all__ = [
     'DirectoryLoader',
     'DebPackager',
     'DebLoader',
+    'DCICatalogQuery',
     'NODE_CLASS_MAPPINGS',
     'NODE_DISPLAY_NAME_MAPPINGS',
 ]
@@ -0,0 +1,166 @@
+"""
+DCI Catalog Query Node
+从 SQLite 图标目录中查询图标覆盖率和体积信息的节点
+"""
+
+import os
+
+try:
+    from ..dci_catalog import DCICatalog, REPORT_COLUMNS
+    from ..utils.file_utils import get_cache_directory
+    from ..utils.dir_scanner import scan_directory
+    from ..utils.fingerprint import tree_fingerprint
+    from ..utils.enums import CatalogQuery, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
+    from ..utils.i18n import t
+    from .base_node import BaseNode
+except ImportError:
+    # Fallback for test environment
+    import sys
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.dirname(current_dir)
+    sys.path.insert(0, parent_dir)
+
+    from dci_catalog import DCICatalog, REPORT_COLUMNS
+    from utils.file_utils import get_cache_directory
+    from utils.dir_scanner import scan_directory
+    from utils.fingerprint import tree_fingerprint
+    from utils.enums import CatalogQuery, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
+    from utils.i18n import t
+    from nodes.base_node import BaseNode
+
+
+class DCICatalogQuery(BaseNode):
+    """ComfyUI node for updating and querying a SQLite catalogue of DCI icons"""
+
+    @classmethod
+    def INPUT_TYPES(cls):
+        return {
+            "required": {
+                t("source_path"): ("STRING", {"default": "", "multiline": False}),
+                t("query_type"): (get_enum_ui_options(CatalogQuery, t), {"default": get_enum_default_ui_value(CatalogQuery.MISSING_VARIANTS, t)}),
+            },
+            "optional": {
+                t("database_path"): ("STRING", {"default": "", "multiline": False}),
+                t("file_filter"): ("STRING", {"default": "*.dci", "multiline": False}),
+                t("update_catalog"): ("BOOLEAN", {"default": True}),
+                t("icon_size"): ("INT", {"default": 0, "min": 0, "max": 1024, "step": 1}),
+                t("state"): ("STRING", {"default": "", "multiline": False}),
+                t("tone"): ("STRING", {"default": "", "multiline": False}),
+                t("scale"): ("FLOAT", {"default": 0.0, "min": 0.0, "max": 10.0, "step": 0.25}),
+                t("group_by"): (list(REPORT_COLUMNS), {"default": "format"}),
+                t("limit"): ("INT", {"default": 50, "min": 1, "max": 100000, "step": 1}),
+            }
+        }
+
+    RETURN_TYPES = ("STRING", "STRING_LIST")
+    RETURN_NAMES = (t("catalog_report"), t("icon_paths"))
+    FUNCTION = "execute"
+    CATEGORY = f"DCI/{t('Analysis')}"
+
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        """Fingerprint of the source and the query inputs, so an unchanged query is not run again
+
+        A directory source is covered by the size and mtime of every matching
+        file and a deb file by its own. The database file is added when the
+        catalogue is not updated from the source, as other runs may change it.
+        """
+        inputs = cls._query_inputs(kwargs)
+        source_path, database_path, file_filter, update_catalog = inputs[0], inputs[2], inputs[3], inputs[4]
+        source_path = source_path.strip() if source_path else ""
+
+        paths = []
+        root = None
+        if source_path and os.path.isdir(source_path):
+            root = os.path.abspath(source_path)
+            paths, _ = scan_directory(root, file_filter)
+        elif source_path:
+            paths = [source_path]
+        if not (source_path and update_catalog):
+            paths.append(os.path.abspath(cls._database_path(database_path)))
+        return tree_fingerprint(paths, root, *inputs)
+
+    @staticmethod
+    def _query_inputs(kwargs):
+        """Read the node inputs in _execute_impl order"""
+        # Extract parameters with translation support
+        # Try both translated and original parameter names for compatibility
+        source_path = kwargs.get(t("source_path")) if t("source_path") in kwargs else kwargs.get("source_path", "")
+        query_type_ui = kwargs.get(t("query_type")) if t("query_type") in kwargs else kwargs.get("query_type")
+        query_type = translate_ui_to_enum(query_type_ui, CatalogQuery, t) if query_type_ui else CatalogQuery.MISSING_VARIANTS
+        database_path = kwargs.get(t("database_path")) if t("database_path") in kwargs else kwargs.get("database_path", "")
+        file_filter = kwargs.get(t("file_filter")) if t("file_filter") in kwargs else kwargs.get("file_filter", "*.dci")
+        update_catalog = kwargs.get(t("update_catalog")) if t("update_catalog") in kwargs else kwargs.get("update_catalog", True)
+        icon_size = kwargs.get(t("icon_size")) if t("icon_size") in kwargs else kwargs.get("icon_size", 0)
+        state = kwargs.get(t("state")) if t("state") in kwargs else kwargs.get("state", "")
+        tone = kwargs.get(t("tone")) if t("tone") in kwargs else kwargs.get("tone", "")
+        scale = kwargs.get(t("scale")) if t("scale") in kwargs else kwargs.get("scale", 0.0)
+        group_by = kwargs.get(t("group_by")) if t("group_by") in kwargs else kwargs.get("group_by", "format")
+        limit = kwargs.get(t("limit")) if t("limit") in kwargs else kwargs.get("limit", 50)
+        return (source_path, query_type, database_path, file_filter, update_catalog, icon_size, state, tone, scale,
+                group_by, limit)
+
+    @staticmethod
+    def _database_path(database_path):
+        """The given database path, or the catalogue in the cache directory"""
+        database_path = database_path.strip() if database_path else ""
+        return database_path or os.path.join(get_cache_directory("catalog"), "dci_catalog.db")
+
+    def _execute(self, **kwargs):
+        """Update the catalogue from a directory or deb file and answer a query"""
+        return self._execute_impl(*self._query_inputs(kwargs))
+
+    def _execute_impl(self, source_path="", query_type=CatalogQuery.MISSING_VARIANTS, database_path="", file_filter="*.dci",
+                      update_catalog=True, icon_size=0, state="", tone="", scale=0.0, group_by="format", limit=50):
+        """Update the catalogue from a directory or deb file and answer a query
+
+        icon_size 0, scale 0 and empty state or tone match any variant. With a
+        source_path, queries only cover that source and paths are relative to it.
+        """
+        source_path = source_path.strip() if source_path else ""
+        if source_path and not os.path.exists(source_path):
+            return (f"❌ 错误：路径不存在: {source_path}", [])
+
+        database_path = self._database_path(database_path)
+
+        lines = [f"图标目录数据库: {database_path}"]
+        with DCICatalog(database_path) as catalog:
+            if update_catalog and source_path:
+                stats = catalog.update(source_path, file_filter)
+                print(f"图标目录更新: 扫描 {stats['scanned']} 个, 解析 {stats['parsed']} 个, "
+                      f"未变化 {stats['unchanged']} 个, 删除 {stats['removed']} 个 ({stats['seconds']:.2f}秒)")
+                lines.append(f"更新: 扫描 {stats['scanned']}, 解析 {stats['parsed']}, 未变化 {stats['unchanged']}, "
+                             f"仅时间变化 {stats['rehashed']}, 删除 {stats['removed']}, 无效 {stats['invalid']}")
+
+            source = source_path or None
+            variant = {"size": icon_size or None, "state": state.strip() or None, "tone": tone.strip() or None,
+                       "scale": scale or None}
+            variant_text = "/".join(str(value) if value is not None else "*" for value in variant.values())
+            paths = []
+
+            if query_type == CatalogQuery.MISSING_VARIANTS:
+                rows = catalog.missing_variants(source=source, **variant)
+                paths = [self._display_path(row_source, path, source) for row_source, path in rows]
+                lines.append(f"缺少变体 {variant_text} 的图标: {len(rows)} 个")
+                lines.extend(f"  {path}" for path in paths[:limit])
+            elif query_type == CatalogQuery.COVERAGE:
+                covered, total = catalog.coverage(source=source, **variant)
+                percent = covered * 100.0 / total if total else 0.0
+                lines.append(f"变体 {variant_text} 覆盖率: {covered}/{total} ({percent:.1f}%)")
+                for size, row_state, row_tone, row_scale, icons, layers in catalog.variant_counts(source):
+                    lines.append(f"  {size}/{row_state}.{row_tone}/{row_scale:g}: {icons} 个图标, {layers} 个图层")
+            elif query_type == CatalogQuery.SIZE_REPORT:
+                lines.append(f"按 {group_by} 统计图层体积:")
+                for value, layers, total_bytes, unique_bytes in catalog.size_report(group_by, source):
+                    lines.append(f"  {value}: {layers} 个图层, {total_bytes:,} 字节 (去重后 {unique_bytes:,} 字节)")
+            elif query_type == CatalogQuery.LARGEST_ICONS:
+                rows = catalog.largest_icons(limit, source)
+                paths = [self._display_path(row_source, path, source) for row_source, path, _ in rows]
+                lines.append(f"最大的 {len(rows)} 个图标:")
+                lines.extend(f"  {path}: {size:,} 字节" for path, (_, _, size) in zip(paths, rows))
+
+        return ("\n".join(lines), paths)
+
+    def _display_path(self, row_source, path, source):
+        """Path relative to the queried source, or joined to its source when querying all sources"""
+        return path if source else os.path.join(row_source, path)
@@ -1,14 +1,21 @@
 import os
-import fnmatch
-import tempfile
-import tarfile
 import io
-from PIL import Image
-import torch
-import numpy as np
+import glob
+import pickle
+import shutil
+import tempfile
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 try:
-    from ..utils.file_utils import load_binary_data
+    from ..utils.file_utils import load_binary_data, compile_file_filter
+    from ..utils.ar_archive import ArArchive
+    from ..utils.deb_reader import tar_stream_mode, iter_tar_stream
+    from ..utils.tar_index import tar_compression, index_tar_stream, get_cached_tar_index, cache_tar_index
+    from ..utils.image_utils import decode_image_arrays, batch_image_arrays
+    from ..utils.fingerprint import tree_fingerprint
+    from ..utils.enums import ImageBatchMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
     from ..utils.i18n import t
     from .base_node import BaseNode
 except ImportError:
@@ -19,7 +26,13 @@ except ImportError:
     sys.path.insert(0, parent_dir)
 
     try:
-        from utils.file_utils import load_binary_data
+        from utils.file_utils import load_binary_data, compile_file_filter
+        from utils.ar_archive import ArArchive
+        from utils.deb_reader import tar_stream_mode, iter_tar_stream
+        from utils.tar_index import tar_compression, index_tar_stream, get_cached_tar_index, cache_tar_index
+        from utils.image_utils import decode_image_arrays, batch_image_arrays
+        from utils.fingerprint import tree_fingerprint
+        from utils.enums import ImageBatchMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
         from utils.i18n import t
         from nodes.base_node import BaseNode
     except ImportError as e:
@@ -45,14 +58,39 @@ class DebLoader(BaseNode):
                 t("deb_file_path"): ("STRING", {"default": "", "multiline": False}),
                 t("file_filter"): ("STRING", {"default": "*.dci", "multiline": False}),
                 t("skip_symlinks"): ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                t("max_workers"): ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+                t("memory_budget_mb"): ("INT", {"default": 0, "min": 0, "max": 65536, "step": 64}),
+                t("decode_workers"): ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+                t("image_batch_mode"): (get_enum_ui_options(ImageBatchMode, t), {"default": get_enum_default_ui_value(ImageBatchMode.BUCKET, t)}),
             }
         }
 
-    RETURN_TYPES = ("BINARY_DATA_LIST", "STRING_LIST", "IMAGE", "STRING_LIST", "STRING_LIST")
-    RETURN_NAMES = (t("binary_data_list"), t("relative_paths"), t("image_list"), t("image_relative_paths"), t("skipped_files"))
+    RETURN_TYPES = ("BINARY_DATA_LIST", "STRING_LIST", "IMAGE", "STRING_LIST", "STRING_LIST", "STRING_LIST", "STRING_LIST", "MASK")
+    RETURN_NAMES = (t("binary_data_list"), t("relative_paths"), t("image_list"), t("image_relative_paths"), t("skipped_files"),
+                    t("source_packages"), t("spilled_files"), t("image_masks"))
+    # Images come as one batch per resolution, with a mask batch for each
+    OUTPUT_IS_LIST = (False, False, True, False, False, False, False, True)
     FUNCTION = "execute"
     CATEGORY = f"DCI/{t('Files')}"
 
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        """Fingerprint of the size and mtime of every package to load, plus the filter"""
+        deb_file_path = kwargs.get(t("deb_file_path")) if t("deb_file_path") in kwargs else kwargs.get("deb_file_path", "")
+        file_filter = kwargs.get(t("file_filter")) if t("file_filter") in kwargs else kwargs.get("file_filter", "*.dci")
+        skip_symlinks = kwargs.get(t("skip_symlinks")) if t("skip_symlinks") in kwargs else kwargs.get("skip_symlinks", True)
+        if not deb_file_path:
+            return ""
+
+        node = cls()
+        # A directory or glob input changes when packages are added or removed as well
+        deb_paths = node._resolve_deb_paths(deb_file_path)
+        if deb_paths is None:
+            deb_paths = [node._normalize_cross_platform_path(deb_file_path)]
+        return tree_fingerprint(deb_paths, None, file_filter, skip_symlinks)
+
     def _execute(self, **kwargs):
         """Load files from deb package with filtering"""
         # Extract parameters with translation support
@@ -60,16 +98,38 @@ class DebLoader(BaseNode):
         deb_file_path = kwargs.get(t("deb_file_path")) if t("deb_file_path") in kwargs else kwargs.get("deb_file_path", "")
         file_filter = kwargs.get(t("file_filter")) if t("file_filter") in kwargs else kwargs.get("file_filter", "*.dci")
         skip_symlinks = kwargs.get(t("skip_symlinks")) if t("skip_symlinks") in kwargs else kwargs.get("skip_symlinks", True)
+        max_workers = kwargs.get(t("max_workers")) if t("max_workers") in kwargs else kwargs.get("max_workers", 0)
+        memory_budget_mb = kwargs.get(t("memory_budget_mb")) if t("memory_budget_mb") in kwargs else kwargs.get("memory_budget_mb", 0)
+        decode_workers = kwargs.get(t("decode_workers")) if t("decode_workers") in kwargs else kwargs.get("decode_workers", 0)
+        batch_mode_ui = kwargs.get(t("image_batch_mode")) if t("image_batch_mode") in kwargs else kwargs.get("image_batch_mode")
+        batch_mode = translate_ui_to_enum(batch_mode_ui, ImageBatchMode, t) if batch_mode_ui else ImageBatchMode.BUCKET
 
-        return self._execute_impl(deb_file_path, file_filter, skip_symlinks)
+        return self._execute_impl(deb_file_path, file_filter, skip_symlinks, max_workers, memory_budget_mb, decode_workers,
+                                  batch_mode)
 
-    def _execute_impl(self, deb_file_path="", file_filter="*.dci", skip_symlinks=True):
-        """Load files from deb package with filtering"""
+    def _execute_impl(self, deb_file_path="", file_filter="*.dci", skip_symlinks=True, max_workers=0, memory_budget_mb=0,
+                      decode_workers=0, batch_mode=ImageBatchMode.BUCKET):
+        """Load files from one deb package, or from every package matched by a directory or glob"""
+        empty_result = ([], [], [], [], [], [], [], [])
 
         # Validate deb file path
         if not deb_file_path:
             print("错误：未提供deb文件路径")
-            return ([], [], [], [], [])
+            return empty_result
+
+        # Directory or glob input loads several packages concurrently
+        deb_paths = self._resolve_deb_paths(deb_file_path)
+        if deb_paths is not None:
+            if not deb_paths:
+                print(f"错误：未找到匹配的deb文件: {deb_file_path}")
+                return empty_result
+
+            import time
+            start_time = time.time()
+            entries, skipped_symlinks, spilled_files = self._load_multiple_debs(
+                deb_paths, file_filter, skip_symlinks, max_workers, memory_budget_mb)
+            return self._build_outputs(entries, skipped_symlinks, spilled_files, start_time, time.time() - start_time,
+                                       decode_workers, batch_mode)
 
         # Normalize cross-platform path
         normalized_path = self._normalize_cross_platform_path(deb_file_path)
@@ -77,7 +137,7 @@ class DebLoader(BaseNode):
         # Check if file exists
         if not os.path.exists(normalized_path):
             print(f"错误：deb文件不存在: {normalized_path}")
-            return ([], [], [], [], [])
+            return empty_result
 
         # Log file information
         file_size = os.path.getsize(normalized_path)
@@ -89,70 +149,84 @@ class DebLoader(BaseNode):
         else:
             print("跳过软链接: 禁用")
 
-        # Parse deb file and extract all files
+        # Stream the deb file, reading content only for files that match the filter
         import time
         start_time = time.time()
         try:
-            all_files, skipped_symlinks = self._parse_deb_file(normalized_path, skip_symlinks)
+            matching_files, skipped_symlinks, all_paths = self._parse_deb_file(normalized_path, file_filter, skip_symlinks)
             parse_time = time.time() - start_time
-            print(f"从deb包中提取 {len(all_files)} 个文件 (耗时: {parse_time:.2f}秒)")
+            print(f"deb包共 {len(all_paths)} 个文件，匹配 {len(matching_files)} 个 (耗时: {parse_time:.2f}秒)")
             if skipped_symlinks:
                 print(f"跳过 {len(skipped_symlinks)} 个软链接文件")
                 for symlink in skipped_symlinks:
                     print(f"  ⏭️ {symlink}")
-        except Exception as e:
-            print(f"错误：解析deb文件失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return ([], [], [], [], [])
-
-        # Filter files based on pattern
-        filter_start_time = time.time()
-        try:
-            matching_files = self._filter_files(all_files, file_filter)
-            filter_time = time.time() - filter_start_time
-            print(f"过滤后匹配 {len(matching_files)} 个文件 (耗时: {filter_time:.3f}秒)")
 
             if len(matching_files) == 0:
                 print("警告：没有文件匹配过滤条件")
                 print("可用的文件列表:")
-                for file_path in sorted(all_files.keys())[:10]:  # 只显示前10个
+                for file_path in sorted(all_paths)[:10]:  # 只显示前10个
                     print(f"  {file_path}")
-                if len(all_files) > 10:
-                    print(f"  ... 还有 {len(all_files) - 10} 个文件")
+                if len(all_paths) > 10:
+                    print(f"  ... 还有 {len(all_paths) - 10} 个文件")
         except Exception as e:
-            print(f"错误：文件过滤失败: {str(e)}")
+            print(f"错误：解析deb文件失败: {str(e)}")
             import traceback
             traceback.print_exc()
-            return ([], [], [], [], [])
+            return empty_result
+
+        package_name = os.path.basename(normalized_path)
+        entries = [(package_name, file_path, file_content) for file_path, file_content in matching_files.items()]
+        return self._build_outputs(entries, skipped_symlinks, [], start_time, parse_time, decode_workers, batch_mode)
+
+    def _build_outputs(self, entries, skipped_symlinks, spilled_files, start_time, parse_time, decode_workers=0,
+                       batch_mode=ImageBatchMode.BUCKET):
+        """Decode images and assemble the node outputs from (package, path, content) entries
+
+        Images are decoded on decode_workers threads (0 means one per CPU core)
+        and scaled into preallocated batches, one per resolution or a single
+        padded one. File outputs keep the entry order; image paths follow the
+        batch order.
+        """
+        import time
 
         # Process results
         binary_data_list = []
         relative_paths = []
         image_list = []
         image_relative_paths = []
+        source_packages = []
         successful_loads = 0
         successful_images = 0
         total_bytes = 0
 
         process_start_time = time.time()
-        for file_path, file_content in matching_files.items():
+
+        # Decode every file with an image extension on a thread pool, in entry order
+        image_indices = [i for i, (_, file_path, file_content) in enumerate(entries)
+                         if file_content is not None and self._is_image_file(file_path)]
+        decoded = dict(zip(image_indices, decode_image_arrays([entries[i][2] for i in image_indices], decode_workers)))
+        if image_indices:
+            print(f"并行解码 {len(image_indices)} 个图像文件")
+
+        for index, (package_name, file_path, file_content) in enumerate(entries):
             try:
                 if file_content is not None:
                     binary_data_list.append(file_content)
                     relative_paths.append(file_path)
+                    source_packages.append(package_name)
                     successful_loads += 1
                     total_bytes += len(file_content)
                     print(f"  ✓ 加载成功: {file_path} ({len(file_content):,} 字节)")
 
-                    # Try to decode as image
-                    image_tensor = self._try_decode_image(file_content, file_path)
-                    if image_tensor is not None:
-                        image_list.append(image_tensor)
+                    image_array = decoded.get(index)
+                    if image_array is not None:
+                        image_list.append(image_array)
                         image_relative_paths.append(file_path)
                         successful_images += 1
-                        shape = image_tensor.shape
+                        shape = image_array.shape
                         print(f"    ✓ 图像解码成功: {file_path} (尺寸: {shape[1]}x{shape[0]}x{shape[2]})")
+                    elif index in decoded:
+                        print(f"    ❌ 图像解码失败: {file_path}")
                 else:
                     print(f"  ❌ 文件内容为空: {file_path}")
 
@@ -166,10 +240,12 @@ class DebLoader(BaseNode):
 
         # Summary statistics
         print(f"\n=== 处理结果摘要 ===")
-        print(f"成功加载: {successful_loads}/{len(matching_files)} 个文件")
+        print(f"成功加载: {successful_loads}/{len(entries)} 个文件")
         print(f"成功解码: {successful_images} 个图像文件")
         print(f"总数据量: {total_bytes:,} 字节 ({total_bytes / 1024:.1f} KB)")
-        print(f"处理时间: 解析 {parse_time:.2f}s + 过滤 {filter_time:.3f}s + 处理 {process_time:.3f}s = 总计 {total_time:.2f}s")
+        if spilled_files:
+            print(f"超出内存预算写入磁盘: {len(spilled_files)} 个文件")
+        print(f"处理时间: 解析 {parse_time:.2f}s + 处理 {process_time:.3f}s = 总计 {total_time:.2f}s")
 
         if successful_loads > 0:
             avg_file_size = total_bytes / successful_loads
@@ -177,12 +253,109 @@ class DebLoader(BaseNode):
 
         # Convert image list to ComfyUI format or empty list
         if image_list:
-            # Stack all images into a batch tensor
-            images_tensor = torch.stack(image_list, dim=0)
-            print(f"图像批次张量形状: {images_tensor.shape}")
-            return (binary_data_list, relative_paths, images_tensor, image_relative_paths, skipped_symlinks)
+            image_batches, image_masks, order = batch_image_arrays(image_list, batch_mode == ImageBatchMode.PAD,
+                                                                   workers=decode_workers)
+            image_relative_paths = [image_relative_paths[i] for i in order]
+            for batch in image_batches:
+                print(f"图像批次张量形状: {tuple(batch.shape)}")
+            return (binary_data_list, relative_paths, image_batches, image_relative_paths, skipped_symlinks,
+                    source_packages, spilled_files, image_masks)
         else:
-            return (binary_data_list, relative_paths, [], [], skipped_symlinks)
+            return (binary_data_list, relative_paths, [], [], skipped_symlinks, source_packages, spilled_files, [])
+
+    def _resolve_deb_paths(self, deb_file_path):
+        """Return the deb files for a directory or glob input, or None for a single package path"""
+        path = deb_file_path.strip()
+        if os.path.isdir(path):
+            return sorted(glob.glob(os.path.join(glob.escape(path), "*.deb")))
+        if glob.has_magic(path):
+            return sorted(p for p in glob.glob(path, recursive=True) if os.path.isfile(p))
+        return None
+
+    def _load_multiple_debs(self, deb_paths, file_filter, skip_symlinks=True, max_workers=0, memory_budget_mb=0):
+        """Parse several deb files in a process pool and merge their files in package order
+
+        Returns (entries, skipped_symlinks, spilled_files), where entries are
+        (package name, relative path, content). With a memory budget the workers
+        stage matching files on disk and only files within the budget are read
+        back; the rest stay on disk and are returned as spilled_files.
+        """
+        import time
+        start_time = time.time()
+
+        worker_count = max_workers if max_workers and max_workers > 0 else (os.cpu_count() or 1)
+        worker_count = max(1, min(worker_count, len(deb_paths)))
+        print(f"多包模式: {len(deb_paths)} 个deb文件, {worker_count} 个进程")
+
+        staging_dir = None
+        if memory_budget_mb and memory_budget_mb > 0:
+            staging_dir = tempfile.mkdtemp(prefix="dci_deb_", dir=self._get_spill_root())
+            print(f"内存预算: {memory_budget_mb} MB, 溢出目录: {staging_dir}")
+
+        tasks = [(path, file_filter, skip_symlinks,
+                  os.path.join(staging_dir, f"{i:04d}_{os.path.basename(path)}") if staging_dir else None)
+                 for i, path in enumerate(deb_paths)]
+
+        results = None
+        if worker_count > 1:
+            try:
+                with ProcessPoolExecutor(max_workers=worker_count) as executor:
+                    results = list(executor.map(_load_deb_package, *zip(*tasks)))
+            except (BrokenProcessPool, OSError, pickle.PicklingError) as e:
+                print(f"警告：进程池不可用，改为顺序解析: {str(e)}")
+        if results is None:
+            results = [_load_deb_package(*task) for task in tasks]
+
+        entries = []
+        skipped_symlinks = []
+        spilled_files = []
+        budget = memory_budget_mb * 1024 * 1024 if staging_dir else None
+        in_memory_bytes = 0
+
+        print("\n=== 多包解析报告 ===")
+        for result in results:
+            package_name = os.path.basename(result["package"])
+            if result.get("error"):
+                print(f"  ❌ {package_name}: {result['error']}")
+                continue
+
+            package_bytes = 0
+            package_spilled_bytes = 0
+            for relative_path, content, staged_path, size in result["files"]:
+                if staged_path is not None:
+                    # Read staged files back in package order until the budget is used up
+                    if spilled_files or in_memory_bytes + size > budget:
+                        spilled_files.append(staged_path)
+                        package_spilled_bytes += size
+                        continue
+                    with open(staged_path, 'rb') as f:
+                        content = f.read()
+                    os.remove(staged_path)
+                entries.append((package_name, relative_path, content))
+                in_memory_bytes += size
+                package_bytes += size
+
+            skipped_symlinks.extend(f"{package_name}:{path}" for path in result["skipped"])
+            print(f"  {package_name}: {len(result['files'])}/{result['file_count']} 个文件匹配, "
+                  f"内存 {package_bytes:,} 字节, 磁盘 {package_spilled_bytes:,} 字节, 耗时 {result['time']:.2f}秒")
+
+        wall_time = time.time() - start_time
+        worker_time = sum(result["time"] for result in results)
+        print(f"总计: {len(entries)} 个文件在内存中, {len(spilled_files)} 个文件写入磁盘, {in_memory_bytes:,} 字节")
+        print(f"解析耗时: 累计 {worker_time:.2f}秒, 实际 {wall_time:.2f}秒 (加速 {worker_time / max(wall_time, 1e-6):.1f}x)")
+
+        if staging_dir and not spilled_files:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+        return entries, skipped_symlinks, spilled_files
+
+    def _get_spill_root(self):
+        """Directory for files that exceed the memory budget"""
+        try:
+            import folder_paths
+            return folder_paths.get_temp_directory()
+        except Exception:
+            return tempfile.gettempdir()
 
     def _normalize_cross_platform_path(self, path):
         """Normalize path for cross-platform compatibility"""
@@ -228,349 +401,197 @@ class DebLoader(BaseNode):
             print(f"路径规范化失败: {str(e)}")
             return path
 
-    def _parse_deb_file(self, deb_file_path, skip_symlinks=True):
-        """Parse deb file and extract all files using pure Python implementation"""
-        all_files = {}
-        skipped_symlinks = []
-
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                print(f"创建临时目录: {temp_dir}")
-
-                # Extract deb package using pure Python ar implementation
-                extract_dir = os.path.join(temp_dir, "extract")
-                os.makedirs(extract_dir)
-
-                # Extract ar archive using pure Python
-                print("开始解析ar归档...")
-                if not self._extract_ar_archive_python(deb_file_path, extract_dir):
-                    print("错误：无法解压deb包")
-                    return all_files, skipped_symlinks
-
-                # List extracted files
-                extracted_files = os.listdir(extract_dir)
-                print(f"ar归档解析完成，提取了 {len(extracted_files)} 个文件:")
-                for filename in extracted_files:
-                    file_path = os.path.join(extract_dir, filename)
-                    file_size = os.path.getsize(file_path)
-                    print(f"  {filename}: {file_size:,} 字节")
-
-                # Parse control.tar.*
-                control_files = [f for f in extracted_files if f.startswith("control.tar")]
-                if control_files:
-                    control_tar = os.path.join(extract_dir, control_files[0])
-                    print(f"解析控制归档: {control_files[0]}")
-                    control_file_dict, control_symlinks = self._extract_tar_files(control_tar, "control", skip_symlinks)
-                    all_files.update(control_file_dict)
-                    skipped_symlinks.extend(control_symlinks)
-                    print(f"从control.tar中提取 {len(control_file_dict)} 个文件")
-                    if control_symlinks:
-                        print(f"从control.tar中跳过 {len(control_symlinks)} 个软链接")
-                else:
-                    print("警告：未找到control.tar文件")
-
-                # Parse data.tar.*
-                data_files_list = [f for f in extracted_files if f.startswith("data.tar")]
-                if data_files_list:
-                    data_tar = os.path.join(extract_dir, data_files_list[0])
-                    print(f"解析数据归档: {data_files_list[0]}")
-                    data_file_dict, data_symlinks = self._extract_tar_files(data_tar, "data", skip_symlinks)
-                    all_files.update(data_file_dict)
-                    skipped_symlinks.extend(data_symlinks)
-                    print(f"从data.tar中提取 {len(data_file_dict)} 个文件")
-                    if data_symlinks:
-                        print(f"从data.tar中跳过 {len(data_symlinks)} 个软链接")
-                else:
-                    print("警告：未找到data.tar文件")
-
-                print(f"deb包解析完成，总计提取 {len(all_files)} 个文件")
-
-        except Exception as e:
-            print(f"错误：解析deb文件失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
-
-        return all_files, skipped_symlinks
+    def _parse_deb_file(self, deb_file_path, file_filter="*.dci", skip_symlinks=True, store=None):
+        """Stream the control and data archives of a deb file in place
 
-    def _extract_ar_archive_python(self, deb_file_path, extract_dir):
-        """Extract ar archive using pure Python implementation"""
-        try:
-            print("使用纯Python实现解析ar归档...")
-            file_count = 0
-            total_extracted_size = 0
-
-            with open(deb_file_path, 'rb') as f:
-                # Read ar header
-                magic = f.read(8)
-                if magic != b'!<arch>\n':
-                    print(f"错误：不是有效的ar归档文件，魔数: {magic}")
-                    return False
-
-                print("✓ ar归档魔数验证通过")
-
-                while True:
-                    # Read file header (60 bytes)
-                    header_pos = f.tell()
-                    header = f.read(60)
-                    if len(header) < 60:
-                        print(f"到达文件末尾，位置: {header_pos}")
-                        break
-
-                    # Parse header fields
-                    filename_raw = header[0:16].decode('ascii')
-                    date_field = header[16:28].decode('ascii').strip()
-                    uid_field = header[28:34].decode('ascii').strip()
-                    gid_field = header[34:40].decode('ascii').strip()
-                    mode_field = header[40:48].decode('ascii').strip()
-                    size_str = header[48:58].decode('ascii').strip()
-                    end_marker = header[58:60]
-
-                    # Clean filename
-                    filename = filename_raw.strip().rstrip('/')
-
-                    print(f"\n--- 解析文件头 #{file_count + 1} (位置: {header_pos}) ---")
-                    print(f"原始文件名: '{filename_raw}' -> 清理后: '{filename}'")
-                    print(f"日期: {date_field}, UID: {uid_field}, GID: {gid_field}")
-                    print(f"权限: {mode_field}, 结束标记: {end_marker}")
-
-                    if not size_str:
-                        print("警告：文件大小字段为空，跳过")
-                        break
-
-                    try:
-                        size = int(size_str)
-                        print(f"文件大小: {size:,} 字节")
-                    except ValueError:
-                        print(f"错误：无效的文件大小: '{size_str}'")
-                        break
-
-                    # Read file content
-                    content_pos = f.tell()
-                    content = f.read(size)
-                    if len(content) != size:
-                        print(f"警告：读取的内容大小 ({len(content)}) 与预期不符 ({size})")
-
-                    # Pad to even boundary
-                    if size % 2 == 1:
-                        padding = f.read(1)
-                        print(f"读取填充字节: {padding}")
-
-                    # Save file
-                    if filename and not filename.startswith('/'):
-                        output_path = os.path.join(extract_dir, filename)
-                        try:
-                            with open(output_path, 'wb') as out_f:
-                                out_f.write(content)
-                            file_count += 1
-                            total_extracted_size += size
-                            print(f"✓ 提取文件: {filename} ({size:,} 字节) -> {output_path}")
-                        except Exception as e:
-                            print(f"❌ 保存文件失败: {filename} - {str(e)}")
-                    else:
-                        print(f"⏭️ 跳过文件: '{filename}' (无效文件名)")
-
-            print(f"\n=== ar归档解析完成 ===")
-            print(f"提取文件数量: {file_count}")
-            print(f"总提取大小: {total_extracted_size:,} 字节 ({total_extracted_size / 1024:.1f} KB)")
-            return True
-
-        except Exception as e:
-            print(f"Python ar解析失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return False
-
-    def _extract_tar_files(self, tar_path, tar_type, skip_symlinks=True):
-        """Extract all files from a tar archive"""
+        Returns (matching_files, skipped_symlinks, all_paths), where only files
+        matching file_filter have their content read. With a store, such as
+        _StagedFiles, each matching file is passed to store.add as it is read
+        instead of being collected in matching_files, and the tarballs are
+        streamed without an index, so only one member is held in memory.
+        """
+        matching_files = {}
+        skipped_symlinks = []
+        all_paths = []
+
+        # Compile the filter once; it is applied to each member during tar iteration
+        matches = compile_file_filter(file_filter)
+
+        stat = os.stat(deb_file_path)
+        with ArArchive(deb_file_path) as archive:
+            members = archive.members
+            print(f"ar归档包含 {len(members)} 个成员:")
+            for name, (offset, size) in members.items():
+                print(f"  {name}: {size:,} 字节 (偏移: {offset})")
+
+            for tar_type in ("control", "data"):
+                tar_names = [name for name in members if name.startswith(f"{tar_type}.tar")]
+                if not tar_names:
+                    print(f"警告：未找到{tar_type}.tar文件")
+                    continue
+
+                print(f"解析{tar_type}归档: {tar_names[0]}")
+                cache_key = None
+                if store is None:
+                    cache_key = (os.path.abspath(deb_file_path), stat.st_size, stat.st_mtime_ns, tar_names[0])
+                files_dict, symlinks, paths = self._read_tar_stream(
+                    archive.open(tar_names[0]), tar_names[0], tar_type, matches, skip_symlinks, cache_key, store)
+                matching_files.update(files_dict)
+                skipped_symlinks.extend(symlinks)
+                all_paths.extend(paths)
+
+        read_count = len(matching_files) if store is None else len(store.files)
+        print(f"deb包解析完成，共 {len(all_paths)} 个文件，读取 {read_count} 个匹配文件")
+        return matching_files, skipped_symlinks, all_paths
+
+    def _read_tar_stream(self, fileobj, member_name, tar_type, matches, skip_symlinks=True, cache_key=None,
+                         store=None):
+        """Read matching files from a tar archive
+
+        Hardlinks are installed as regular files, so they are read with the
+        content of their target regardless of skip_symlinks. Returns
+        (files_dict, skipped_symlinks, all_paths); files go to store.add
+        instead of files_dict when a store is given.
+        """
         files_dict = {}
         skipped_symlinks = []
-
-        try:
-            print(f"开始解析 {tar_type}.tar 文件: {tar_path}")
-
-            # Determine compression type and open accordingly
-            compression_type = "未压缩"
-            if tar_path.endswith('.gz'):
-                tar_file = tarfile.open(tar_path, 'r:gz')
-                compression_type = "gzip"
-            elif tar_path.endswith('.xz'):
-                tar_file = tarfile.open(tar_path, 'r:xz')
-                compression_type = "xz"
-            elif tar_path.endswith('.bz2'):
-                tar_file = tarfile.open(tar_path, 'r:bz2')
-                compression_type = "bzip2"
-            else:
-                tar_file = tarfile.open(tar_path, 'r')
-
-            print(f"压缩格式: {compression_type}")
-
-            with tar_file:
-                members = tar_file.getmembers()
-                print(f"tar归档包含 {len(members)} 个条目")
-
-                file_count = 0
-                dir_count = 0
-                symlink_count = 0
-                hardlink_count = 0
-                total_size = 0
-
-                for i, member in enumerate(members):
-                    print(f"\n--- 处理条目 #{i + 1}: {member.name} ---")
-                    print(f"类型: ", end="")
-
-                    if member.isfile():
-                        print(f"普通文件 (大小: {member.size:,} 字节)")
-                        file_count += 1
-                        total_size += member.size
-                    elif member.isdir():
-                        print("目录")
-                        dir_count += 1
-                    elif member.islnk():
-                        print(f"硬链接 -> {member.linkname}")
-                        hardlink_count += 1
-                    elif member.issym():
-                        print(f"软链接 -> {member.linkname}")
-                        symlink_count += 1
-                    else:
-                        print(f"其他类型 (tarfile类型: {member.type})")
-
-                    print(f"权限: {oct(member.mode)}, UID: {member.uid}, GID: {member.gid}")
-                    print(f"修改时间: {member.mtime}")
-
-                    # Check if it's a symlink and should be skipped
-                    if skip_symlinks and (member.islnk() or member.issym()):
-                        clean_path = member.name.lstrip('./')
-                        skipped_symlinks.append(clean_path)
-                        if member.islnk():
-                            print(f"  ⏭️ 跳过硬链接: {clean_path} -> {member.linkname}")
-                        else:
-                            print(f"  ⏭️ 跳过软链接: {clean_path} -> {member.linkname}")
-                        continue
-
-                    if member.isfile():
-                        try:
-                            print(f"  📄 开始提取文件内容...")
-                            file_content = tar_file.extractfile(member).read()
-                            # Use relative path without leading './'
-                            clean_path = member.name.lstrip('./')
-                            files_dict[clean_path] = file_content
-                            print(f"  ✓ 提取成功: {clean_path} ({len(file_content):,} 字节)")
-                        except Exception as e:
-                            print(f"  ❌ 提取失败: {member.name} - {str(e)}")
-                            files_dict[member.name.lstrip('./')] = None
-                    else:
-                        print(f"  ⏭️ 跳过非文件条目")
-
-                print(f"\n=== {tar_type}.tar 解析完成 ===")
-                print(f"总条目: {len(members)} (文件: {file_count}, 目录: {dir_count}, 软链接: {symlink_count}, 硬链接: {hardlink_count})")
-                print(f"提取文件: {len(files_dict)} 个")
-                print(f"跳过链接: {len(skipped_symlinks)} 个")
-                print(f"总文件大小: {total_size:,} 字节 ({total_size / 1024:.1f} KB)")
-
-        except Exception as e:
-            print(f"错误：解析{tar_type}.tar失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
-
-        return files_dict, skipped_symlinks
-
-    def _filter_files(self, all_files, file_filter):
-        """Filter files based on the filter pattern"""
-        matching_files = {}
-
-        try:
-            print(f"开始文件过滤，过滤器: '{file_filter}'")
-
-            # Parse filter patterns
-            patterns = [pattern.strip() for pattern in file_filter.replace(';', ',').split(',')]
-            print(f"解析的过滤模式: {patterns}")
-
-            matched_count = 0
-            for file_path, file_content in all_files.items():
-                # Get filename from path
-                filename = os.path.basename(file_path)
-
-                # Check if filename matches any pattern
-                is_match = self._matches_filter(filename, patterns)
-
-                if is_match:
-                    matching_files[file_path] = file_content
-                    matched_count += 1
-                    print(f"  ✓ 匹配: {file_path} (文件名: {filename})")
+        all_paths = []
+        file_count = 0
+        dir_count = 0
+        link_count = 0
+        read_count = 0
+        total_size = 0
+
+        def select(member):
+            return matches(member.name.lstrip('./'))
+
+        link_content = store.read if store is not None else None
+        for member, content in self._iter_tar_entries(fileobj, member_name, select, cache_key, link_content):
+            # Use relative path without leading './'
+            clean_path = member.name.lstrip('./')
+
+            if member.issym():
+                link_count += 1
+                if skip_symlinks:
+                    skipped_symlinks.append(clean_path)
+                    print(f"  ⏭️ 跳过链接: {clean_path} -> {member.linkname}")
+                continue
+
+            if member.isdir():
+                dir_count += 1
+                continue
+
+            if member.islnk():
+                link_count += 1
+                if content is None and select(member):
+                    # A stream pass only keeps the data of selected files
+                    print(f"  ⚠️ 硬链接目标未匹配过滤条件，无法读取: {clean_path} -> {member.linkname}")
+            elif not member.isfile():
+                continue
+
+            file_count += 1
+            total_size += member.size
+            all_paths.append(clean_path)
+            if content is not None:
+                if store is not None:
+                    store.add(clean_path, content)
                 else:
-                    print(f"  ❌ 不匹配: {file_path} (文件名: {filename})")
-
-            print(f"过滤完成: {matched_count}/{len(all_files)} 个文件匹配")
-
-        except Exception as e:
-            print(f"错误：文件过滤失败: {str(e)}")
-            import traceback
-            traceback.print_exc()
-
-        return matching_files
-
-    def _matches_filter(self, filename, patterns):
-        """Check if filename matches any of the filter patterns"""
-        try:
-            for pattern in patterns:
-                if pattern and fnmatch.fnmatch(filename, pattern):
-                    print(f"    ✓ 文件名 '{filename}' 匹配模式 '{pattern}'")
-                    return True
-            print(f"    ❌ 文件名 '{filename}' 不匹配任何模式 {patterns}")
-            return False
+                    files_dict[clean_path] = content
+                read_count += 1
+                print(f"  ✓ 读取成功: {clean_path} ({len(content):,} 字节)")
+
+        print(f"=== {tar_type}.tar 解析完成 ===")
+        print(f"文件: {file_count}, 目录: {dir_count}, 链接: {link_count}")
+        print(f"读取文件: {read_count} 个, 跳过链接: {len(skipped_symlinks)} 个")
+        print(f"总文件大小: {total_size:,} 字节 ({total_size / 1024:.1f} KB)")
+
+        return files_dict, skipped_symlinks, all_paths
+
+    def _iter_tar_entries(self, fileobj, member_name, select, cache_key=None, link_content=None):
+        """Return (member, content) pairs, using a cached seekable index when available
+
+        The first read of a tarball streams it once and caches its member index,
+        later reads of the same unchanged package only decompress the windows
+        around the selected members. Without a cache_key the tarball is
+        streamed lazily, resolving hardlinks through link_content if given.
+        """
+        index = get_cached_tar_index(cache_key) if cache_key else None
+        if index is not None:
+            print(f"使用缓存的tar索引: {member_name} ({len(index.members)} 个条目, {len(index.checkpoints)} 个检查点)")
+            return index.read_entries(fileobj, select)
+
+        if cache_key and tar_compression(member_name):
+            try:
+                index, entries = index_tar_stream(fileobj, member_name, select)
+                cache_tar_index(cache_key, index)
+                print(f"已建立tar索引: {member_name} ({len(index.checkpoints)} 个检查点)")
+                return entries
+            except ValueError as e:
+                print(f"警告：无法建立tar索引，改用流式读取: {str(e)}")
 
-        except Exception as e:
-            print(f"警告：过滤器模式匹配失败: {str(e)}")
-            return False
+        mode = tar_stream_mode(member_name)
+        print(f"开始流式解析 {member_name} (模式: {mode})")
+        return iter_tar_stream(fileobj, mode, select, link_content)
 
     def _is_image_file(self, filename):
         """Check if file is a supported image format"""
         image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.tif', '.webp', '.ico'}
         _, ext = os.path.splitext(filename.lower())
-        is_image = ext in image_extensions
-        print(f"    图像格式检查: {filename} -> 扩展名: {ext} -> 是图像: {is_image}")
-        return is_image
-
-    def _try_decode_image(self, binary_data, relative_path):
-        """Try to decode binary data as an image and convert to ComfyUI format"""
-        try:
-            print(f"    🖼️ 尝试解码图像: {relative_path}")
-
-            # Check if file extension suggests it's an image
-            if not self._is_image_file(relative_path):
-                print(f"    ⏭️ 跳过非图像文件: {relative_path}")
-                return None
-
-            print(f"    📊 图像数据大小: {len(binary_data):,} 字节")
-
-            # Try to open image with PIL
-            image_stream = io.BytesIO(binary_data)
-            pil_image = Image.open(image_stream)
-
-            original_mode = pil_image.mode
-            original_size = pil_image.size
-            print(f"    ✓ PIL图像加载成功: 模式={original_mode}, 尺寸={original_size}")
-
-            # Convert to RGB if necessary (handle RGBA, grayscale, etc.)
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-                print(f"    🔄 颜色模式转换: {original_mode} -> RGB")
-
-            # Convert PIL image to numpy array
-            image_array = np.array(pil_image)
-            print(f"    📊 NumPy数组形状: {image_array.shape}, 数据类型: {image_array.dtype}")
+        return ext in image_extensions
+
+
+class _StagedFiles:
+    """Matching files of one package, written below a staging directory as they are read"""
+
+    def __init__(self, staging_dir):
+        self.staging_dir = staging_dir
+        # (relative path, None, staged path, size) in archive order
+        self.files = []
+        self._staged_paths = {}
+
+    def add(self, relative_path, content):
+        # Member names come from the archive, keep them inside staging_dir
+        safe_path = os.path.normpath(relative_path).lstrip(os.sep)
+        if safe_path.startswith(os.pardir):
+            return
+        staged_path = os.path.join(self.staging_dir, safe_path)
+        os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+        with open(staged_path, 'wb') as f:
+            f.write(content)
+        self._staged_paths[relative_path] = staged_path
+        self.files.append((relative_path, None, staged_path, len(content)))
+
+    def read(self, member_name):
+        """Content of a staged hardlink target, or None if it was not staged"""
+        staged_path = self._staged_paths.get(member_name.lstrip('./'))
+        if staged_path is None:
+            return None
+        with open(staged_path, 'rb') as f:
+            return f.read()
 
-            # Convert to ComfyUI format: (H, W, C) with values in [0, 1]
-            image_array = image_array.astype(np.float32) / 255.0
-            print(f"    🔄 数据类型转换: uint8 -> float32, 范围: [0, 255] -> [0, 1]")
 
-            # Convert to PyTorch tensor
-            image_tensor = torch.from_numpy(image_array)
-            print(f"    ✓ PyTorch张量创建成功: 形状={image_tensor.shape}, 数据类型={image_tensor.dtype}")
+def _load_deb_package(deb_path, file_filter, skip_symlinks=True, staging_dir=None):
+    """Process pool worker that parses one deb file
 
-            return image_tensor
+    Matching files are returned inline, or streamed below staging_dir as they
+    are read and returned by path when staging_dir is set, so a worker holds
+    one member at a time. Errors are returned, not raised.
+    """
+    import time
+    start_time = time.time()
+    try:
+        store = _StagedFiles(staging_dir) if staging_dir is not None else None
+        # Per-file logs from concurrent workers would interleave, the parent prints a summary
+        with contextlib.redirect_stdout(io.StringIO()):
+            matching_files, skipped_symlinks, all_paths = DebLoader()._parse_deb_file(
+                deb_path, file_filter, skip_symlinks, store)
+
+        if store is not None:
+            files = store.files
+        else:
+            files = [(relative_path, content, None, len(content)) for relative_path, content in matching_files.items()]
 
-        except Exception as e:
-            # Not an image or failed to decode, silently ignore
-            print(f"    ❌ 图像解码失败: {relative_path} - {str(e)}")
-            return None
+        return {"package": deb_path, "files": files, "skipped": skipped_symlinks,
+                "file_count": len(all_paths), "time": time.time() - start_time}
+    except Exception as e:
+        return {"package": deb_path, "error": str(e), "time": time.time() - start_time}
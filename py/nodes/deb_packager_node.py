@@ -3,16 +3,25 @@ import tempfile
 import shutil
 import tarfile
 import gzip
-import fnmatch
 import re
 import struct
 import time
+import io
+import hashlib
+import json
+import posixpath
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 try:
     from ..utils.file_utils import load_binary_data, ensure_directory
     from ..utils.i18n import t
+    from ..utils.parallel_compress import ParallelGzipWriter, ParallelXzWriter
+    from ..utils.ar_archive import ArArchive, ArWriter
+    from ..utils.dir_scanner import scan_directory
+    from ..utils.deb_reader import tar_stream_mode, iter_tar_stream
+    from ..utils.enums import DebCompression, DedupMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
     from .base_node import BaseNode
 except ImportError:
     # Fallback for test environment
@@ -24,6 +33,11 @@ except ImportError:
     try:
         from utils.file_utils import load_binary_data, ensure_directory
         from utils.i18n import t
+        from utils.parallel_compress import ParallelGzipWriter, ParallelXzWriter
+        from utils.ar_archive import ArArchive, ArWriter
+        from utils.dir_scanner import scan_directory
+        from utils.deb_reader import tar_stream_mode, iter_tar_stream
+        from utils.enums import DebCompression, DedupMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
         from nodes.base_node import BaseNode
     except ImportError as e:
         print(f"Warning: Could not import required modules in deb_packager_node: {e}")
@@ -41,6 +55,161 @@ except ImportError:
         class BaseNode:
             pass
 
+# Block size for hashing and copying source files
+HASH_BUFFER_SIZE = 1024 * 1024
+# Files up to this size are read and hashed ahead on worker threads, larger ones are streamed
+PREFETCH_FILE_LIMIT = 4 * 1024 * 1024
+
+def _read_and_hash(file_path, with_sha256=False):
+    """Read a file, returning (content, md5 hex digest, sha256 hex digest or None)
+
+    hashlib releases the GIL on large buffers, so several files are hashed in
+    parallel when this runs on a thread pool.
+    """
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256() if with_sha256 else None
+    blocks = []
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            md5.update(block)
+            if sha256:
+                sha256.update(block)
+            blocks.append(block)
+    return b"".join(blocks), md5.hexdigest(), sha256.hexdigest() if sha256 else None
+
+class _HashingReader:
+    """File wrapper that updates md5 (and optionally sha256) digests with every block read from it"""
+
+    def __init__(self, fileobj, with_sha256=False):
+        self._fileobj = fileobj
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256() if with_sha256 else None
+
+    def read(self, size=-1):
+        data = self._fileobj.read(size)
+        self._md5.update(data)
+        if self._sha256:
+            self._sha256.update(data)
+        return data
+
+    def hexdigest(self):
+        return self._md5.hexdigest()
+
+    def sha256_hexdigest(self):
+        return self._sha256.hexdigest() if self._sha256 else None
+
+class _CountingWriter:
+    """Pass-through file wrapper for uncompressed output with the compressed writers' interface"""
+
+    def __init__(self, fileobj):
+        self._fileobj = fileobj
+        self._size = 0
+
+    def write(self, data):
+        self._fileobj.write(data)
+        self._size += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._size
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class _SegmentCache:
+    """Build cache of compressed data.tar segments for incremental packaging
+
+    Segments are gzip members holding one file's tar header and data, stored
+    under segments/ by a key of content hash, mode, path, mtime and level, the
+    fields of the cached tar header. manifest.json
+    maps source files to their last seen size, mtime and digests (so unchanged
+    files are not re-read) and segment keys to their uncompressed size.
+    """
+
+    MANIFEST_VERSION = 1
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.segment_dir = os.path.join(cache_dir, "segments")
+        os.makedirs(self.segment_dir, exist_ok=True)
+
+        self.files = {}
+        self.segments = {}
+        manifest_path = os.path.join(cache_dir, "manifest.json")
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.MANIFEST_VERSION:
+                self.files = manifest.get("files", {})
+                self.segments = manifest.get("segments", {})
+        except (OSError, ValueError):
+            pass
+
+        self._used_files = {}
+        self._used_segments = {}
+
+    def file_digests(self, file_path):
+        """Return (sha256, md5) of a file, reusing the manifest entry if size and mtime are unchanged"""
+        stat = os.stat(file_path)
+        entry = self.files.get(file_path)
+        if not entry or entry.get("size") != stat.st_size or entry.get("mtime_ns") != stat.st_mtime_ns:
+            sha256 = hashlib.sha256()
+            md5 = hashlib.md5()
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+                    sha256.update(block)
+                    md5.update(block)
+            entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                     "sha256": sha256.hexdigest(), "md5": md5.hexdigest()}
+
+        self._used_files[file_path] = entry
+        return entry["sha256"], entry["md5"]
+
+    def segment_key(self, sha256, file_mode, data_path, mtime, compression_level):
+        """Key of the segment for a file's content, mode, path and mtime at a compression level"""
+        return hashlib.sha256(f"{sha256}\0{file_mode:o}\0{data_path}\0{mtime}\0{compression_level}"
+                              .encode('utf-8')).hexdigest()
+
+    def segment_path(self, key):
+        return os.path.join(self.segment_dir, key[:2], key + ".gz")
+
+    def lookup(self, key):
+        """Return (segment path, uncompressed size) of a cached segment, or None"""
+        path = self.segment_path(key)
+        if key in self.segments and os.path.exists(path):
+            self._used_segments[key] = self.segments[key]
+            return path, self.segments[key]
+        return None
+
+    def store(self, key, data, raw_size):
+        """Save a compressed segment"""
+        path = self.segment_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", 'wb') as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+        self._used_segments[key] = raw_size
+
+    def save(self):
+        """Write the manifest for this build and delete segments it no longer references"""
+        for key in set(self.segments) - set(self._used_segments):
+            try:
+                os.remove(self.segment_path(key))
+            except OSError:
+                pass
+
+        manifest_path = os.path.join(self.cache_dir, "manifest.json")
+        with open(manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"version": self.MANIFEST_VERSION, "files": self._used_files,
+                       "segments": self._used_segments}, f)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
 class DebPackager(BaseNode):
     """ComfyUI node for creating Debian packages with file filtering and directory scanning"""
 
@@ -63,11 +232,21 @@ class DebPackager(BaseNode):
                 t("package_description"): ("STRING", {"default": "", "multiline": True}),
                 t("symlink_csv_path"): ("STRING", {"default": "", "multiline": False}),
                 t("file_permissions"): ("STRING", {"default": "644", "multiline": False}),
+                t("data_compression"): (get_enum_ui_options(DebCompression, t), {"default": get_enum_default_ui_value(DebCompression.GZIP, t)}),
+                t("compression_level"): ("INT", {"default": 6, "min": 1, "max": 9, "step": 1}),
+                t("xz_preset"): ("INT", {"default": 6, "min": 0, "max": 9, "step": 1}),
+                t("compression_workers"): ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+                t("incremental_build"): ("BOOLEAN", {"default": False}),
+                t("deduplicate_files"): (get_enum_ui_options(DedupMode, t), {"default": get_enum_default_ui_value(DedupMode.NONE, t)}),
+                t("sha256_manifest"): ("BOOLEAN", {"default": False}),
+                t("exclude_filter"): ("STRING", {"default": "", "multiline": False}),
+                t("max_depth"): ("INT", {"default": -1, "min": -1, "max": 256, "step": 1}),
+                t("scan_workers"): ("INT", {"default": 1, "min": 1, "max": 64, "step": 1}),
             }
         }
 
-    RETURN_TYPES = ("STRING", "STRING_LIST")
-    RETURN_NAMES = (t("saved_deb_path"), t("file_list"))
+    RETURN_TYPES = ("STRING", "STRING_LIST", "STRING")
+    RETURN_NAMES = (t("saved_deb_path"), t("file_list"), t("build_summary"))
     FUNCTION = "execute"
     CATEGORY = f"DCI/{t('Files')}"
     OUTPUT_NODE = True
@@ -89,33 +268,52 @@ class DebPackager(BaseNode):
         package_description = kwargs.get(t("package_description")) if t("package_description") in kwargs else kwargs.get("package_description", "")
         symlink_csv_path = kwargs.get(t("symlink_csv_path")) if t("symlink_csv_path") in kwargs else kwargs.get("symlink_csv_path", "")
         file_permissions = kwargs.get(t("file_permissions")) if t("file_permissions") in kwargs else kwargs.get("file_permissions", "644")
+        compression_level = kwargs.get(t("compression_level")) if t("compression_level") in kwargs else kwargs.get("compression_level", 6)
+        compression_workers = kwargs.get(t("compression_workers")) if t("compression_workers") in kwargs else kwargs.get("compression_workers", 0)
+        xz_preset = kwargs.get(t("xz_preset")) if t("xz_preset") in kwargs else kwargs.get("xz_preset", 6)
+        incremental_build = kwargs.get(t("incremental_build")) if t("incremental_build") in kwargs else kwargs.get("incremental_build", False)
+        sha256_manifest = kwargs.get(t("sha256_manifest")) if t("sha256_manifest") in kwargs else kwargs.get("sha256_manifest", False)
+        exclude_filter = kwargs.get(t("exclude_filter")) if t("exclude_filter") in kwargs else kwargs.get("exclude_filter", "")
+        max_depth = kwargs.get(t("max_depth")) if t("max_depth") in kwargs else kwargs.get("max_depth", -1)
+        scan_workers = kwargs.get(t("scan_workers")) if t("scan_workers") in kwargs else kwargs.get("scan_workers", 1)
+
+        # Convert UI value to enum for type safety
+        data_compression_ui = kwargs.get(t("data_compression")) if t("data_compression") in kwargs else kwargs.get("data_compression")
+        data_compression = translate_ui_to_enum(data_compression_ui, DebCompression, t) if data_compression_ui else DebCompression.GZIP
+        dedup_mode_ui = kwargs.get(t("deduplicate_files")) if t("deduplicate_files") in kwargs else kwargs.get("deduplicate_files")
+        dedup_mode = translate_ui_to_enum(dedup_mode_ui, DedupMode, t) if dedup_mode_ui else DedupMode.NONE
 
         return self._execute_impl(
             local_directory, file_filter, include_subdirectories, install_target_path, output_directory,
             base_deb_path, package_name, package_version,
-            maintainer_name, maintainer_email, package_description, symlink_csv_path, file_permissions
+            maintainer_name, maintainer_email, package_description, symlink_csv_path, file_permissions,
+            compression_level, compression_workers, data_compression, xz_preset, incremental_build, dedup_mode,
+            sha256_manifest, exclude_filter, max_depth, scan_workers
         )
 
     def _execute_impl(self, local_directory="", file_filter="*.dci", include_subdirectories=True,
                      install_target_path="/usr/share/dsg/icons", output_directory="",
                      base_deb_path="", package_name="", package_version="",
-                     maintainer_name="", maintainer_email="", package_description="", symlink_csv_path="", file_permissions="644"):
+                     maintainer_name="", maintainer_email="", package_description="", symlink_csv_path="", file_permissions="644",
+                     compression_level=6, compression_workers=0, data_compression=DebCompression.GZIP, xz_preset=6,
+                     incremental_build=False, dedup_mode=DedupMode.NONE, sha256_manifest=False,
+                     exclude_filter="", max_depth=-1, scan_workers=1):
         """Create Debian package with file filtering and directory scanning"""
 
         try:
             # Validate local directory
             if not local_directory:
                 print("错误：未提供本地目录路径")
-                return ("错误：未提供本地目录路径", [])
+                return ("错误：未提供本地目录路径", [], "")
 
             normalized_path = os.path.normpath(local_directory.strip())
             if not os.path.exists(normalized_path):
                 print(f"错误：本地目录不存在: {normalized_path}")
-                return (f"错误：本地目录不存在: {normalized_path}", [])
+                return (f"错误：本地目录不存在: {normalized_path}", [], "")
 
             if not os.path.isdir(normalized_path):
                 print(f"错误：路径不是目录: {normalized_path}")
-                return (f"错误：路径不是目录: {normalized_path}", [])
+                return (f"错误：路径不是目录: {normalized_path}", [], "")
 
             # Validate and prepare output directory
             if not output_directory:
@@ -130,15 +328,16 @@ class DebPackager(BaseNode):
                 except Exception as e:
                     error_msg = f"错误：无法创建输出目录 {output_directory}: {str(e)}"
                     print(error_msg)
-                    return (error_msg, [])
+                    return (error_msg, [], "")
 
             # Find matching files
-            matching_files = self._find_matching_files(normalized_path, file_filter, include_subdirectories)
+            matching_files = self._find_matching_files(normalized_path, file_filter, include_subdirectories,
+                                                       exclude_filter, max_depth, scan_workers)
             print(f"找到 {len(matching_files)} 个匹配的文件")
 
             if not matching_files:
                 print("警告：未找到匹配的文件")
-                return ("警告：未找到匹配的文件", [])
+                return ("警告：未找到匹配的文件", [], "")
 
             # Parse symlink CSV if provided
             symlink_mappings = {}
@@ -164,103 +363,64 @@ class DebPackager(BaseNode):
             deb_filename = f"{pkg_info['Package']}_{pkg_info['Version']}_all.deb"
             deb_output_path = os.path.join(output_directory, deb_filename)
 
+            # Incremental builds keep compressed per-file segments next to the output
+            incremental_cache_dir = None
+            if incremental_build:
+                if data_compression == DebCompression.GZIP:
+                    incremental_cache_dir = os.path.join(output_directory, ".dci_build_cache", pkg_info['Package'])
+                    print(f"增量构建缓存目录: {incremental_cache_dir}")
+                else:
+                    print(f"警告：增量构建仅支持gzip压缩，{data_compression} 将完整构建")
+
+            # The optional sha256 manifest is written next to the package
+            sha256_manifest_path = os.path.splitext(deb_output_path)[0] + ".sha256sums" if sha256_manifest else None
+
             # Create temporary working directory
             with tempfile.TemporaryDirectory() as temp_dir:
                 print(f"创建临时工作目录: {temp_dir}")
 
                 # Create deb package
-                success, file_list = self._create_deb_package(
+                start_time = time.perf_counter()
+                success, file_list, build_stats = self._create_deb_package(
                     temp_dir, matching_files, normalized_path, install_target_path,
-                    pkg_info, deb_output_path, symlink_mappings, file_permissions
+                    pkg_info, deb_output_path, symlink_mappings, file_permissions,
+                    compression_level, compression_workers, data_compression, xz_preset, incremental_cache_dir, dedup_mode,
+                    sha256_manifest_path
                 )
 
                 if success:
+                    build_stats['build_time'] = time.perf_counter() - start_time
+                    build_summary = self._format_build_summary(build_stats)
                     print(f"成功创建deb包: {deb_output_path}")
                     print(f"包含文件: {len(file_list)} 个")
-                    return (deb_output_path, file_list)
+                    print(build_summary)
+                    return (deb_output_path, file_list, build_summary)
                 else:
                     error_msg = "错误：deb包创建失败"
                     print(error_msg)
-                    return (error_msg, [])
+                    return (error_msg, [], "")
 
         except Exception as e:
             error_msg = f"错误：deb打包过程中发生异常: {str(e)}"
             print(error_msg)
             import traceback
             traceback.print_exc()
-            return (error_msg, [])
-
-    def _find_matching_files(self, directory_path, file_filter, include_subdirectories):
-        """Find files matching the filter pattern using breadth-first search"""
-        matching_files = []
+            return (error_msg, [], "")
 
-        if include_subdirectories:
-            # Use breadth-first search for recursive directory traversal
-            queue = deque([directory_path])
-
-            while queue:
-                current_dir = queue.popleft()
-
-                try:
-                    items = os.listdir(current_dir)
-                    items.sort()
-
-                    for item in items:
-                        item_path = os.path.join(current_dir, item)
-
-                        if os.path.isfile(item_path):
-                            if self._matches_filter(item, file_filter):
-                                matching_files.append(item_path)
-                        elif os.path.isdir(item_path):
-                            queue.append(item_path)
-
-                except PermissionError:
-                    print(f"警告：无权限访问目录: {current_dir}")
-                except Exception as e:
-                    print(f"警告：扫描目录时出错: {current_dir} - {str(e)}")
-        else:
-            # Only search in the specified directory (non-recursive)
-            try:
-                items = os.listdir(directory_path)
-                items.sort()
-
-                for item in items:
-                    item_path = os.path.join(directory_path, item)
-
-                    if os.path.isfile(item_path):
-                        if self._matches_filter(item, file_filter):
-                            matching_files.append(item_path)
-
-            except PermissionError:
-                print(f"错误：无权限访问目录: {directory_path}")
-            except Exception as e:
-                print(f"错误：扫描目录时出错: {directory_path} - {str(e)}")
-
-        matching_files.sort()
+    def _find_matching_files(self, directory_path, file_filter, include_subdirectories,
+                             exclude_filter="", max_depth=-1, scan_workers=1):
+        """Find files matching the filter pattern with a scandir walk"""
+        matching_files, _ = scan_directory(directory_path, file_filter, include_subdirectories,
+                                           exclude=exclude_filter, max_depth=max_depth, workers=scan_workers)
         return matching_files
 
-    def _matches_filter(self, filename, file_filter):
-        """Check if filename matches the filter pattern"""
-        try:
-            patterns = [pattern.strip() for pattern in file_filter.replace(';', ',').split(',')]
-
-            for pattern in patterns:
-                if pattern and fnmatch.fnmatch(filename, pattern):
-                    return True
-            return False
-
-        except Exception as e:
-            print(f"警告：过滤器模式匹配失败: {file_filter} - {str(e)}")
-            return False
-
     def _create_ar_archive_python(self, archive_path, files, working_dir):
         """Create ar archive using pure Python implementation"""
         try:
             print("使用纯Python实现创建ar归档...")
 
             with open(archive_path, 'wb') as ar_file:
-                # Write ar archive signature
-                ar_file.write(b"!<arch>\n")
+                writer = ArWriter(ar_file, long_names=files)
 
                 for filename in files:
                     file_path = os.path.join(working_dir, filename)
@@ -269,33 +429,8 @@ class DebPackager(BaseNode):
                         print(f"警告：文件不存在: {file_path}")
                         continue
 
-                    # Get file stats
-                    stat = os.stat(file_path)
-                    file_size = stat.st_size
-
-                    # Read file content
-                    with open(file_path, 'rb') as f:
-                        file_content = f.read()
-
-                    # Create ar header (60 bytes)
-                    # Format: name(16) + date(12) + uid(6) + gid(6) + mode(8) + size(10) + end(2)
-                    name_field = (filename + "/").ljust(16)[:16].encode('ascii')
-                    date_field = str(int(stat.st_mtime)).ljust(12)[:12].encode('ascii')
-                    uid_field = b"0     "  # 6 bytes
-                    gid_field = b"0     "  # 6 bytes
-                    mode_field = b"100644  "  # 8 bytes
-                    size_field = str(file_size).ljust(10)[:10].encode('ascii')
-                    end_field = b"`\n"  # 2 bytes
-
-                    header = name_field + date_field + uid_field + gid_field + mode_field + size_field + end_field
-
-                    # Write header and content
-                    ar_file.write(header)
-                    ar_file.write(file_content)
-
-                    # Add padding if file size is odd
-                    if file_size % 2 == 1:
-                        ar_file.write(b"\n")
+                    # Stream member content instead of reading it into memory
+                    writer.add_file(file_path, filename)
 
             return True
 
@@ -304,26 +439,17 @@ class DebPackager(BaseNode):
             return False
 
     def _parse_base_deb(self, deb_path):
-        """Parse base deb package to extract control info using pure Python"""
+        """Parse base deb package to extract control info, reading only control.tar.* in place"""
         control_info = {}
         data_files = {}  # Not used anymore, but kept for compatibility
 
         try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                # Extract deb package using pure Python ar implementation
-                extract_dir = os.path.join(temp_dir, "extract")
-                os.makedirs(extract_dir)
-
-                # Use pure Python ar extraction
-                if not self._extract_ar_archive_python(deb_path, extract_dir):
-                    print("错误：无法解压基础deb包")
-                    return control_info, data_files
-
-                # Parse control.tar.*
-                control_files = [f for f in os.listdir(extract_dir) if f.startswith("control.tar")]
-                if control_files:
-                    control_tar = os.path.join(extract_dir, control_files[0])
-                    control_info = self._parse_control_tar(control_tar)
+            with ArArchive(deb_path) as archive:
+                control_name = archive.find("control.tar")
+                if control_name:
+                    control_info = self._read_control_tar(archive.open(control_name), control_name)
+                else:
+                    print("警告：基础deb包中未找到control.tar")
 
         except Exception as e:
             print(f"错误：解析基础deb包失败: {str(e)}")
@@ -335,40 +461,11 @@ class DebPackager(BaseNode):
         try:
             print("使用纯Python实现解析ar归档...")
 
-            with open(deb_file_path, 'rb') as f:
-                # Read ar header
-                magic = f.read(8)
-                if magic != b'!<arch>\n':
-                    print("错误：不是有效的ar归档文件")
-                    return False
-
-                while True:
-                    # Read file header (60 bytes)
-                    header = f.read(60)
-                    if len(header) < 60:
-                        break
-
-                    # Parse header
-                    filename = header[0:16].decode('ascii').strip().rstrip('/')
-                    size_str = header[48:58].decode('ascii').strip()
-
-                    if not size_str:
-                        break
-
-                    size = int(size_str)
-
-                    # Read file content
-                    content = f.read(size)
-
-                    # Pad to even boundary
-                    if size % 2 == 1:
-                        f.read(1)
-
-                    # Save file
-                    if filename and not filename.startswith('/'):
-                        output_path = os.path.join(extract_dir, filename)
-                        with open(output_path, 'wb') as out_f:
-                            out_f.write(content)
+            with ArArchive(deb_file_path) as archive:
+                for filename, (_, size) in archive.members.items():
+                    # Long names may contain paths, which are not extracted
+                    if filename and os.path.basename(filename) == filename:
+                        archive.extract(filename, os.path.join(extract_dir, filename))
                         print(f"  提取文件: {filename} ({size} 字节)")
 
             return True
@@ -379,26 +476,21 @@ class DebPackager(BaseNode):
 
     def _parse_control_tar(self, control_tar_path):
         """Parse control.tar.* to extract control file content"""
+        with open(control_tar_path, 'rb') as f:
+            return self._read_control_tar(f, os.path.basename(control_tar_path))
+
+    def _read_control_tar(self, fileobj, member_name):
+        """Read the control file from a control.tar.* stream"""
         control_info = {}
 
         try:
-            # Determine compression type and open accordingly
-            if control_tar_path.endswith('.gz'):
-                tar_file = tarfile.open(control_tar_path, 'r:gz')
-            elif control_tar_path.endswith('.xz'):
-                tar_file = tarfile.open(control_tar_path, 'r:xz')
-            elif control_tar_path.endswith('.bz2'):
-                tar_file = tarfile.open(control_tar_path, 'r:bz2')
+            for member, content in iter_tar_stream(fileobj, tar_stream_mode(member_name),
+                                                   lambda member: member.name in ('./control', 'control')):
+                if content is not None:
+                    control_info = self._parse_control_content(content.decode('utf-8'))
+                    break
             else:
-                tar_file = tarfile.open(control_tar_path, 'r')
-
-            with tar_file:
-                try:
-                    control_member = tar_file.getmember('./control')
-                    control_content = tar_file.extractfile(control_member).read().decode('utf-8')
-                    control_info = self._parse_control_content(control_content)
-                except KeyError:
-                    print("警告：control文件不存在于control.tar中")
+                print("警告：control文件不存在于control.tar中")
 
         except Exception as e:
             print(f"警告：解析control.tar失败: {str(e)}")
@@ -486,37 +578,30 @@ class DebPackager(BaseNode):
         return pkg_info
 
     def _create_deb_package(self, temp_dir, matching_files, source_dir, install_target_path,
-                          pkg_info, output_deb_path, symlink_mappings=None, file_permissions="644"):
-        """Create the actual deb package and save to specified path"""
+                          pkg_info, output_deb_path, symlink_mappings=None, file_permissions="644",
+                          compression_level=6, compression_workers=0, data_compression=DebCompression.GZIP, xz_preset=6,
+                          incremental_cache_dir=None, dedup_mode=DedupMode.NONE, sha256_manifest_path=None):
+        """Create the actual deb package and save to specified path
+
+        Each source file is read exactly once: its bytes feed the digests and
+        the compressed tar stream at the same time. Only the compressed data member
+        is written to temp_dir, since ar needs member sizes before the content.
+        With incremental_cache_dir, data.tar.gz is assembled from cached segments.
+        With dedup_mode, identical files after the first copy become links to it.
+        With sha256_manifest_path, sha256 sums of the packaged files are written there.
+        Returns (success, file list, build statistics).
+        """
         try:
-            # Create package structure
-            pkg_dir = os.path.join(temp_dir, "package")
-            control_dir = os.path.join(pkg_dir, "DEBIAN")
-            data_dir = os.path.join(pkg_dir, "data")
-
-            os.makedirs(control_dir)
-            os.makedirs(data_dir)
-
-            # Create control file
-            control_file_path = os.path.join(control_dir, "control")
-            self._create_control_file(control_file_path, pkg_info)
-
-            # Copy matching files to target location
-            target_base = os.path.join(data_dir, install_target_path.lstrip('/'))
-            os.makedirs(target_base, exist_ok=True)
+            install_path_clean = install_target_path.lstrip('/')
 
             file_list = []
+            file_entries = []  # (source path, path inside data.tar)
             symlink_info = []  # Store symlink information for tar creation
 
             for file_path in matching_files:
                 relative_path = os.path.relpath(file_path, source_dir)
-                target_file_path = os.path.join(target_base, relative_path)
-                target_file_dir = os.path.dirname(target_file_path)
-
-                if target_file_dir:
-                    os.makedirs(target_file_dir, exist_ok=True)
-
-                shutil.copy2(file_path, target_file_path)
+                data_path = os.path.join(install_path_clean, relative_path).replace('\\', '/')
+                file_entries.append((file_path, data_path))
 
                 # Add to file list
                 deb_internal_path = os.path.join(install_target_path, relative_path).replace('\\', '/')
@@ -530,14 +615,6 @@ class DebPackager(BaseNode):
                     symlink_info.extend(symlinks_created)
                     file_list.extend([info['deb_path'] for info in symlinks_created])
 
-            # Create md5sums file for package integrity verification
-            md5sums_path = os.path.join(control_dir, "md5sums")
-            self._create_md5sums_file(md5sums_path, data_dir, install_target_path)
-
-            # Create control.tar.gz
-            control_tar_path = os.path.join(temp_dir, "control.tar.gz")
-            self._create_control_tar(control_tar_path, control_dir)
-
             # Parse file permissions
             try:
                 file_mode = int(file_permissions, 8) if file_permissions else 0o644
@@ -546,102 +623,214 @@ class DebPackager(BaseNode):
                 print(f"警告：无效的权限值 '{file_permissions}'，使用默认值 644")
                 file_mode = 0o644
 
-            # Create data.tar.gz
-            data_tar_path = os.path.join(temp_dir, "data.tar.gz")
-            self._create_data_tar_with_symlinks(data_tar_path, data_dir, symlink_info, file_mode)
-
-            # Create debian-binary with Unix line endings
-            debian_binary_path = os.path.join(temp_dir, "debian-binary")
-            with open(debian_binary_path, 'w', newline='\n') as f:
-                f.write("2.0\n")
-
-            # Create final deb package using pure Python ar implementation
-            temp_deb_path = os.path.join(temp_dir, "package.deb")
+            # Identical files are stored once and linked
+            duplicates = {}
+            dedup_bytes = 0
+            if dedup_mode != DedupMode.NONE:
+                duplicates, dedup_bytes = self._find_duplicate_files(file_entries, compression_workers)
+                print(f"去重: {len(duplicates)} 个重复文件以{dedup_mode}存储，节省 {dedup_bytes:,} 字节")
+
+            # Create the data member straight from the source files, hashing while reading
+            data_member_name = self._data_member_name(data_compression)
+            data_tar_path = os.path.join(temp_dir, data_member_name)
+            reused_segments = None
+            with open(data_tar_path, 'wb') as data_tar_file:
+                if incremental_cache_dir:
+                    checksums, data_tar_size, reused_segments = self._write_incremental_data_tar(
+                        data_tar_file, file_entries, symlink_info, file_mode,
+                        compression_level, compression_workers, incremental_cache_dir, duplicates, dedup_mode
+                    )
+                else:
+                    checksums, data_tar_size = self._write_data_tar(
+                        data_tar_file, file_entries, symlink_info, file_mode,
+                        compression_level, compression_workers, data_compression, xz_preset, duplicates, dedup_mode,
+                        with_sha256=bool(sha256_manifest_path)
+                    )
 
-            # Use pure Python implementation
-            success = self._create_ar_archive_python(
-                temp_deb_path,
-                ["debian-binary", "control.tar.gz", "data.tar.gz"],
-                temp_dir
-            )
-            if not success:
-                return False, []
+            # Create control.tar.gz in memory, it only holds a few small text files
+            md5_entries = [f"{md5}  {data_path}" for data_path, md5, _ in checksums]
+            control_tar_data = self._build_control_tar(pkg_info, md5_entries)
+            print(f"创建md5sums文件，包含 {len(md5_entries)} 个文件的校验和")
 
-            # Copy the created deb file to output location
-            shutil.copy2(temp_deb_path, output_deb_path)
+            # Write the deb package, streaming data.tar.gz into the output file
+            partial_deb_path = output_deb_path + ".part"
+            try:
+                with open(partial_deb_path, 'wb') as deb_file, open(data_tar_path, 'rb') as data_tar_file:
+                    ar_writer = ArWriter(deb_file)
+                    ar_writer.add("debian-binary", 4, b"2.0\n")
+                    ar_writer.add("control.tar.gz", len(control_tar_data), control_tar_data)
+                    ar_writer.add(data_member_name, os.path.getsize(data_tar_path), data_tar_file)
+                os.replace(partial_deb_path, output_deb_path)
+            finally:
+                if os.path.exists(partial_deb_path):
+                    os.remove(partial_deb_path)
+
+            if sha256_manifest_path:
+                self._write_sha256_manifest(sha256_manifest_path, checksums)
 
             # Add control files to file list
-            control_files = ["./control"]
-            if os.path.exists(os.path.join(control_dir, "md5sums")):
-                control_files.append("./md5sums")
-            if os.path.exists(os.path.join(control_dir, "postinst")):
-                control_files.append("./postinst")
-            if os.path.exists(os.path.join(control_dir, "prerm")):
-                control_files.append("./prerm")
-            if os.path.exists(os.path.join(control_dir, "postrm")):
-                control_files.append("./postrm")
+            control_files = ["./control", "./md5sums"]
 
             # Combine control and data file lists
             all_files = control_files + file_list
 
-            return True, all_files
+            build_stats = {
+                'compression': data_compression,
+                'data_member': data_member_name,
+                'data_size': data_tar_size,
+                'data_compressed_size': os.path.getsize(data_tar_path),
+                'deb_size': os.path.getsize(output_deb_path),
+                'file_count': len(file_entries),
+                'compression_level': compression_level,
+                'xz_preset': xz_preset,
+                'compression_workers': compression_workers,
+                'reused_segments': reused_segments,
+                'dedup_mode': dedup_mode,
+                'dedup_files': len(duplicates),
+                'dedup_bytes': dedup_bytes,
+                'sha256_manifest': sha256_manifest_path,
+            }
+
+            return True, all_files, build_stats
 
         except Exception as e:
             print(f"错误：创建deb包失败: {str(e)}")
             import traceback
             traceback.print_exc()
-            return False, []
-
-    def _create_control_file(self, control_file_path, pkg_info):
-        """Create the control file with package metadata"""
-        with open(control_file_path, 'w', encoding='utf-8', newline='\n') as f:
-            for key, value in pkg_info.items():
-                f.write(f"{key}: {value}\n")
-
-    def _create_control_tar(self, tar_path, control_dir):
-        """Create control.tar.gz from control directory"""
-        with tarfile.open(tar_path, 'w:gz', format=tarfile.GNU_FORMAT) as tar:
-            for item in os.listdir(control_dir):
-                item_path = os.path.join(control_dir, item)
-                tar.add(item_path, arcname=f"./{item}")
-
-    def _create_data_tar(self, tar_path, data_dir):
-        """Create data.tar.gz from data directory"""
-        with tarfile.open(tar_path, 'w:gz', format=tarfile.GNU_FORMAT) as tar:
-            for root, dirs, files in os.walk(data_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, data_dir)
-                    tar.add(file_path, arcname=f"./{arcname}")
-
-    def _create_data_tar_with_symlinks(self, tar_path, data_dir, symlink_info, file_mode=0o644):
-        """Create data.tar.gz from data directory with symlinks"""
-        with tarfile.open(tar_path, 'w:gz', format=tarfile.GNU_FORMAT) as tar:
-            # Collect all directories that need to be created
-            directories_to_add = set()
-
-            # Add directories for regular files
-            for root, dirs, files in os.walk(data_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, data_dir)
-
-                    # Add all parent directories to the set
-                    dir_path = os.path.dirname(arcname)
-                    while dir_path and dir_path != '.':
-                        directories_to_add.add(dir_path)
-                        dir_path = os.path.dirname(dir_path)
-
-            # Add directories for symlinks
-            for symlink in symlink_info:
-                symlink_arcname = symlink['arcname']
-                dir_path = os.path.dirname(symlink_arcname)
-                while dir_path and dir_path != '.':
-                    directories_to_add.add(dir_path)
-                    dir_path = os.path.dirname(dir_path)
+            return False, [], {}
+
+    def _data_member_name(self, data_compression):
+        """Return the ar member name of data.tar for a compression choice"""
+        if data_compression == DebCompression.XZ:
+            return "data.tar.xz"
+        elif data_compression == DebCompression.NONE:
+            return "data.tar"
+        return "data.tar.gz"
+
+    def _format_build_summary(self, build_stats):
+        """Format compressed sizes and build time of a finished package"""
+        compression = build_stats['compression']
+        if compression == DebCompression.XZ:
+            setting = f"预设 {build_stats['xz_preset']}"
+        elif compression == DebCompression.GZIP:
+            setting = f"级别 {build_stats['compression_level']}"
+        else:
+            setting = "不压缩"
+
+        data_size = build_stats['data_size']
+        compressed_size = build_stats['data_compressed_size']
+        ratio = compressed_size / data_size * 100 if data_size else 0.0
+
+        if build_stats.get('reused_segments') is not None:
+            setting += f", 增量: 复用 {build_stats['reused_segments']}/{build_stats['file_count']} 个文件段"
+        if build_stats.get('dedup_files'):
+            setting += (f", 去重({build_stats['dedup_mode']}): {build_stats['dedup_files']} 个文件, "
+                        f"节省 {build_stats['dedup_bytes']} 字节")
+
+        summary = (f"📦 压缩方式: {compression} ({setting}) | "
+                   f"{build_stats['data_member']}: {compressed_size} 字节 / 原始 {data_size} 字节 ({ratio:.1f}%) | "
+                   f"deb: {build_stats['deb_size']} 字节 | 文件: {build_stats['file_count']} 个 | "
+                   f"用时: {build_stats['build_time']:.2f} 秒")
+        if build_stats.get('sha256_manifest'):
+            summary += f" | sha256清单: {os.path.basename(build_stats['sha256_manifest'])}"
+        return summary
+
+    def _write_sha256_manifest(self, manifest_path, checksums):
+        """Write sha256sum-style lines for every packaged file, relative to the filesystem root"""
+        lines = sorted(f"{sha256}  {data_path}\n" for data_path, _, sha256 in checksums)
+        partial_path = manifest_path + ".part"
+        with open(partial_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.writelines(lines)
+        os.replace(partial_path, manifest_path)
+        print(f"创建sha256清单: {manifest_path} ({len(lines)} 个文件)")
+
+    def _worker_count(self, workers):
+        """Number of threads for a workers setting, where 0 means one per CPU core"""
+        return workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+    def _prefetch_files(self, executor, file_entries, skip, window, with_sha256=False):
+        """Yield (file path, data path, future) in order, reading and hashing files ahead on executor
+
+        future resolves to the result of _read_and_hash, and is None for data paths
+        in skip and for files above PREFETCH_FILE_LIMIT, which the caller streams.
+        At most window files are held ahead of the caller.
+        """
+        pending = deque()
+        for file_path, data_path in file_entries:
+            future = None
+            if data_path not in skip and os.path.getsize(file_path) <= PREFETCH_FILE_LIMIT:
+                future = executor.submit(_read_and_hash, file_path, with_sha256)
+            pending.append((file_path, data_path, future))
+            if len(pending) > window:
+                yield pending.popleft()
+        while pending:
+            yield pending.popleft()
+
+    def _build_control_tar(self, pkg_info, md5_entries):
+        """Build control.tar.gz with the control and md5sums files in memory"""
+        control_content = "".join(f"{key}: {value}\n" for key, value in pkg_info.items())
+        md5sums_content = "".join(f"{entry}\n" for entry in sorted(md5_entries))
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode='w:gz', format=tarfile.GNU_FORMAT) as tar:
+            for name, content in (("control", control_content), ("md5sums", md5sums_content)):
+                data = content.encode('utf-8')
+                tarinfo = tarfile.TarInfo(name=f"./{name}")
+                tarinfo.size = len(data)
+                tarinfo.mode = 0o644
+                tarinfo.uid = 0
+                tarinfo.gid = 0
+                tarinfo.uname = "root"
+                tarinfo.gname = "root"
+                tarinfo.mtime = int(time.time())
+                tar.addfile(tarinfo, io.BytesIO(data))
+
+        return buffer.getvalue()
+
+    def _collect_tar_directories(self, file_entries, symlink_info):
+        """Collect all parent directories of the files and symlinks in data.tar"""
+        directories_to_add = set()
+
+        arcnames = [data_path for _, data_path in file_entries] + [symlink['arcname'] for symlink in symlink_info]
+        for arcname in arcnames:
+            # Add all parent directories to the set
+            dir_path = os.path.dirname(arcname)
+            while dir_path and dir_path != '.':
+                directories_to_add.add(dir_path)
+                dir_path = os.path.dirname(dir_path)
+
+        return sorted(directories_to_add)
+
+    def _write_data_tar(self, fileobj, file_entries, symlink_info, file_mode=0o644, compression_level=6, compression_workers=0,
+                        data_compression=DebCompression.GZIP, xz_preset=6, duplicates=None, dedup_mode=DedupMode.NONE,
+                        with_sha256=False):
+        """Write data.tar from source files and symlinks, returning (checksums, tar size)
+
+        checksums lists (data path, md5, sha256 or None) of every regular file and
+        hardlink. The tar stream is compressed block by block on compression_workers
+        threads (0 means one per CPU core), as a single gzip member or a multi-block
+        xz stream, while files are read and hashed ahead on as many threads.
+        Files listed in duplicates are written as links to their first copy.
+        """
+        checksums = []
+        digests_by_path = {}
+        duplicates = duplicates or {}
+        workers = self._worker_count(compression_workers)
+
+        if data_compression == DebCompression.XZ:
+            writer = ParallelXzWriter(fileobj, xz_preset, compression_workers)
+            print(f"使用 {writer.workers} 个线程压缩 data.tar.xz (预设: {xz_preset})")
+        elif data_compression == DebCompression.GZIP:
+            writer = ParallelGzipWriter(fileobj, compression_level, compression_workers)
+            print(f"使用 {writer.workers} 个线程压缩 data.tar.gz (压缩级别: {compression_level})")
+        else:
+            writer = _CountingWriter(fileobj)
+            print("data.tar 不压缩")
 
+        with writer, ThreadPoolExecutor(max_workers=workers) as hash_executor, \
+                tarfile.open(fileobj=writer, mode='w', format=tarfile.GNU_FORMAT) as tar:
             # Add directory entries to tar archive first
-            for dir_name in sorted(directories_to_add):
+            for dir_name in self._collect_tar_directories(file_entries, symlink_info):
                 try:
                     # Create a TarInfo object for the directory
                     tarinfo = tarfile.TarInfo(name=f"./{dir_name.replace(chr(92), '/')}")
@@ -659,21 +848,47 @@ class DebPackager(BaseNode):
                 except Exception as e:
                     print(f"    ❌ 在tar中创建目录失败 {dir_name}: {str(e)}")
 
-            # Add regular files with custom permissions
-            for root, dirs, files in os.walk(data_dir):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    arcname = os.path.relpath(file_path, data_dir)
-
-                    # Create TarInfo with custom permissions
-                    tarinfo = tar.gettarinfo(file_path, arcname=f"./{arcname}")
+            # Add regular files with custom permissions, read and hashed ahead on worker threads
+            for file_path, data_path, future in self._prefetch_files(hash_executor, file_entries, duplicates,
+                                                                     workers * 2, with_sha256):
+                original = duplicates.get(data_path)
+                if original is not None:
+                    link_type, linkname = self._duplicate_link(data_path, original, dedup_mode)
+                    tarinfo = tarfile.TarInfo(name=f"./{data_path}")
+                    tarinfo.type = link_type
+                    tarinfo.linkname = linkname
                     tarinfo.mode = file_mode
-                    tarinfo.uid = 0
-                    tarinfo.gid = 0
-
-                    # Add file with custom tarinfo
+                    tarinfo.mtime = int(time.time())
+                    tar.addfile(tarinfo)
+                    # Hardlinks are regular files for dpkg and keep their checksum
+                    if link_type == tarfile.LNKTYPE:
+                        checksums.append((data_path, *digests_by_path[original]))
+                    continue
+
+                # os.stat follows symlinked sources, which are packaged as the files they point to
+                stat = os.stat(file_path)
+                tarinfo = tarfile.TarInfo(name=f"./{data_path}")
+                tarinfo.size = stat.st_size
+                tarinfo.mtime = int(stat.st_mtime)
+                tarinfo.mode = file_mode
+                tarinfo.uid = 0
+                tarinfo.gid = 0
+                tarinfo.uname = "root"
+                tarinfo.gname = "root"
+
+                if future is not None:
+                    content, md5, sha256 = future.result()
+                    tarinfo.size = len(content)
+                    tar.addfile(tarinfo, io.BytesIO(content))
+                else:
+                    # Large files are streamed and hashed while tarfile reads them
                     with open(file_path, 'rb') as f:
-                        tar.addfile(tarinfo, f)
+                        reader = _HashingReader(f, with_sha256)
+                        tar.addfile(tarinfo, reader)
+                    md5, sha256 = reader.hexdigest(), reader.sha256_hexdigest()
+
+                digests_by_path[data_path] = (md5, sha256)
+                checksums.append((data_path, md5, sha256))
 
             # Add symlinks using tarfile API
             for symlink in symlink_info:
@@ -696,6 +911,161 @@ class DebPackager(BaseNode):
                 except Exception as e:
                     print(f"    ❌ 在tar中创建软链接失败 {symlink['name']}: {str(e)}")
 
+        return checksums, writer.tell()
+
+    def _find_duplicate_files(self, file_entries, workers=0):
+        """Find files with the same content as an earlier file
+
+        Only files whose sizes collide are hashed, on workers threads (0 means
+        one per CPU core). Returns ({data path: data path of the first copy},
+        total size of the duplicates).
+        """
+        by_size = {}
+        for file_path, data_path in file_entries:
+            by_size.setdefault(os.path.getsize(file_path), []).append((file_path, data_path))
+
+        # Empty files take a header either way
+        candidates = [(size, entry) for size, group in by_size.items() if size and len(group) > 1 for entry in group]
+        with ThreadPoolExecutor(max_workers=self._worker_count(workers)) as executor:
+            digests = list(executor.map(self._sha256_file, [file_path for _, (file_path, _) in candidates]))
+
+        duplicates = {}
+        duplicate_bytes = 0
+        first_copies = {}
+        for (size, (_, data_path)), digest in zip(candidates, digests):
+            if (size, digest) in first_copies:
+                duplicates[data_path] = first_copies[(size, digest)]
+                duplicate_bytes += size
+            else:
+                first_copies[(size, digest)] = data_path
+
+        return duplicates, duplicate_bytes
+
+    def _sha256_file(self, file_path):
+        """Return the sha256 digest of a file"""
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+                sha256.update(block)
+        return sha256.digest()
+
+    def _duplicate_link(self, data_path, original, dedup_mode):
+        """Return (tar entry type, link name) for a duplicate of the file at original"""
+        if dedup_mode == DedupMode.SYMLINK:
+            return tarfile.SYMTYPE, posixpath.relpath(original, posixpath.dirname(data_path))
+        return tarfile.LNKTYPE, f"./{original}"
+
+    def _tar_header(self, name, file_type=tarfile.REGTYPE, size=0, mode=0o644, mtime=0, linkname=""):
+        """Return the GNU tar header block(s) of a root-owned entry"""
+        tarinfo = tarfile.TarInfo(name=name)
+        tarinfo.type = file_type
+        tarinfo.size = size
+        tarinfo.mode = mode
+        tarinfo.mtime = mtime
+        tarinfo.linkname = linkname
+        tarinfo.uid = 0
+        tarinfo.gid = 0
+        tarinfo.uname = "root"
+        tarinfo.gname = "root"
+        return tarinfo.tobuf(tarfile.GNU_FORMAT, tarfile.ENCODING, "surrogateescape")
+
+    def _write_incremental_data_tar(self, fileobj, file_entries, symlink_info, file_mode=0o644, compression_level=6,
+                                    compression_workers=0, cache_dir="", duplicates=None, dedup_mode=DedupMode.NONE):
+        """Write data.tar.gz as concatenated gzip members, reusing cached per-file segments
+
+        Directory entries, and symlinks with the end-of-archive blocks, are small
+        members compressed on every build. Every file is its own member (header,
+        data and padding), taken from the cache when its content, mode, path and
+        mtime are unchanged and otherwise compressed on compression_workers threads.
+        Files listed in duplicates are written as links to their first copy.
+        Returns (checksums, tar size, number of reused segments), where checksums
+        lists (data path, md5, sha256) of every regular file and hardlink.
+        """
+        cache = _SegmentCache(cache_dir)
+        duplicates = duplicates or {}
+        checksums = []
+        reused = 0
+        tar_size = 0
+        now = int(time.time())
+
+        directories = b"".join(
+            self._tar_header(f"./{dir_name}", tarfile.DIRTYPE, mode=0o755, mtime=now)
+            for dir_name in self._collect_tar_directories(file_entries, symlink_info)
+        )
+        if directories:
+            fileobj.write(gzip.compress(directories, compression_level, mtime=0))
+            tar_size += len(directories)
+
+        workers = self._worker_count(compression_workers)
+        pending = deque()  # (future or None, cache key, raw size, cached segment path) in archive order
+
+        def write_oldest():
+            future, key, raw_size, cached_path = pending.popleft()
+            if future is None:
+                with open(cached_path, 'rb') as f:
+                    shutil.copyfileobj(f, fileobj, 1024 * 1024)
+            else:
+                data = future.result()
+                if key is not None:
+                    cache.store(key, data, raw_size)
+                fileobj.write(data)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Changed files are hashed in parallel, unchanged ones reuse their manifest digests
+            digests = executor.map(cache.file_digests, [file_path for file_path, _ in file_entries])
+            for (file_path, data_path), (sha256, md5) in zip(file_entries, digests):
+
+                original = duplicates.get(data_path)
+                if original is not None:
+                    # Link entries are a single header, they are not worth caching
+                    link_type, linkname = self._duplicate_link(data_path, original, dedup_mode)
+                    raw = self._tar_header(f"./{data_path}", link_type, mode=file_mode, mtime=now, linkname=linkname)
+                    pending.append((executor.submit(gzip.compress, raw, compression_level, mtime=0), None, len(raw), None))
+                    tar_size += len(raw)
+                    if link_type == tarfile.LNKTYPE:
+                        checksums.append((data_path, md5, sha256))
+                    continue
+
+                checksums.append((data_path, md5, sha256))
+                # The cached header carries the mtime, so a touched file gets a new segment
+                mtime = int(os.path.getmtime(file_path))
+                key = cache.segment_key(sha256, file_mode, data_path, mtime, compression_level)
+                cached = cache.lookup(key)
+                if cached:
+                    cached_path, raw_size = cached
+                    pending.append((None, key, raw_size, cached_path))
+                    tar_size += raw_size
+                    reused += 1
+                else:
+                    with open(file_path, 'rb') as f:
+                        content = f.read()
+                    header = self._tar_header(f"./{data_path}", size=len(content), mode=file_mode, mtime=mtime)
+                    raw = header + content + b"\0" * (-len(content) % tarfile.BLOCKSIZE)
+                    future = executor.submit(gzip.compress, raw, compression_level, mtime=0)
+                    pending.append((future, key, len(raw), None))
+                    tar_size += len(raw)
+
+                while len(pending) > workers * 2:
+                    write_oldest()
+
+            while pending:
+                write_oldest()
+
+        # Symlinks, end-of-archive blocks and record padding
+        trailer = b"".join(
+            self._tar_header(f"./{symlink['arcname']}", tarfile.SYMTYPE, mode=file_mode, mtime=now,
+                             linkname=symlink['target'])
+            for symlink in symlink_info
+        )
+        trailer += b"\0" * (2 * tarfile.BLOCKSIZE)
+        trailer += b"\0" * (-(tar_size + len(trailer)) % tarfile.RECORDSIZE)
+        fileobj.write(gzip.compress(trailer, compression_level, mtime=0))
+        tar_size += len(trailer)
+
+        cache.save()
+        print(f"增量构建: 复用 {reused}/{len(file_entries)} 个文件段，重新压缩 {len(file_entries) - reused} 个")
+        return checksums, tar_size, reused
+
     def _parse_symlink_csv(self, csv_path):
         """Parse CSV file for symlink mappings"""
         import csv
@@ -784,41 +1154,3 @@ class DebPackager(BaseNode):
                     print(f"    ❌ 准备软链接失败 {target_name}{ext}: {str(e)}")
 
         return symlinks_info
-
-    def _create_md5sums_file(self, md5sums_path, data_dir, install_target_path):
-        """Create md5sums file for package integrity verification"""
-        import hashlib
-
-        md5_entries = []
-
-        # Walk through data directory and calculate MD5 for each file
-        for root, dirs, files in os.walk(data_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-
-                # Calculate MD5 hash
-                md5_hash = hashlib.md5()
-                try:
-                    with open(file_path, 'rb') as f:
-                        for chunk in iter(lambda: f.read(4096), b""):
-                            md5_hash.update(chunk)
-
-                    # Get relative path from data_dir
-                    rel_path = os.path.relpath(file_path, data_dir)
-                    # Convert to Unix path format
-                    rel_path = rel_path.replace('\\', '/')
-
-                    # Add to md5 entries
-                    md5_entries.append(f"{md5_hash.hexdigest()}  {rel_path}")
-
-                except Exception as e:
-                    print(f"警告：无法计算文件MD5 {file_path}: {str(e)}")
-
-        # Write md5sums file with Unix line endings
-        try:
-            with open(md5sums_path, 'w', encoding='utf-8', newline='\n') as f:
-                for entry in sorted(md5_entries):
-                    f.write(f"{entry}\n")
-            print(f"创建md5sums文件，包含 {len(md5_entries)} 个文件的校验和")
-        except Exception as e:
-            print(f"警告：创建md5sums文件失败: {str(e)}")
@@ -1,13 +1,31 @@
 import os
-import fnmatch
-from collections import deque
-from PIL import Image
-import io
-import torch
-import numpy as np
-from ..utils.file_utils import load_binary_data
-from ..utils.i18n import t
-from .base_node import BaseNode
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from ..utils.file_utils import load_binary_data, get_cache_directory
+    from ..utils.load_cache import DirectoryManifest, get_cached_decode, cache_decode
+    from ..utils.fingerprint import tree_fingerprint
+    from ..utils.image_utils import decode_image_array, batch_image_arrays
+    from ..utils.enums import ImageBatchMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
+    from ..utils.dir_scanner import scan_directory
+    from ..utils.i18n import t
+    from .base_node import BaseNode
+except ImportError:
+    # Fallback for test environment
+    import sys
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    parent_dir = os.path.dirname(current_dir)
+    sys.path.insert(0, parent_dir)
+
+    from utils.file_utils import load_binary_data, get_cache_directory
+    from utils.load_cache import DirectoryManifest, get_cached_decode, cache_decode
+    from utils.fingerprint import tree_fingerprint
+    from utils.image_utils import decode_image_array, batch_image_arrays
+    from utils.enums import ImageBatchMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
+    from utils.dir_scanner import scan_directory
+    from utils.i18n import t
+    from nodes.base_node import BaseNode
 
 class DirectoryLoader(BaseNode):
     """ComfyUI node for loading multiple binary files from a directory with filtering and recursive search"""
@@ -20,32 +38,88 @@ class DirectoryLoader(BaseNode):
                 t("file_filter"): ("STRING", {"default": "*.dci", "multiline": False}),
                 t("include_subdirectories"): ("BOOLEAN", {"default": True}),
                 t("skip_symlinks"): ("BOOLEAN", {"default": True}),
+            },
+            "optional": {
+                t("exclude_filter"): ("STRING", {"default": "", "multiline": False}),
+                t("max_depth"): ("INT", {"default": -1, "min": -1, "max": 256, "step": 1}),
+                t("scan_workers"): ("INT", {"default": 1, "min": 1, "max": 64, "step": 1}),
+                t("max_workers"): ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
+                t("image_batch_mode"): (get_enum_ui_options(ImageBatchMode, t), {"default": get_enum_default_ui_value(ImageBatchMode.BUCKET, t)}),
+                t("use_cache"): ("BOOLEAN", {"default": True}),
             }
         }
 
-    RETURN_TYPES = ("BINARY_DATA_LIST", "STRING_LIST", "IMAGE", "STRING_LIST", "STRING_LIST")
-    RETURN_NAMES = (t("binary_data_list"), t("relative_paths"), t("image_list"), t("image_relative_paths"), t("skipped_files"))
+    RETURN_TYPES = ("BINARY_DATA_LIST", "STRING_LIST", "IMAGE", "STRING_LIST", "STRING_LIST", "MASK")
+    RETURN_NAMES = (t("binary_data_list"), t("relative_paths"), t("image_list"), t("image_relative_paths"), t("skipped_files"), t("image_masks"))
+    # Images come as one batch per resolution, with a mask batch for each
+    OUTPUT_IS_LIST = (False, False, True, False, False, True)
     FUNCTION = "execute"
     CATEGORY = f"DCI/{t('Files')}"
+    MANIFEST_CACHE_NAME = "directory_manifests"
 
-    def _execute(self, **kwargs):
-        """Load multiple binary files from directory with filtering and recursive search"""
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        """Fingerprint of the filtered directory tree, so an untouched tree is not loaded again
+
+        With use_cache the fingerprint covers file contents through the
+        manifest; otherwise it is a digest of the size and mtime of every file.
+        """
+        directory_path, file_filter, include_subdirectories, skip_symlinks, exclude_filter, max_depth, scan_workers = \
+            cls._scan_inputs(kwargs)
+        use_cache = kwargs.get(t("use_cache")) if t("use_cache") in kwargs else kwargs.get("use_cache", True)
+
+        normalized_path = os.path.normpath(directory_path.strip()) if directory_path else ""
+        if not normalized_path or not os.path.isdir(normalized_path):
+            return tree_fingerprint([], None, "missing", normalized_path)
+
+        matching_files, skipped_files = scan_directory(normalized_path, file_filter, include_subdirectories, skip_symlinks,
+                                                       exclude=exclude_filter, max_depth=max_depth, workers=scan_workers)
+        if not use_cache:
+            return tree_fingerprint(matching_files + skipped_files, normalized_path)
+
+        manifest = DirectoryManifest(get_cache_directory(cls.MANIFEST_CACHE_NAME), normalized_path)
+        fingerprint = manifest.fingerprint(matching_files + skipped_files)
+        try:
+            manifest.save()
+        except OSError as e:
+            print(f"警告：无法保存加载清单: {str(e)}")
+        return fingerprint
+
+    @staticmethod
+    def _scan_inputs(kwargs):
+        """Read the inputs that select the scanned files"""
         # Extract parameters with translation support
         # Try both translated and original parameter names for compatibility
         directory_path = kwargs.get(t("directory_path")) if t("directory_path") in kwargs else kwargs.get("directory_path", "")
         file_filter = kwargs.get(t("file_filter")) if t("file_filter") in kwargs else kwargs.get("file_filter", "*.dci")
         include_subdirectories = kwargs.get(t("include_subdirectories")) if t("include_subdirectories") in kwargs else kwargs.get("include_subdirectories", True)
         skip_symlinks = kwargs.get(t("skip_symlinks")) if t("skip_symlinks") in kwargs else kwargs.get("skip_symlinks", True)
+        exclude_filter = kwargs.get(t("exclude_filter")) if t("exclude_filter") in kwargs else kwargs.get("exclude_filter", "")
+        max_depth = kwargs.get(t("max_depth")) if t("max_depth") in kwargs else kwargs.get("max_depth", -1)
+        scan_workers = kwargs.get(t("scan_workers")) if t("scan_workers") in kwargs else kwargs.get("scan_workers", 1)
+        return directory_path, file_filter, include_subdirectories, skip_symlinks, exclude_filter, max_depth, scan_workers
 
-        return self._execute_impl(directory_path, file_filter, include_subdirectories, skip_symlinks)
-
-    def _execute_impl(self, directory_path="", file_filter="*.dci", include_subdirectories=True, skip_symlinks=True):
+    def _execute(self, **kwargs):
+        """Load multiple binary files from directory with filtering and recursive search"""
+        directory_path, file_filter, include_subdirectories, skip_symlinks, exclude_filter, max_depth, scan_workers = \
+            self._scan_inputs(kwargs)
+        max_workers = kwargs.get(t("max_workers")) if t("max_workers") in kwargs else kwargs.get("max_workers", 0)
+        batch_mode_ui = kwargs.get(t("image_batch_mode")) if t("image_batch_mode") in kwargs else kwargs.get("image_batch_mode")
+        batch_mode = translate_ui_to_enum(batch_mode_ui, ImageBatchMode, t) if batch_mode_ui else ImageBatchMode.BUCKET
+        use_cache = kwargs.get(t("use_cache")) if t("use_cache") in kwargs else kwargs.get("use_cache", True)
+
+        return self._execute_impl(directory_path, file_filter, include_subdirectories, skip_symlinks,
+                                  exclude_filter, max_depth, scan_workers, max_workers, batch_mode, use_cache)
+
+    def _execute_impl(self, directory_path="", file_filter="*.dci", include_subdirectories=True, skip_symlinks=True,
+                      exclude_filter="", max_depth=-1, scan_workers=1, max_workers=0, batch_mode=ImageBatchMode.BUCKET,
+                      use_cache=True):
         """Load multiple binary files from directory with filtering and recursive search"""
 
         # Validate directory path
         if not directory_path:
             print("错误：未提供目录路径")
-            return ([], [], [], [], [])
+            return ([], [], [], [], [], [])
 
         # Normalize the directory path
         try:
@@ -57,65 +131,80 @@ class DirectoryLoader(BaseNode):
                 print("跳过软链接: 禁用")
         except Exception as e:
             print(f"错误：目录路径规范化失败: {str(e)}")
-            return ([], [], [], [], [])
+            return ([], [], [], [], [], [])
 
         # Check if directory exists
         if not os.path.exists(normalized_path):
             print(f"错误：目录不存在: {normalized_path}")
-            return ([], [], [], [], [])
+            return ([], [], [], [], [], [])
 
         if not os.path.isdir(normalized_path):
             print(f"错误：路径不是目录: {normalized_path}")
-            return ([], [], [], [], [])
+            return ([], [], [], [], [], [])
 
         # Find matching files
         try:
-            matching_files, skipped_files = self._find_matching_files(normalized_path, file_filter, include_subdirectories, skip_symlinks)
+            matching_files, skipped_files = self._find_matching_files(normalized_path, file_filter, include_subdirectories, skip_symlinks,
+                                                                      exclude_filter, max_depth, scan_workers)
             print(f"找到 {len(matching_files)} 个匹配的文件")
             if skipped_files:
                 print(f"跳过 {len(skipped_files)} 个软链接文件")
         except Exception as e:
             print(f"错误：文件搜索失败: {str(e)}")
-            return ([], [], [], [], [])
+            return ([], [], [], [], [], [])
 
-        # Load binary data and process images
+        # Load binary data and decode images on a bounded thread pool, keeping the file order
         binary_data_list = []
         relative_paths = []
         image_list = []
         image_relative_paths = []
         successful_loads = 0
         successful_images = 0
+        cache_hits = 0
 
-        for file_path in matching_files:
+        # Unchanged files are served from the decode cache through the manifest
+        manifest = None
+        if use_cache:
             try:
-                # Calculate relative path
-                relative_path = os.path.relpath(file_path, normalized_path)
-
-                # Load binary data
-                binary_data = load_binary_data(file_path)
-
-                if binary_data is not None:
+                manifest = DirectoryManifest(get_cache_directory(self.MANIFEST_CACHE_NAME), normalized_path)
+            except OSError as e:
+                print(f"警告：无法使用加载缓存: {str(e)}")
+
+        workers = max_workers if max_workers and max_workers > 0 else (os.cpu_count() or 1)
+        print(f"使用 {workers} 个线程加载和解码文件")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(self._load_file, matching_files, [normalized_path] * len(matching_files),
+                                   [manifest] * len(matching_files))
+
+            for relative_path, binary_data, image_array, error, entry, cached in results:
+                if entry is not None:
+                    manifest.record(relative_path, entry)
+                    cache_hits += cached
+                if error is not None:
+                    print(f"  ❌ 加载异常: {relative_path} - {error}")
+                elif binary_data is not None:
                     binary_data_list.append(binary_data)
                     relative_paths.append(relative_path)
                     successful_loads += 1
                     print(f"  ✓ 加载成功: {relative_path} ({len(binary_data)} 字节)")
 
-                    # Try to decode as image
-                    image_tensor = self._try_decode_image(binary_data, relative_path)
-                    if image_tensor is not None:
-                        image_list.append(image_tensor)
+                    if image_array is not None:
+                        image_list.append(image_array)
                         image_relative_paths.append(relative_path)
                         successful_images += 1
                         print(f"    ✓ 图像解码成功: {relative_path}")
                 else:
                     print(f"  ❌ 加载失败: {relative_path}")
 
-            except Exception as e:
-                print(f"  ❌ 加载异常: {relative_path} - {str(e)}")
-
         print(f"成功加载 {successful_loads}/{len(matching_files)} 个文件")
         print(f"成功解码 {successful_images} 个图像文件")
         print(f"总数据量: {sum(len(data) for data in binary_data_list)} 字节")
+        if manifest is not None:
+            print(f"缓存命中: {cache_hits}/{len(matching_files)} 个文件")
+            try:
+                manifest.save()
+            except OSError as e:
+                print(f"警告：无法保存加载清单: {str(e)}")
 
         # Convert skipped files to relative paths
         skipped_relative_paths = []
@@ -129,128 +218,65 @@ class DirectoryLoader(BaseNode):
 
         # Convert image list to ComfyUI format or empty list
         if image_list:
-            # Stack all images into a batch tensor
-            images_tensor = torch.stack(image_list, dim=0)
-            return (binary_data_list, relative_paths, images_tensor, image_relative_paths, skipped_relative_paths)
+            # Scale images into preallocated batches, one per size or one padded batch
+            image_batches, image_masks, order = batch_image_arrays(image_list, batch_mode == ImageBatchMode.PAD, workers=workers)
+            image_relative_paths = [image_relative_paths[i] for i in order]
+            print(f"图像批次: {len(image_batches)} 个 ({batch_mode.value})")
+            return (binary_data_list, relative_paths, image_batches, image_relative_paths, skipped_relative_paths, image_masks)
         else:
-            return (binary_data_list, relative_paths, [], [], skipped_relative_paths)
-
-    def _find_matching_files(self, directory_path, file_filter, include_subdirectories, skip_symlinks):
-        """Find files matching the filter pattern using breadth-first search"""
-        matching_files = []
-        skipped_files = []
-
-        if include_subdirectories:
-            # Use breadth-first search for recursive directory traversal
-            queue = deque([directory_path])
-
-            while queue:
-                current_dir = queue.popleft()
-
-                try:
-                    # Get all items in current directory
-                    items = os.listdir(current_dir)
-
-                    # Sort items for consistent ordering
-                    items.sort()
-
-                    for item in items:
-                        item_path = os.path.join(current_dir, item)
-
-                        # Check if it's a symlink and should be skipped
-                        if skip_symlinks and os.path.islink(item_path):
-                            skipped_files.append(item_path)
-                            print(f"  ⏭️ 跳过软链接: {os.path.relpath(item_path, directory_path)}")
-                            continue
-
-                        if os.path.isfile(item_path):
-                            # Check if file matches filter
-                            if self._matches_filter(item, file_filter):
-                                matching_files.append(item_path)
-                        elif os.path.isdir(item_path):
-                            # Add subdirectory to queue for breadth-first traversal
-                            queue.append(item_path)
-
-                except PermissionError:
-                    print(f"警告：无权限访问目录: {current_dir}")
-                except Exception as e:
-                    print(f"警告：扫描目录时出错: {current_dir} - {str(e)}")
-        else:
-            # Only search in the specified directory (non-recursive)
-            try:
-                items = os.listdir(directory_path)
-                items.sort()
-
-                for item in items:
-                    item_path = os.path.join(directory_path, item)
-
-                    # Check if it's a symlink and should be skipped
-                    if skip_symlinks and os.path.islink(item_path):
-                        skipped_files.append(item_path)
-                        print(f"  ⏭️ 跳过软链接: {item}")
-                        continue
+            return (binary_data_list, relative_paths, [], [], skipped_relative_paths, [])
 
-                    if os.path.isfile(item_path):
-                        if self._matches_filter(item, file_filter):
-                            matching_files.append(item_path)
-
-            except PermissionError:
-                print(f"错误：无权限访问目录: {directory_path}")
-            except Exception as e:
-                print(f"错误：扫描目录时出错: {directory_path} - {str(e)}")
-
-        # Sort final results for consistent ordering
-        matching_files.sort()
-        skipped_files.sort()
+    def _find_matching_files(self, directory_path, file_filter, include_subdirectories, skip_symlinks,
+                             exclude_filter="", max_depth=-1, scan_workers=1):
+        """Find files matching the filter pattern with a scandir walk"""
+        matching_files, skipped_files = scan_directory(directory_path, file_filter, include_subdirectories, skip_symlinks,
+                                                       exclude=exclude_filter, max_depth=max_depth, workers=scan_workers)
+        for skipped_file in skipped_files:
+            print(f"  ⏭️ 跳过软链接: {os.path.relpath(skipped_file, directory_path)}")
         return matching_files, skipped_files
 
-    def _matches_filter(self, filename, file_filter):
-        """Check if filename matches the filter pattern"""
-        try:
-            # Support multiple patterns separated by semicolons or commas
-            patterns = [pattern.strip() for pattern in file_filter.replace(';', ',').split(',')]
-
-            for pattern in patterns:
-                if pattern and fnmatch.fnmatch(filename, pattern):
-                    return True
-            return False
-
-        except Exception as e:
-            print(f"警告：过滤器模式匹配失败: {file_filter} - {str(e)}")
-            return False
-
     def _is_image_file(self, filename):
         """Check if file is a supported image format"""
         image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff', '.tif', '.webp', '.ico'}
         _, ext = os.path.splitext(filename.lower())
         return ext in image_extensions
 
-    def _try_decode_image(self, binary_data, relative_path):
-        """Try to decode binary data as an image and convert to ComfyUI format"""
+    def _load_file(self, file_path, directory_path, manifest=None):
+        """Load a file and decode it if it is an image, on a worker thread
+
+        With a manifest, a file whose size and mtime match its entry is served
+        from the decode cache without reading it, and content already decoded
+        under another name or mtime is not decoded again.
+        Returns (relative path, binary data, RGB uint8 array or None, error or None,
+        manifest entry or None, whether the decode cache was used).
+        """
+        relative_path = os.path.relpath(file_path, directory_path)
+        is_image = self._is_image_file(relative_path)
         try:
-            # Check if file extension suggests it's an image
-            if not self._is_image_file(relative_path):
-                return None
-
-            # Try to open image with PIL
-            image_stream = io.BytesIO(binary_data)
-            pil_image = Image.open(image_stream)
-
-            # Convert to RGB if necessary (handle RGBA, grayscale, etc.)
-            if pil_image.mode != 'RGB':
-                pil_image = pil_image.convert('RGB')
-
-            # Convert PIL image to numpy array
-            image_array = np.array(pil_image)
-
-            # Convert to ComfyUI format: (H, W, C) with values in [0, 1]
-            image_array = image_array.astype(np.float32) / 255.0
-
-            # Convert to PyTorch tensor
-            image_tensor = torch.from_numpy(image_array)
-
-            return image_tensor
-
+            if manifest is None:
+                binary_data = load_binary_data(file_path)
+                # Not an image or failed to decode gives None
+                image_array = decode_image_array(binary_data) if binary_data is not None and is_image else None
+                return relative_path, binary_data, image_array, None, None, False
+
+            stat = os.stat(file_path)
+            entry = manifest.lookup(relative_path, stat)
+            cached = get_cached_decode(entry["decode_key"]) if entry else None
+            if cached is not None:
+                return relative_path, cached[0], cached[1] if is_image else None, None, entry, True
+
+            binary_data = load_binary_data(file_path)
+            if binary_data is None:
+                return relative_path, None, None, None, None, False
+
+            sha256 = hashlib.sha256(binary_data).hexdigest()
+            entry = manifest.make_entry(stat, sha256)
+            cached = get_cached_decode(entry["decode_key"])
+            if cached is not None:
+                return relative_path, binary_data, cached[1] if is_image else None, None, entry, True
+
+            image_array = decode_image_array(binary_data) if is_image else None
+            cache_decode(entry["decode_key"], binary_data, image_array)
+            return relative_path, binary_data, image_array, None, entry, False
         except Exception as e:
-            # Not an image or failed to decode, silently ignore
-            return None
+            return relative_path, None, None, str(e), None, False
@@ -3,6 +3,7 @@ import os
 import base64
 from io import BytesIO
 from ..utils.file_utils import load_binary_data, save_binary_data, get_output_directory, clean_file_name, ensure_directory
+from ..utils.fingerprint import file_fingerprint
 from .base_node import BaseNode
 from ..utils.i18n import t
 
@@ -288,6 +289,7 @@ class BinaryFileLoader(BaseNode):
             "required": {},
             "optional": {
                 t("file_path"): ("STRING", {"default": "", "multiline": False}),
+                t("hash_content"): ("BOOLEAN", {"default": False}),
             }
         }
 
@@ -296,6 +298,15 @@ class BinaryFileLoader(BaseNode):
     FUNCTION = "execute"
     CATEGORY = f"DCI/{t('Files')}"
 
+    @classmethod
+    def IS_CHANGED(cls, **kwargs):
+        """Fingerprint of the file from its size and mtime, or from its content with hash_content"""
+        file_path = kwargs.get(t("file_path")) if t("file_path") in kwargs else kwargs.get("file_path", "")
+        hash_content = kwargs.get(t("hash_content")) if t("hash_content") in kwargs else kwargs.get("hash_content", False)
+        if not file_path:
+            return ""
+        return file_fingerprint(file_path, hash_content)
+
     def _execute(self, **kwargs):
         """Load binary file from file system"""
         # Extract parameters with translation support
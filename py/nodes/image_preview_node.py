@@ -1,6 +1,6 @@
 try:
     from PIL import Image, ImageDraw
-    from ..utils.image_utils import apply_background, create_checkerboard_background, pil_to_comfyui_format, pil_to_tensor
+    from ..utils.image_utils import apply_background, create_checkerboard_background, pil_to_comfyui_format, pil_list_to_batch
     _image_support = True
 except ImportError as e:
     print(f"Warning: Image support not available in image_preview_node: {e}")
@@ -29,8 +29,8 @@ class DCIImagePreview(BaseNode):
             }
         }
 
-    RETURN_TYPES = ("IMAGE",)
-    RETURN_NAMES = (t("preview_images"),)
+    RETURN_TYPES = ("IMAGE", "MASK")
+    RETURN_NAMES = (t("preview_images"), t("preview_mask"))
     FUNCTION = "execute"
     CATEGORY = f"DCI/{t('Preview')}"
     OUTPUT_NODE = True
@@ -50,7 +50,7 @@ class DCIImagePreview(BaseNode):
     def _execute_impl(self, dci_image_data, preview_background: BackgroundColor = BackgroundColor.CHECKERBOARD):
         """Preview DCI image data with IMAGE output"""
         if not _image_support:
-            return {"ui": {"text": ["Image support not available - missing PIL/torch dependencies"]}, "result": (None,)}
+            return {"ui": {"text": ["Image support not available - missing PIL/torch dependencies"]}, "result": (None, None)}
 
         # Handle both single DCI image data and list of DCI image data
         image_data_list = []
@@ -96,24 +96,10 @@ class DCIImagePreview(BaseNode):
                 ui_images.append(pil_to_comfyui_format(error_preview, f"dci_image_error_{i}"))
                 ui_texts.append(result['error_msg'])
 
-        # Convert PIL images to ComfyUI tensor format for IMAGE output
-        if preview_images:
-            # Convert all preview images to tensors and stack them
-            image_tensors = []
-            for pil_img in preview_images:
-                tensor = pil_to_tensor(pil_img)
-                image_tensors.append(tensor)
-
-            # Stack tensors into batch
-            import torch
-            if len(image_tensors) == 1:
-                output_tensor = image_tensors[0]
-            else:
-                output_tensor = torch.cat(image_tensors, dim=0)
-
-            print(f"生成了 {len(preview_images)} 个DCI图像预览，输出张量形状: {output_tensor.shape}")
-        else:
-            output_tensor = None
+        # Convert PIL images to one padded ComfyUI batch, images may differ in size
+        output_tensor, output_mask = pil_list_to_batch(preview_images, with_mask=True)
+        if output_tensor is not None:
+            print(f"生成了 {len(preview_images)} 个DCI图像预览，输出张量形状: {tuple(output_tensor.shape)}")
 
         # Create UI output
         ui_output = {
@@ -123,7 +109,7 @@ class DCIImagePreview(BaseNode):
             }
         }
 
-        return {**ui_output, "result": (output_tensor,)}
+        return {**ui_output, "result": (output_tensor, output_mask)}
 
     def _process_single_dci_image(self, image_data, preview_background, index):
         """Process a single DCI image data and return preview result"""
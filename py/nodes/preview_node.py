@@ -1,6 +1,11 @@
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
 try:
     from PIL import Image
-    from ..utils.image_utils import create_checkerboard_background, pil_to_comfyui_format, pil_to_tensor
+    from ..utils.image_utils import create_checkerboard_background, pil_to_comfyui_format, pil_to_tensor, pil_list_to_batch
     _image_support = True
 except ImportError as e:
     print(f"Warning: Image support not available in preview_node: {e}")
@@ -11,12 +16,11 @@ try:
     from .base_node import BaseNode
     from ..utils.i18n import t
     from ..utils.enums import (
-        PreviewBackground, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
+        PreviewBackground, PreviewMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
     )
 except ImportError:
     # Fallback for test environment
     import sys
-    import os
     current_dir = os.path.dirname(os.path.abspath(__file__))
     parent_dir = os.path.dirname(current_dir)
     sys.path.insert(0, parent_dir)
@@ -26,7 +30,7 @@ except ImportError:
         from nodes.base_node import BaseNode
         from utils.i18n import t
         from utils.enums import (
-            PreviewBackground, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
+            PreviewBackground, PreviewMode, translate_ui_to_enum, get_enum_ui_options, get_enum_default_ui_value
         )
     except ImportError as e:
         print(f"Warning: Could not import required modules: {e}")
@@ -41,6 +45,11 @@ except ImportError:
             LIGHT_GRAY = "light_gray"
             DARK_GRAY = "dark_gray"
 
+        class PreviewMode:
+            GRID = "grid"
+            PAGED = "paged"
+            ATLAS = "atlas"
+
         def translate_ui_to_enum(ui_value, enum_class, translator):
             return ui_value
 
@@ -57,7 +66,6 @@ try:
     from ..dci_reader import DCIReader, DCIPreviewGenerator
 except ImportError:
     import sys
-    import os
     current_dir = os.path.dirname(os.path.abspath(__file__))
     sys.path.insert(0, os.path.dirname(current_dir))
     from dci_reader import DCIReader, DCIPreviewGenerator
@@ -75,11 +83,16 @@ class DCIPreviewNode(BaseNode):
                 t("light_background_color"): (get_enum_ui_options(PreviewBackground, t), {"default": get_enum_default_ui_value(PreviewBackground.LIGHT_GRAY, t)}),
                 t("dark_background_color"): (get_enum_ui_options(PreviewBackground, t), {"default": get_enum_default_ui_value(PreviewBackground.DARK_GRAY, t)}),
                 t("text_font_size"): ("INT", {"default": 18, "min": 8, "max": 50, "step": 1}),
+                t("preview_mode"): (get_enum_ui_options(PreviewMode, t), {"default": get_enum_default_ui_value(PreviewMode.GRID, t)}),
+                t("max_canvas_size"): ("INT", {"default": 4096, "min": 512, "max": 16384, "step": 256}),
+                t("max_thumbnail_size"): ("INT", {"default": 256, "min": 16, "max": 1024, "step": 16}),
+                t("max_pages"): ("INT", {"default": 16, "min": 1, "max": 256, "step": 1}),
+                t("max_workers"): ("INT", {"default": 0, "min": 0, "max": 64, "step": 1}),
             }
         }
 
-    RETURN_TYPES = ("IMAGE",)
-    RETURN_NAMES = (t("preview_images"),)
+    RETURN_TYPES = ("IMAGE", "STRING", "MASK")
+    RETURN_NAMES = (t("preview_images"), t("atlas_map"), t("preview_mask"))
     FUNCTION = "execute"
     CATEGORY = f"DCI/{t('Preview')}"
     OUTPUT_NODE = True
@@ -99,7 +112,16 @@ class DCIPreviewNode(BaseNode):
 
         text_font_size = kwargs.get(t("text_font_size")) if t("text_font_size") in kwargs else kwargs.get("text_font_size", 18)
 
-        return self._execute_impl(dci_binary_data, light_background_color, dark_background_color, text_font_size)
+        preview_mode_ui = kwargs.get(t("preview_mode")) if t("preview_mode") in kwargs else kwargs.get("preview_mode")
+        preview_mode = translate_ui_to_enum(preview_mode_ui, PreviewMode, t) if preview_mode_ui else PreviewMode.GRID
+
+        max_canvas_size = kwargs.get(t("max_canvas_size")) if t("max_canvas_size") in kwargs else kwargs.get("max_canvas_size", 4096)
+        max_thumbnail_size = kwargs.get(t("max_thumbnail_size")) if t("max_thumbnail_size") in kwargs else kwargs.get("max_thumbnail_size", 256)
+        max_pages = kwargs.get(t("max_pages")) if t("max_pages") in kwargs else kwargs.get("max_pages", 16)
+        max_workers = kwargs.get(t("max_workers")) if t("max_workers") in kwargs else kwargs.get("max_workers", 0)
+
+        return self._execute_impl(dci_binary_data, light_background_color, dark_background_color, text_font_size,
+                                  preview_mode, max_canvas_size, max_thumbnail_size, max_pages, max_workers)
 
     def _translate_color_to_internal(self, translated_color):
         """Convert translated color name back to internal English name"""
@@ -128,19 +150,20 @@ class DCIPreviewNode(BaseNode):
         }
         return color_mapping.get(translated_color, translated_color)
 
-    def _execute_impl(self, dci_binary_data, light_background_color: PreviewBackground = PreviewBackground.LIGHT_GRAY, dark_background_color: PreviewBackground = PreviewBackground.DARK_GRAY, text_font_size=18):
+    def _execute_impl(self, dci_binary_data, light_background_color: PreviewBackground = PreviewBackground.LIGHT_GRAY, dark_background_color: PreviewBackground = PreviewBackground.DARK_GRAY, text_font_size=18,
+                      preview_mode: PreviewMode = PreviewMode.GRID, max_canvas_size=4096, max_thumbnail_size=256, max_pages=16, max_workers=0):
         """Preview DCI file contents with in-node display and IMAGE output"""
         try:
             if not _image_support:
                 error_msg = "❌ 错误：图像支持不可用\n缺少 PIL/torch 依赖库"
-                return {"ui": {"text": [error_msg]}, "result": (None,)}
+                return {"ui": {"text": [error_msg]}, "result": (None, "", None)}
 
             # Check if binary data is provided
             if dci_binary_data is None:
                 error_msg = "❌ 错误：未提供 DCI 二进制数据\n"
                 error_msg += "请确保连接了有效的 DCI 二进制数据输入。\n"
                 error_msg += "数据来源可以是：DCI File 节点或 Binary File Loader 节点"
-                return {"ui": {"text": [error_msg]}, "result": (None,)}
+                return {"ui": {"text": [error_msg]}, "result": (None, "", None)}
 
             # Handle both single binary data and list of binary data
             binary_data_list = []
@@ -158,64 +181,48 @@ class DCIPreviewNode(BaseNode):
             ui_images = []
             ui_texts = []
 
-            for i, binary_data in enumerate(binary_data_list):
-                print(f"正在处理第 {i+1}/{len(binary_data_list)} 个DCI文件...")
-
-                # Validate individual binary data
-                if not isinstance(binary_data, bytes):
-                    error_msg = f"❌ 错误：第{i+1}个DCI数据类型不正确\n"
-                    error_msg += f"期望类型：bytes，实际类型：{type(binary_data)}\n"
-                    ui_texts.append(error_msg)
-
-                    # Create error preview image
-                    error_preview = self._create_error_preview_image(error_msg, text_font_size)
-                    preview_images.append(error_preview)
-                    ui_images.append(pil_to_comfyui_format(error_preview, f"dci_error_preview_{i}"))
-                    continue
-
-                if len(binary_data) == 0:
-                    error_msg = f"❌ 错误：第{i+1}个DCI二进制数据为空\n"
-                    error_msg += "请检查数据源是否正确生成了 DCI 文件内容"
-                    ui_texts.append(error_msg)
-
-                    # Create error preview image
-                    error_preview = self._create_error_preview_image(error_msg, text_font_size)
-                    preview_images.append(error_preview)
-                    ui_images.append(pil_to_comfyui_format(error_preview, f"dci_error_preview_{i}"))
-                    continue
-
-                # Process individual DCI file
-                result = self._process_single_dci(binary_data, light_background_color, dark_background_color, text_font_size, i)
-
-                if result['preview_image']:
-                    preview_images.append(result['preview_image'])
-                    ui_images.append(result['ui_image'])
-                    ui_texts.append(result['summary_text'])
-                else:
-                    # Error case
-                    error_preview = self._create_error_preview_image(result['error_msg'], text_font_size)
-                    preview_images.append(error_preview)
-                    ui_images.append(pil_to_comfyui_format(error_preview, f"dci_error_preview_{i}"))
-                    ui_texts.append(result['error_msg'])
-
-            # Convert PIL images to ComfyUI tensor format for IMAGE output
-            if preview_images:
-                # Convert all preview images to tensors and stack them
-                image_tensors = []
-                for pil_img in preview_images:
-                    tensor = pil_to_tensor(pil_img)
-                    image_tensors.append(tensor)
-
-                # Stack tensors into batch
-                import torch
-                if len(image_tensors) == 1:
-                    output_tensor = image_tensors[0]
-                else:
-                    output_tensor = torch.cat(image_tensors, dim=0)
-
-                print(f"生成了 {len(preview_images)} 个预览图像，输出张量形状: {output_tensor.shape}")
+            # 0 means one worker per CPU core, capped by the number of files
+            worker_count = self._resolve_worker_count(max_workers, len(binary_data_list))
+            if worker_count > 1:
+                print(f"使用 {worker_count} 个工作线程并行生成预览")
+
+            atlas_map = ""
+            if preview_mode == PreviewMode.ATLAS:
+                # 图集模式：所有DCI的图标打包到少量图集图像中
+                atlas_images, atlas_map, atlas_texts = self._create_atlas_previews(
+                    binary_data_list, text_font_size, max_canvas_size, max_thumbnail_size, max_pages, worker_count
+                )
+                preview_images.extend(atlas_images)
+                ui_images.extend(pil_to_comfyui_format(atlas, f"dci_atlas_{atlas_index}") for atlas_index, atlas in enumerate(atlas_images))
+                ui_texts.extend(atlas_texts)
             else:
-                output_tensor = None
+                # Files are read in parallel, then the tone groups of all files render on one pool;
+                # results come back in input order regardless of completion order
+                plans = self._map_ordered(
+                    lambda item: self._plan_binary_item(item[0], item[1], len(binary_data_list), light_background_color,
+                                                        dark_background_color, text_font_size, preview_mode, max_canvas_size,
+                                                        max_thumbnail_size, max_pages),
+                    list(enumerate(binary_data_list)), worker_count
+                )
+                results = self._run_render_plans(plans, max_workers)
+
+                for i, result in enumerate(results):
+                    if result['preview_image']:
+                        # Paged previews contribute one batch entry per page
+                        preview_images.extend(result['preview_pages'])
+                        ui_images.extend(result['ui_images'])
+                        ui_texts.append(result['summary_text'])
+                    else:
+                        # Error case
+                        error_preview = self._create_error_preview_image(result['error_msg'], text_font_size)
+                        preview_images.append(error_preview)
+                        ui_images.append(pil_to_comfyui_format(error_preview, f"dci_error_preview_{i}"))
+                        ui_texts.append(result['error_msg'])
+
+            # Convert PIL images to one padded ComfyUI batch, previews may differ in size
+            output_tensor, output_mask = pil_list_to_batch(preview_images, with_mask=True)
+            if output_tensor is not None:
+                print(f"生成了 {len(preview_images)} 个预览图像，输出张量形状: {tuple(output_tensor.shape)}")
 
             # Create UI output
             ui_output = {
@@ -225,7 +232,7 @@ class DCIPreviewNode(BaseNode):
                 }
             }
 
-            return {**ui_output, "result": (output_tensor,)}
+            return {**ui_output, "result": (output_tensor, atlas_map, output_mask)}
 
         except Exception as e:
             error_msg = f"❌ 预览生成异常: {str(e)}"
@@ -238,11 +245,135 @@ class DCIPreviewNode(BaseNode):
 
             return {
                 "ui": {"images": [error_base64], "text": [error_msg]},
-                "result": (pil_to_tensor(error_preview) if _image_support else None,)
+                "result": (pil_to_tensor(error_preview) if _image_support else None, "", None)
             }
 
-    def _process_single_dci(self, binary_data, light_background_color, dark_background_color, text_font_size, index):
-        """Process a single DCI binary data and return preview result"""
+    def _resolve_worker_count(self, max_workers, task_count):
+        """Resolve the worker count, where 0 means one worker per CPU core"""
+        if not max_workers or max_workers <= 0:
+            max_workers = os.cpu_count() or 1
+        return max(1, min(max_workers, task_count))
+
+    def _map_ordered(self, func, items, max_workers):
+        """Apply func to items on a thread pool, returning results in input order"""
+        if max_workers <= 1 or len(items) <= 1:
+            return [func(item) for item in items]
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+            return list(executor.map(func, items))
+
+    def _read_dci_images(self, index, binary_data):
+        """Read the icon images of one DCI binary, returning (images, error_msg)"""
+        if not isinstance(binary_data, bytes):
+            return [], f"❌ 错误：第{index+1}个DCI数据类型不正确，期望类型：bytes，实际类型：{type(binary_data)}"
+        if len(binary_data) == 0:
+            return [], f"❌ 错误：第{index+1}个DCI二进制数据为空"
+
+        reader = DCIReader(binary_data=binary_data)
+        if not reader.read():
+            return [], f"❌ 错误：无法读取第{index+1}个DCI数据 ({len(binary_data)} 字节)"
+
+        images = reader.get_icon_images()
+        if not images:
+            return [], f"❌ 错误：第{index+1}个DCI文件中未找到图像"
+
+        for img in images:
+            img['source'] = index
+        return images, None
+
+    def _create_atlas_previews(self, binary_data_list, text_font_size, max_atlas_size, max_thumbnail_size, max_atlases, max_workers):
+        """Pack the icons of all DCI binaries into atlas images with a JSON coordinate map"""
+        read_results = self._map_ordered(lambda item: self._read_dci_images(item[0], item[1]),
+                                         list(enumerate(binary_data_list)), max_workers)
+
+        all_images = []
+        texts = []
+        for index, (images, error_msg) in enumerate(read_results):
+            if error_msg:
+                texts.append(error_msg)
+            else:
+                all_images.extend(images)
+                texts.append(self._format_detailed_summary(images, f"binary_data_{index}", text_font_size))
+
+        generator = DCIPreviewGenerator(font_size=text_font_size)
+        atlases, placements = generator.create_atlas(all_images, max_atlas_size, max_thumbnail_size)
+
+        if max_atlases and len(atlases) > max_atlases:
+            print(f"图集数量 {len(atlases)} 超过上限 {max_atlases}，仅输出前 {max_atlases} 张")
+            atlases = atlases[:max_atlases]
+            placements = [placement for placement in placements if placement['atlas'] < max_atlases]
+
+        if not atlases:
+            atlases = [generator.create_preview_grid([], 1)]
+
+        atlas_map = json.dumps({
+            'atlases': [{'index': atlas_index, 'width': atlas.width, 'height': atlas.height}
+                        for atlas_index, atlas in enumerate(atlases)],
+            'icons': placements,
+        }, ensure_ascii=False)
+
+        texts.append(f"🗺️ 图集预览: {len(placements)} 个图标打包到 {len(atlases)} 张图集 "
+                     f"(图集尺寸: {atlases[0].width}x{atlases[0].height}, 最大缩略图: {max_thumbnail_size}px)")
+        return atlases, atlas_map, texts
+
+    def _plan_binary_item(self, index, binary_data, total, light_background_color, dark_background_color, text_font_size,
+                          preview_mode, max_canvas_size, max_thumbnail_size, max_pages):
+        """Validate one entry of the binary data list and plan the rendering of its preview"""
+        print(f"正在处理第 {index+1}/{total} 个DCI文件...")
+
+        # Validate individual binary data
+        if not isinstance(binary_data, bytes):
+            error_msg = f"❌ 错误：第{index+1}个DCI数据类型不正确\n"
+            error_msg += f"期望类型：bytes，实际类型：{type(binary_data)}\n"
+            return {'result': {'preview_image': None, 'ui_image': None, 'summary_text': error_msg, 'error_msg': error_msg}}
+
+        if len(binary_data) == 0:
+            error_msg = f"❌ 错误：第{index+1}个DCI二进制数据为空\n"
+            error_msg += "请检查数据源是否正确生成了 DCI 文件内容"
+            return {'result': {'preview_image': None, 'ui_image': None, 'summary_text': error_msg, 'error_msg': error_msg}}
+
+        # Process individual DCI file
+        return self._plan_single_dci(binary_data, light_background_color, dark_background_color, text_font_size, index,
+                                     preview_mode, max_canvas_size, max_thumbnail_size, max_pages)
+
+    def _run_render_plans(self, plans, max_workers):
+        """Run the render tasks of all plans on one thread pool and finish each plan
+
+        A plan is either {'result': result} or {'index', 'tasks', 'finish'}, where
+        finish turns the outputs of the plan's tasks into its result. Tasks of all
+        files share the pool, so the Light and Dark groups of a single DCI render
+        in parallel and no pool is nested inside another.
+        """
+        def run(task):
+            try:
+                return task(), None
+            except Exception as e:
+                return None, e
+
+        tasks = [task for plan in plans for task in plan.get('tasks', ())]
+        outputs = self._map_ordered(run, tasks, self._resolve_worker_count(max_workers, len(tasks)))
+
+        results = []
+        offset = 0
+        for plan in plans:
+            if 'result' in plan:
+                results.append(plan['result'])
+                continue
+
+            plan_outputs = outputs[offset:offset + len(plan['tasks'])]
+            offset += len(plan['tasks'])
+            errors = [error for _, error in plan_outputs if error is not None]
+            try:
+                if errors:
+                    raise errors[0]
+                results.append(plan['finish']([output for output, _ in plan_outputs]))
+            except Exception as e:
+                error_msg = f"❌ 处理第{plan['index']+1}个DCI文件时发生异常: {str(e)}"
+                results.append({'preview_image': None, 'ui_image': None, 'summary_text': error_msg, 'error_msg': error_msg})
+        return results
+
+    def _plan_single_dci(self, binary_data, light_background_color, dark_background_color, text_font_size, index,
+                         preview_mode=PreviewMode.GRID, max_canvas_size=4096, max_thumbnail_size=256, max_pages=16):
+        """Read a single DCI binary data and plan one render task per tone group"""
         try:
             # Use binary data
             reader = DCIReader(binary_data=binary_data)
@@ -258,12 +389,12 @@ class DCIPreviewNode(BaseNode):
                 error_msg += "2. 文件头损坏或格式不正确\n"
                 error_msg += "3. 数据在传输过程中被截断"
 
-                return {
+                return {'result': {
                     'preview_image': None,
                     'ui_image': None,
                     'summary_text': error_msg,
                     'error_msg': error_msg
-                }
+                }}
 
             # Extract images with detailed error reporting
             images = reader.get_icon_images()
@@ -285,12 +416,12 @@ class DCIPreviewNode(BaseNode):
                 error_msg += "2. 图像数据解析失败\n"
                 error_msg += "3. 文件格式版本不兼容"
 
-                return {
+                return {'result': {
                     'preview_image': None,
                     'ui_image': None,
                     'summary_text': error_msg,
                     'error_msg': error_msg
-                }
+                }}
 
             # 根据色调将图像分成Light和Dark两组
             light_images = [img for img in images if img['tone'].lower() == 'light']
@@ -301,55 +432,83 @@ class DCIPreviewNode(BaseNode):
             light_bg_color = self._get_background_color(str(light_background_color))
             dark_bg_color = self._get_background_color(str(dark_background_color))
 
-            # 生成预览图像
-            generator = DCIPreviewGenerator(font_size=text_font_size)
-
-            # 为Light和Dark分别生成单列预览
-            light_preview = self._create_preview_with_special_background(generator, light_images, 1, str(light_background_color), light_bg_color) if light_images else None
-            dark_preview = self._create_preview_with_special_background(generator, dark_images, 1, str(dark_background_color), dark_bg_color) if dark_images else None
-
-            # 如果有其他色调，将它们添加到默认组(Light)
-            if other_images:
-                if light_preview:
-                    # 如果已有Light预览，合并到Light预览中
-                    combined_images = light_images + other_images
-                    light_preview = self._create_preview_with_special_background(generator, combined_images, 1, str(light_background_color), light_bg_color)
+            # Light和Dark两组各是一个渲染任务，每组使用独立的生成器
+            if preview_mode == PreviewMode.PAGED:
+                # 分页预览：限制画布和缩略图尺寸，其他色调归入Light组
+                tasks, combine_pages = self._plan_paged_previews(
+                    text_font_size, light_images + other_images, dark_images,
+                    str(light_background_color), light_bg_color, str(dark_background_color), dark_bg_color,
+                    max_canvas_size, max_thumbnail_size, max_pages
+                )
+
+                def finish_paged(outputs):
+                    preview_pages = combine_pages(outputs)
+                    ui_images = [pil_to_comfyui_format(page, f"dci_preview_{index}_{page_index}") for page_index, page in enumerate(preview_pages)]
+                    summary_text = self._format_detailed_summary(images, source_name, text_font_size)
+                    summary_text += f"\n📄 分页预览: {len(preview_pages)} 页 (最大画布: {max_canvas_size}px, 最大缩略图: {max_thumbnail_size}px)"
+
+                    return {
+                        'preview_image': preview_pages[0],
+                        'preview_pages': preview_pages,
+                        'ui_image': ui_images[0],
+                        'ui_images': ui_images,
+                        'summary_text': summary_text,
+                        'error_msg': None
+                    }
+
+                return {'index': index, 'tasks': tasks, 'finish': finish_paged}
+
+            # 为Light和Dark分别生成单列预览，其他色调添加到默认组(Light)
+            def render_group(group_images, background_name, background_color):
+                if not group_images:
+                    return None
+                return self._create_preview_with_special_background(
+                    DCIPreviewGenerator(font_size=text_font_size), group_images, 1, background_name, background_color)
+
+            tasks = [
+                partial(render_group, light_images + other_images, str(light_background_color), light_bg_color),
+                partial(render_group, dark_images, str(dark_background_color), dark_bg_color),
+            ]
+
+            def finish_grid(outputs):
+                light_preview, dark_preview = outputs
+
+                # 合并Light和Dark预览（如果两者都存在）
+                if light_preview and dark_preview:
+                    preview_image = self._combine_preview_images(light_preview, dark_preview)
+                elif light_preview:
+                    preview_image = light_preview
+                elif dark_preview:
+                    preview_image = dark_preview
                 else:
-                    # 否则创建新的预览
-                    light_preview = self._create_preview_with_special_background(generator, other_images, 1, str(light_background_color), light_bg_color)
-
-            # 合并Light和Dark预览（如果两者都存在）
-            if light_preview and dark_preview:
-                preview_image = self._combine_preview_images(light_preview, dark_preview)
-            elif light_preview:
-                preview_image = light_preview
-            elif dark_preview:
-                preview_image = dark_preview
-            else:
-                # 创建空预览
-                preview_image = self._create_preview_with_special_background(generator, [], 1, str(light_background_color), light_bg_color)
+                    # 创建空预览
+                    preview_image = self._create_preview_with_special_background(DCIPreviewGenerator(font_size=text_font_size), [], 1, str(light_background_color), light_bg_color)
 
-            # Convert PIL image to base64 for UI display
-            preview_base64 = pil_to_comfyui_format(preview_image, f"dci_preview_{index}")
+                # Convert PIL image to base64 for UI display
+                preview_base64 = pil_to_comfyui_format(preview_image, f"dci_preview_{index}")
 
-            # Generate summary text
-            summary_text = self._format_detailed_summary(images, source_name, text_font_size)
+                # Generate summary text
+                summary_text = self._format_detailed_summary(images, source_name, text_font_size)
 
-            return {
-                'preview_image': preview_image,
-                'ui_image': preview_base64,
-                'summary_text': summary_text,
-                'error_msg': None
-            }
+                return {
+                    'preview_image': preview_image,
+                    'preview_pages': [preview_image],
+                    'ui_image': preview_base64,
+                    'ui_images': [preview_base64],
+                    'summary_text': summary_text,
+                    'error_msg': None
+                }
+
+            return {'index': index, 'tasks': tasks, 'finish': finish_grid}
 
         except Exception as e:
             error_msg = f"❌ 处理第{index+1}个DCI文件时发生异常: {str(e)}"
-            return {
+            return {'result': {
                 'preview_image': None,
                 'ui_image': None,
                 'summary_text': error_msg,
                 'error_msg': error_msg
-            }
+            }}
 
     def _get_background_color(self, color_name):
         """Get RGB color tuple based on color name"""
@@ -377,6 +536,61 @@ class DCIPreviewNode(BaseNode):
         }
         return color_presets.get(color_name, (240, 240, 240))
 
+    def _plan_paged_previews(self, text_font_size, light_images, dark_images, light_background_name, light_background_color,
+                             dark_background_name, dark_background_color, max_canvas_size, max_thumbnail_size, max_pages):
+        """Plan size-capped preview pages with Light and Dark pages placed side by side
+
+        Returns (tasks, combine): one render task per non-empty tone group, and a
+        function that combines the task outputs into the final pages.
+        """
+        groups = [(group_images, background_name, background_color)
+                  for group_images, background_name, background_color in (
+                      (light_images, light_background_name, light_background_color),
+                      (dark_images, dark_background_name, dark_background_color))
+                  if group_images]
+
+        if not groups:
+            def render_empty():
+                return [self._create_preview_with_special_background(DCIPreviewGenerator(font_size=text_font_size), [], 1,
+                                                                     light_background_name, light_background_color)]
+            return [render_empty], lambda outputs: outputs[0]
+
+        # Split the canvas width between the tone groups shown side by side
+        group_width = max_canvas_size // len(groups)
+
+        def render_group(group_images, background_name, background_color):
+            # The generator keeps per-call colour state, so each group gets its own
+            generator = DCIPreviewGenerator(font_size=text_font_size)
+            pages = generator.create_preview_pages(
+                group_images, len(group_images),
+                (255, 255, 255) if background_name in ("transparent", "checkerboard") else background_color,
+                max_canvas_width=group_width, max_canvas_height=max_canvas_size,
+                max_cell_image_size=max_thumbnail_size, max_pages=max_pages
+            )
+            return [self._apply_special_background(page, background_name) for page in pages], background_color
+
+        def combine(group_pages):
+            page_count = max(len(pages) for pages, _ in group_pages)
+            combined_pages = []
+            for page_index in range(page_count):
+                combined = None
+                for pages, background_color in group_pages:
+                    # Pad groups that have fewer pages with a blank page of the same size
+                    page = pages[page_index] if page_index < len(pages) else Image.new('RGB', pages[0].size, background_color)
+                    combined = page if combined is None else self._combine_preview_images(combined, page)
+                combined_pages.append(combined)
+            return combined_pages
+
+        return [partial(render_group, *group) for group in groups], combine
+
+    def _apply_special_background(self, preview, background_name):
+        """Apply transparent or checkerboard post-processing to a preview rendered on white"""
+        if background_name == "transparent":
+            return self._apply_transparent_background(preview)
+        elif background_name == "checkerboard":
+            return self._apply_checkerboard_to_preview(preview)
+        return preview
+
     def _create_preview_with_special_background(self, generator, images, grid_cols, background_name, background_color):
         """Create preview with special handling for transparent and checkerboard backgrounds"""
         if background_name == "transparent":
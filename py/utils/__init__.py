@@ -8,7 +8,7 @@ from .ui_utils import format_file_size, format_dci_path, format_image_info, form
 
 # Try to import image utilities (may fail if torch/PIL not available)
 try:
-    from .image_utils import tensor_to_pil, create_checkerboard_background, apply_background, pil_to_comfyui_format
+    from .image_utils import tensor_to_pil, create_checkerboard_background, apply_background, pil_to_comfyui_format, pil_list_to_batch
     _image_utils_available = True
 except ImportError as e:
     print(f"Warning: Image utilities not available: {e}")
@@ -37,4 +37,5 @@ if _image_utils_available:
         'create_checkerboard_background',
         'apply_background',
         'pil_to_comfyui_format',
+        'pil_list_to_batch',
     ])
@@ -0,0 +1,218 @@
+"""
+Random-access ar archives
+
+Debian packages are ar archives. ArArchive maps an archive file into memory
+and indexes the member headers only, so members are read in place by offset
+and members that are not needed (such as data.tar of a base package) are never
+touched. ArWriter streams members from bytes or file objects. GNU long member
+names, stored in a "//" name table and referenced as "/<offset>", are
+supported by both.
+"""
+
+import mmap
+import os
+import shutil
+import time
+from collections import OrderedDict
+
+AR_MAGIC = b"!<arch>\n"
+AR_HEADER_SIZE = 60
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Member names that hold archive metadata rather than files
+SYMBOL_TABLE_NAMES = ("/", "/SYM64/")
+LONG_NAME_TABLE = "//"
+
+
+def iter_ar_members(fileobj):
+    """Yield (name, offset, size) for each member of an ar archive without reading its content
+
+    GNU long names are resolved and the symbol and name tables are skipped.
+    The file position is left undefined; use ArMemberReader to read a member.
+    """
+    fileobj.seek(0)
+    if fileobj.read(len(AR_MAGIC)) != AR_MAGIC:
+        raise ValueError("not an ar archive")
+
+    long_names = b""
+    position = len(AR_MAGIC)
+    while True:
+        fileobj.seek(position)
+        header = fileobj.read(AR_HEADER_SIZE)
+        if len(header) < AR_HEADER_SIZE:
+            return
+        if header[58:60] != b"`\n":
+            raise ValueError(f"invalid ar member header at offset {position}")
+
+        name = header[0:16].decode("ascii").rstrip(" ")
+        size = int(header[48:58].decode("ascii").strip())
+        offset = position + AR_HEADER_SIZE
+        # Member data is padded to an even length
+        position = offset + size + (size & 1)
+
+        if name == LONG_NAME_TABLE:
+            fileobj.seek(offset)
+            long_names = fileobj.read(size)
+            continue
+        if name in SYMBOL_TABLE_NAMES:
+            continue
+        if name.startswith("/") and name[1:].isdigit():
+            start = int(name[1:])
+            end = long_names.find(b"/\n", start)
+            if end < 0:
+                raise ValueError(f"invalid ar long name reference {name}")
+            name = long_names[start:end].decode("utf-8")
+        else:
+            name = name.rstrip("/")
+
+        yield name, offset, size
+
+
+class ArMemberReader:
+    """Read-only file object over one ar member of an open archive
+
+    Every read seeks to its own position first, so several readers may share
+    the underlying file as long as they are not used from different threads.
+    """
+
+    def __init__(self, fileobj, offset, size):
+        self.fileobj = fileobj
+        self.offset = offset
+        self.size = size
+        self._position = 0
+
+    def read(self, size=-1):
+        remaining = self.size - self._position
+        if size is None or size < 0 or size > remaining:
+            size = remaining
+        if size <= 0:
+            return b""
+
+        self.fileobj.seek(self.offset + self._position)
+        data = self.fileobj.read(size)
+        self._position += len(data)
+        return data
+
+    def seek(self, offset, whence=0):
+        if whence == 1:
+            offset += self._position
+        elif whence == 2:
+            offset += self.size
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+
+class ArArchive:
+    """Header index of an ar archive file mapped into memory"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = None
+        try:
+            if os.fstat(self._file.fileno()).st_size < len(AR_MAGIC):
+                raise ValueError("not an ar archive")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.members = OrderedDict((name, (offset, size)) for name, offset, size in iter_ar_members(self._map))
+        except Exception:
+            self.close()
+            raise
+
+    def find(self, prefix):
+        """Return the name of the first member starting with prefix, or None"""
+        return next((name for name in self.members if name.startswith(prefix)), None)
+
+    def open(self, name):
+        """Return a file object reading a member in place"""
+        offset, size = self.members[name]
+        return ArMemberReader(self._map, offset, size)
+
+    def read(self, name):
+        """Return the content of a member"""
+        offset, size = self.members[name]
+        return self._map[offset:offset + size]
+
+    def extract(self, name, path):
+        """Copy a member to a file without holding it in memory"""
+        with open(path, "wb") as f:
+            shutil.copyfileobj(self.open(name), f, COPY_BUFFER_SIZE)
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def _needs_long_name(name):
+    # Short names are stored with a trailing "/" in the 16 byte name field
+    return len(name.encode("utf-8")) > 15 or "/" in name or " " in name
+
+
+class ArWriter:
+    """Stream members into an ar archive
+
+    The GNU name table has to precede the members, so names that do not fit
+    the 16 byte header field must be passed as long_names up front.
+    """
+
+    def __init__(self, fileobj, long_names=()):
+        self.fileobj = fileobj
+        self._long_names = {}
+
+        fileobj.write(AR_MAGIC)
+
+        table = bytearray()
+        for name in long_names:
+            if _needs_long_name(name) and name not in self._long_names:
+                self._long_names[name] = len(table)
+                table += name.encode("utf-8") + b"/\n"
+        if table:
+            self._write_header(LONG_NAME_TABLE, len(table), blank=True)
+            self._write_data(bytes(table), len(table))
+
+    def add(self, name, size, source, mtime=None, mode=0o100644):
+        """Write one member with a precomputed size, copying content from bytes or a file object"""
+        if _needs_long_name(name):
+            if name not in self._long_names:
+                raise ValueError(f"ar member name {name!r} needs a long name table entry")
+            name_field = f"/{self._long_names[name]}"
+        else:
+            name_field = name + "/"
+
+        self._write_header(name_field, size, mtime, mode)
+        self._write_data(source, size)
+
+    def add_file(self, path, name=None):
+        """Stream a file into the archive as a member"""
+        stat = os.stat(path)
+        with open(path, "rb") as f:
+            self.add(name or os.path.basename(path), stat.st_size, f, stat.st_mtime)
+
+    def _write_header(self, name_field, size, mtime=None, mode=0o100644, blank=False):
+        # Format: name(16) + date(12) + uid(6) + gid(6) + mode(8) + size(10) + end(2)
+        if blank:
+            fields = f"{name_field:<16}{'':<12}{'':<6}{'':<6}{'':<8}{size:<10}"
+        else:
+            date = int(mtime if mtime is not None else time.time())
+            fields = f"{name_field:<16}{date:<12}{0:<6}{0:<6}{mode:<8o}{size:<10}"
+        self.fileobj.write(fields.encode("ascii") + b"`\n")
+
+    def _write_data(self, source, size):
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.fileobj.write(source)
+        else:
+            shutil.copyfileobj(source, self.fileobj, COPY_BUFFER_SIZE)
+
+        # Add padding if the member size is odd
+        if size % 2 == 1:
+            self.fileobj.write(b"\n")
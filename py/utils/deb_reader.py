@@ -0,0 +1,89 @@
+"""
+Streaming reader for Debian packages
+
+ar members are located by walking their headers in the open package file (see
+ar_archive) and are read in place through a bounded reader. The control and
+data tarballs are decompressed by tarfile in stream mode, so a package is read
+in one pass with no temporary files, and only the members that are wanted are
+read into memory. Hardlinks are resolved to the data of their target.
+"""
+
+import copy
+import tarfile
+
+TAR_STREAM_MODES = {
+    ".tar": "r|",
+    ".tar.gz": "r|gz",
+    ".tar.xz": "r|xz",
+    ".tar.bz2": "r|bz2",
+}
+
+
+def tar_stream_mode(member_name):
+    """Return the tarfile stream mode for an ar member such as data.tar.xz"""
+    for suffix, mode in TAR_STREAM_MODES.items():
+        if member_name.endswith(suffix):
+            return mode
+    # Unknown compression, let tarfile detect it
+    return "r|*"
+
+
+def tar_member_path(name):
+    """Return a tar member or link name without its leading './'"""
+    return name[2:] if name.startswith("./") else name
+
+
+def resolve_hardlink(member, targets):
+    """Return (link, target) for a hardlink to a regular file in targets, otherwise None
+
+    targets maps tar_member_path names to regular file members. link is a copy
+    of member with the size of its target, and is added to targets so links
+    to the link resolve as well.
+    """
+    target = targets.get(tar_member_path(member.linkname))
+    if target is None:
+        return None
+    link = copy.copy(member)
+    link.size = target.size
+    targets[tar_member_path(member.name)] = target
+    return link, target
+
+
+def iter_tar_members(tar_file, select=None, link_content=None):
+    """Yield (member, content) for the members of a tarfile opened in stream mode
+
+    content holds the data of regular files for which select(member) is true
+    and is None for every other member, whose data is skipped without copying.
+    Hardlinks, such as those written by DebPackager's hardlink deduplication,
+    are resolved to the earlier member they name: select and the caller get a
+    copy of the link with its target's size, and its content is the target's
+    data. That data is kept from the selected files, or fetched with
+    link_content(target member name) when it is given, so links to files that
+    were not selected have no content.
+    """
+    targets = {}
+    kept = {}
+    for member in tar_file:
+        content = None
+        if member.isfile():
+            targets[tar_member_path(member.name)] = member
+            if select is None or select(member):
+                content = tar_file.extractfile(member).read()
+                if link_content is None:
+                    kept[member.name] = content
+        elif member.islnk():
+            resolved = resolve_hardlink(member, targets)
+            if resolved is not None:
+                member, target = resolved
+                if select is None or select(member):
+                    content = kept.get(target.name) if link_content is None else link_content(target.name)
+        yield member, content
+
+
+def iter_tar_stream(fileobj, mode, select=None, link_content=None):
+    """Yield (member, content) for a tarball read in a single stream pass
+
+    See iter_tar_members for the content of files and hardlinks.
+    """
+    with tarfile.open(fileobj=fileobj, mode=mode) as tar_file:
+        yield from iter_tar_members(tar_file, select, link_content)
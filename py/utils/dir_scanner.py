@@ -0,0 +1,117 @@
+"""
+Directory scanning with os.scandir
+
+Entries are classified from the type information cached in each DirEntry, so
+a regular file or directory costs no extra stat call (symlinks are stat'ed
+once when followed). Include and exclude patterns are compiled into single
+regular expressions by compile_file_filter and matched against the path
+relative to the scanned root. Directories of one depth level can be listed
+on a thread pool, since scandir releases the GIL while reading.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from .file_utils import compile_file_filter
+except ImportError:
+    from utils.file_utils import compile_file_filter
+
+
+def _scan_one(directory, relative_dir, matches, excludes, skip_symlinks, descend):
+    """List one directory, returning (matching files, skipped symlinks, subdirectories)
+
+    Subdirectories are (path, relative path, is symlink) and are only collected
+    when descend is true.
+    """
+    files = []
+    skipped = []
+    subdirs = []
+
+    try:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                relative_path = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+                if excludes is not None and excludes(relative_path):
+                    continue
+
+                try:
+                    is_symlink = entry.is_symlink()
+                    if is_symlink and skip_symlinks:
+                        skipped.append(entry.path)
+                        continue
+
+                    if entry.is_file():
+                        if matches(relative_path):
+                            files.append(entry.path)
+                    elif descend and entry.is_dir():
+                        subdirs.append((entry.path, relative_path, is_symlink))
+                except OSError:
+                    # Broken symlinks and entries removed while scanning
+                    continue
+    except PermissionError:
+        print(f"警告：无权限访问目录: {directory}")
+    except OSError as e:
+        print(f"警告：扫描目录时出错: {directory} - {str(e)}")
+
+    return files, skipped, subdirs
+
+
+def scan_directory(root, file_filter="*", recursive=True, skip_symlinks=False, exclude="", max_depth=None, workers=1):
+    """Find files under root whose relative path matches file_filter
+
+    exclude uses the same pattern syntax and prunes matching files and
+    directories. max_depth limits how many directory levels below root are
+    entered (0 lists root only, None is unlimited); recursive=False is the same
+    as max_depth=0. Symlinked directories are followed unless skip_symlinks is
+    set, each real directory at most once through a link, so link cycles end.
+    With workers > 1 the directories of each level are listed on that many
+    threads.
+    Returns (matching files, skipped symlinks) as sorted paths joined to root.
+    """
+    matches = compile_file_filter(file_filter)
+    excludes = compile_file_filter(exclude) if exclude and exclude.strip(" ,;") else None
+    if not recursive:
+        max_depth = 0
+    if max_depth is not None and max_depth < 0:
+        max_depth = None
+
+    matching_files = []
+    skipped_symlinks = []
+    followed = {os.path.realpath(root)}
+
+    executor = ThreadPoolExecutor(max_workers=workers) if workers and workers > 1 else None
+    try:
+        level = [(root, "")]
+        depth = 0
+        while level:
+            descend = max_depth is None or depth < max_depth
+            args = [(directory, relative_dir, matches, excludes, skip_symlinks, descend)
+                    for directory, relative_dir in level]
+            if executor is not None and len(level) > 1:
+                results = executor.map(lambda arg: _scan_one(*arg), args)
+            else:
+                results = (_scan_one(*arg) for arg in args)
+
+            next_level = []
+            for files, skipped, subdirs in results:
+                matching_files.extend(files)
+                skipped_symlinks.extend(skipped)
+                for path, relative_path, is_symlink in subdirs:
+                    if is_symlink:
+                        real_path = os.path.realpath(path)
+                        if real_path in followed:
+                            continue
+                        followed.add(real_path)
+                    next_level.append((path, relative_path))
+
+            level = next_level
+            depth += 1
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    # Sort final results for consistent ordering
+    matching_files.sort()
+    skipped_symlinks.sort()
+    return matching_files, skipped_symlinks
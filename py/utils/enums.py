@@ -101,6 +101,56 @@ class PreviewBackground(Enum):
         return self.value
 
 
+class PreviewMode(Enum):
+    """Preview layout mode enumeration"""
+    GRID = "grid"
+    PAGED = "paged"
+    ATLAS = "atlas"
+
+    def __str__(self):
+        return self.value
+
+
+class DebCompression(Enum):
+    """Compression of the data member in Debian packages"""
+    GZIP = "gzip"
+    XZ = "xz"
+    NONE = "none"
+
+    def __str__(self):
+        return self.value
+
+
+class DedupMode(Enum):
+    """How identical files are stored in Debian packages"""
+    NONE = "none"
+    HARDLINK = "hardlink"
+    SYMLINK = "symlink"
+
+    def __str__(self):
+        return self.value
+
+
+class ImageBatchMode(Enum):
+    """How loaders batch decoded images of different sizes"""
+    BUCKET = "bucket"
+    PAD = "pad"
+
+    def __str__(self):
+        return self.value
+
+
+class CatalogQuery(Enum):
+    """Questions the DCI catalogue query node answers"""
+    MISSING_VARIANTS = "missing_variants"
+    COVERAGE = "coverage"
+    SIZE_REPORT = "size_report"
+    LARGEST_ICONS = "largest_icons"
+
+    def __str__(self):
+        return self.value
+
+
 # Utility functions for enum conversion
 def string_to_image_format(value: str) -> ImageFormat:
     """Convert string to ImageFormat enum"""
@@ -1,4 +1,6 @@
 import os
+import re
+import fnmatch
 import tempfile
 from io import BytesIO
 
@@ -15,6 +17,21 @@ def get_output_directory():
 
     return output_dir
 
+def get_cache_directory(name=""):
+    """Get (and create) a persistent cache directory for the DCI nodes"""
+    try:
+        import folder_paths
+        cache_dir = os.path.join(folder_paths.get_user_directory(), "dci_cache")
+    except ImportError:
+        cache_dir = os.path.join(tempfile.gettempdir(), "comfyui_dci_cache")
+    except Exception as e:
+        print(f"Error accessing ComfyUI user directory: {e}")
+        cache_dir = os.path.join(tempfile.gettempdir(), "comfyui_dci_cache")
+
+    cache_dir = os.path.join(cache_dir, name) if name else cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
 def clean_file_name(file_name):
     """Clean up file name by removing path separators"""
     clean_name = os.path.basename(file_name) if file_name else "binary_file"
@@ -50,3 +67,29 @@ def load_binary_data(file_path):
     except Exception as e:
         print(f"Error loading binary data: {e}")
         return None
+
+def compile_file_filter(file_filter):
+    """Compile a comma or semicolon separated list of glob patterns into one matcher
+
+    Patterns without '/' match the file name, patterns containing '/' match the
+    whole relative path (e.g. '*/48/*.dci'). All patterns are translated into a
+    single regular expression once. Returns a function taking a relative path.
+    Matching ignores case on Windows, as fnmatch.fnmatch does.
+    """
+    patterns = [pattern.strip() for pattern in (file_filter or "").replace(';', ',').split(',')]
+    patterns = [pattern for pattern in patterns if pattern]
+
+    name_patterns = [pattern for pattern in patterns if '/' not in pattern]
+    path_patterns = [pattern.lstrip('/') for pattern in patterns if '/' in pattern]
+    path_patterns = [pattern[2:] if pattern.startswith('./') else pattern for pattern in path_patterns]
+
+    flags = re.IGNORECASE if os.name == 'nt' else 0
+    name_regex = re.compile('|'.join(fnmatch.translate(pattern) for pattern in name_patterns), flags) if name_patterns else None
+    path_regex = re.compile('|'.join(fnmatch.translate(pattern) for pattern in path_patterns), flags) if path_patterns else None
+
+    def matches(path):
+        if name_regex is not None and name_regex.match(path.rsplit('/', 1)[-1]):
+            return True
+        return path_regex is not None and path_regex.match(path) is not None
+
+    return matches
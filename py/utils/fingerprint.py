@@ -0,0 +1,62 @@
+"""
+Cheap change fingerprints for file-reading nodes
+
+ComfyUI calls a node's IS_CHANGED with its inputs before a run and only
+executes the node (and everything downstream) again when the returned value
+differs from the last one. These helpers build such values from stat results,
+which costs one stat call per file, and optionally from file content.
+"""
+
+import hashlib
+import os
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def _stat_state(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return "missing"
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def hash_file(path):
+    """Return the sha256 hex digest of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, hash_content=False):
+    """Fingerprint of one file from its size and mtime, or from its content
+
+    With hash_content, rewriting or touching a file without changing its
+    content keeps the fingerprint, at the cost of reading the whole file.
+    """
+    path = os.path.abspath(path)
+    if hash_content:
+        try:
+            state = hash_file(path)
+        except OSError:
+            state = "missing"
+    else:
+        state = _stat_state(path)
+    return hashlib.sha256(f"{path}\0{state}".encode('utf-8')).hexdigest()
+
+
+def tree_fingerprint(paths, root=None, *params):
+    """Digest of the size and mtime of every path, plus any extra parameters
+
+    Paths are recorded relative to root when it is given, so the digest of a
+    scanned tree covers added, removed, renamed and modified files.
+    """
+    digest = hashlib.sha256()
+    for value in params:
+        digest.update(f"{value!r}\n".encode('utf-8'))
+    for path in paths:
+        name = os.path.relpath(path, root) if root else os.path.abspath(path)
+        digest.update(f"{name}\0{_stat_state(path)}\n".encode('utf-8'))
+    return digest.hexdigest()
@@ -13,6 +13,9 @@ import os
 import tempfile
 import hashlib
 import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 def tensor_to_pil(image):
     """Convert ComfyUI image tensor to PIL Image"""
@@ -70,6 +73,224 @@ def pil_to_tensor(pil_image):
 
     return tensor
 
+def pil_list_to_batch(pil_images, fill_value=0.0, with_mask=False):
+    """Convert PIL Images of different sizes into one padded ComfyUI image batch
+
+    The batch is preallocated at the largest height and width and each image is
+    written into the top-left corner of its slot; the rest is set to fill_value.
+    Returns (batch, mask), where mask has shape [N, H, W] with 1.0 on valid
+    pixels and 0.0 on padding, or None if with_mask is False.
+    """
+    if not pil_images:
+        return None, None
+
+    height = max(img.height for img in pil_images)
+    width = max(img.width for img in pil_images)
+
+    batch = np.full((len(pil_images), height, width, 3), fill_value, dtype=np.float32)
+    mask = np.zeros((len(pil_images), height, width), dtype=np.float32) if with_mask else None
+
+    for i, pil_image in enumerate(pil_images):
+        if pil_image.mode == 'RGBA':
+            # Composite RGBA on white background like pil_to_tensor
+            rgb_image = Image.new('RGB', pil_image.size, (255, 255, 255))
+            rgb_image.paste(pil_image, mask=pil_image.split()[-1])
+            pil_image = rgb_image
+        elif pil_image.mode != 'RGB':
+            pil_image = pil_image.convert('RGB')
+
+        # Scale straight into the batch slot without a float intermediate
+        np.multiply(np.asarray(pil_image), np.float32(1.0 / 255.0),
+                    out=batch[i, :pil_image.height, :pil_image.width], casting='unsafe')
+        if mask is not None:
+            mask[i, :pil_image.height, :pil_image.width] = 1.0
+
+    if HAS_TORCH:
+        # from_numpy shares memory, so the batch is not copied again
+        batch = torch.from_numpy(batch)
+        mask = torch.from_numpy(mask) if mask is not None else None
+
+    return batch, mask
+
+def decode_image_array(binary_data):
+    """Decode image bytes into an RGB uint8 array of shape [H, W, 3], or None if they are not an image"""
+    try:
+        with Image.open(BytesIO(binary_data)) as pil_image:
+            # Convert to RGB if necessary (handle RGBA, grayscale, etc.)
+            rgb_image = pil_image.convert('RGB') if pil_image.mode != 'RGB' else pil_image
+            return np.asarray(rgb_image)
+    except Exception:
+        return None
+
+def decode_image_arrays(contents, workers=0):
+    """Decode a list of image bytes with decode_image_array on a thread pool
+
+    PIL releases the GIL while decoding, so images are decoded on workers
+    threads (0 means one per CPU core). Results keep the input order.
+    """
+    workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+    if workers == 1 or len(contents) < 2:
+        return [decode_image_array(content) for content in contents]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(decode_image_array, contents))
+
+def _fill_batch(batch, arrays, workers=0):
+    """Scale uint8 arrays into the top-left corner of their batch slots on workers threads"""
+    def fill(indices):
+        for i in indices:
+            height, width = arrays[i].shape[:2]
+            np.multiply(arrays[i], np.float32(1.0 / 255.0), out=batch[i, :height, :width], casting='unsafe')
+
+    # numpy releases the GIL for the conversion, so slots are filled in parallel
+    workers = min(workers if workers and workers > 0 else (os.cpu_count() or 1), len(arrays))
+    if workers <= 1:
+        fill(range(len(arrays)))
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(fill, [range(start, len(arrays), workers) for start in range(workers)]))
+
+def array_list_to_batch(arrays, workers=0):
+    """Convert equally sized RGB uint8 arrays into one ComfyUI image batch
+
+    The float32 batch is preallocated and every image is scaled straight into
+    its slot on workers threads (0 means one per CPU core). Raises ValueError
+    if the arrays differ in shape.
+    """
+    if not arrays:
+        return None
+
+    shape = arrays[0].shape
+    for array in arrays:
+        if array.shape != shape:
+            raise ValueError(f"图像尺寸不一致，无法组成批次: {shape} 与 {array.shape}")
+
+    batch = np.empty((len(arrays),) + shape, dtype=np.float32)
+    _fill_batch(batch, arrays, workers)
+
+    if HAS_TORCH:
+        # from_numpy shares memory, so the batch is not copied again
+        batch = torch.from_numpy(batch)
+    return batch
+
+def batch_image_arrays(arrays, pad=False, fill_value=0.0, workers=0):
+    """Assemble RGB uint8 arrays of any sizes into preallocated ComfyUI image batches
+
+    By default images are grouped by resolution into one batch per size, in
+    order of first appearance. With pad, all images go into a single batch at
+    the largest size, padded to the bottom and right with fill_value.
+    Returns (batches, masks, order): masks have shape [N, H, W] with 1.0 on
+    image pixels and 0.0 on padding, and order lists the input index of every
+    batch entry in turn.
+    """
+    if not arrays:
+        return [], [], []
+
+    if pad:
+        groups = [list(range(len(arrays)))]
+    else:
+        by_size = {}
+        for i, array in enumerate(arrays):
+            by_size.setdefault(array.shape[:2], []).append(i)
+        groups = list(by_size.values())
+
+    batches = []
+    masks = []
+    for group in groups:
+        group_arrays = [arrays[i] for i in group]
+        height = max(array.shape[0] for array in group_arrays)
+        width = max(array.shape[1] for array in group_arrays)
+
+        if all(array.shape[:2] == (height, width) for array in group_arrays):
+            # Nothing to pad, every slot is overwritten
+            batch = np.empty((len(group), height, width, 3), dtype=np.float32)
+            mask = np.ones((len(group), height, width), dtype=np.float32)
+        else:
+            batch = np.full((len(group), height, width, 3), fill_value, dtype=np.float32)
+            mask = np.zeros((len(group), height, width), dtype=np.float32)
+            for i, array in enumerate(group_arrays):
+                mask[i, :array.shape[0], :array.shape[1]] = 1.0
+        _fill_batch(batch, group_arrays, workers)
+
+        if HAS_TORCH:
+            batch = torch.from_numpy(batch)
+            mask = torch.from_numpy(mask)
+        batches.append(batch)
+        masks.append(mask)
+
+    return batches, masks, [i for group in groups for i in group]
+
+# Decoded thumbnails keyed by (content hash, target size), least recently used first,
+# bounded by the bytes of their pixel data
+_thumbnail_cache = OrderedDict()
+_thumbnail_cache_bytes = 0
+_thumbnail_cache_lock = threading.Lock()
+THUMBNAIL_CACHE_BYTES = 128 * 1024 * 1024
+
+def load_thumbnail(content, target_size, image=None):
+    """Decode image content at reduced resolution for a thumbnail of target_size
+
+    JPEG data is decoded with Image.draft so libjpeg scales it while decoding,
+    other formats are shrunk with Image.reduce by an integer factor. The result
+    is at least target_size on its longest side (unless the image is smaller)
+    and is left for the caller to resize exactly. Results are cached per
+    (content hash, target size) and shared, so callers must not modify them.
+    If content is None, image is reduced without caching.
+    """
+    global _thumbnail_cache_bytes
+    if content is None:
+        return _reduce_for_thumbnail(image, target_size, False)
+
+    key = (hashlib.blake2b(content, digest_size=16).digest(), target_size)
+    with _thumbnail_cache_lock:
+        cached = _thumbnail_cache.get(key)
+        if cached is not None:
+            _thumbnail_cache.move_to_end(key)
+            return cached[0]
+
+    # Open a fresh image so that draft() does not affect images shared elsewhere
+    thumbnail = _reduce_for_thumbnail(Image.open(BytesIO(content)), target_size, True)
+    thumbnail.load()
+
+    size = thumbnail.width * thumbnail.height * len(thumbnail.getbands())
+    if size > THUMBNAIL_CACHE_BYTES:
+        return thumbnail
+
+    with _thumbnail_cache_lock:
+        previous = _thumbnail_cache.pop(key, None)
+        if previous is not None:
+            _thumbnail_cache_bytes -= previous[1]
+        _thumbnail_cache[key] = (thumbnail, size)
+        _thumbnail_cache_bytes += size
+        while _thumbnail_cache_bytes > THUMBNAIL_CACHE_BYTES:
+            _, (_, evicted) = _thumbnail_cache.popitem(last=False)
+            _thumbnail_cache_bytes -= evicted
+
+    return thumbnail
+
+def _reduce_for_thumbnail(image, target_size, can_draft):
+    """Apply JPEG draft mode and integer reduction towards target_size"""
+    if max(image.size) <= target_size:
+        return image
+
+    if can_draft and image.format == 'JPEG':
+        image.draft(image.mode, (target_size, target_size))
+
+    if image.mode in ('P', '1'):
+        image = image.convert('RGBA')
+
+    factor = max(image.size) // target_size
+    if factor >= 2:
+        image = image.reduce(factor)
+
+    return image
+
+def clear_thumbnail_cache():
+    """Drop all cached thumbnails"""
+    global _thumbnail_cache_bytes
+    with _thumbnail_cache_lock:
+        _thumbnail_cache.clear()
+        _thumbnail_cache_bytes = 0
+
 def create_checkerboard_background(size, square_size=16):
     """Create a checkerboard pattern background"""
     width, height = size
@@ -0,0 +1,146 @@
+"""
+Persistent manifest and in-memory decode cache for directory loading
+
+A DirectoryManifest records, for every file loaded from a directory, its size,
+mtime_ns, content hash and the key of its decoded image in the decode cache.
+It is stored as JSON in the cache directory, one file per loaded directory, so
+it survives restarts. While a file's size and mtime are unchanged, its content
+hash is taken from the manifest and the file content and decoded image array
+are served from the decode cache without reading the file.
+
+The decode cache is a least recently used map from decode keys to (content,
+image array) bounded by DECODE_CACHE_BYTES. Keys are derived from the content
+hash, so identical files share one entry.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from .fingerprint import hash_file
+except ImportError:
+    from utils.fingerprint import hash_file
+
+DECODE_CACHE_BYTES = 256 * 1024 * 1024
+# Bump when decode_image_array changes its output
+DECODE_FORMAT = "rgb8"
+
+_decode_cache = OrderedDict()
+_decode_cache_bytes = 0
+_decode_cache_lock = threading.Lock()
+
+
+def decode_cache_key(sha256):
+    """Decode cache key of a file content hash"""
+    return f"{sha256}:{DECODE_FORMAT}"
+
+
+def get_cached_decode(key):
+    """Return cached (content, image array or None) for key, or None"""
+    with _decode_cache_lock:
+        cached = _decode_cache.get(key)
+        if cached is not None:
+            _decode_cache.move_to_end(key)
+        return cached
+
+
+def cache_decode(key, content, image_array):
+    """Store a file's content and decoded image, evicting the least recently used entries"""
+    global _decode_cache_bytes
+    size = len(content) + (image_array.nbytes if image_array is not None else 0)
+    if size > DECODE_CACHE_BYTES:
+        return
+
+    with _decode_cache_lock:
+        previous = _decode_cache.pop(key, None)
+        if previous is not None:
+            _decode_cache_bytes -= previous[2]
+        _decode_cache[key] = (content, image_array, size)
+        _decode_cache_bytes += size
+        while _decode_cache_bytes > DECODE_CACHE_BYTES:
+            _, (_, _, evicted) = _decode_cache.popitem(last=False)
+            _decode_cache_bytes -= evicted
+
+
+def clear_decode_cache():
+    """Drop all cached file contents and decoded images"""
+    global _decode_cache_bytes
+    with _decode_cache_lock:
+        _decode_cache.clear()
+        _decode_cache_bytes = 0
+
+
+class DirectoryManifest:
+    """Stat and hash manifest of the files loaded from one directory
+
+    Entries are keyed by path relative to the directory and hold size,
+    mtime_ns, sha256 and decode_key.
+    """
+
+    MANIFEST_VERSION = 1
+
+    def __init__(self, cache_dir, directory):
+        self.directory = os.path.abspath(directory)
+        key = hashlib.sha256(self.directory.encode('utf-8')).hexdigest()
+        self.manifest_path = os.path.join(cache_dir, key[:2], key + ".json")
+
+        self.files = {}
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get("version") == self.MANIFEST_VERSION and manifest.get("directory") == self.directory:
+                self.files = manifest.get("files", {})
+        except (OSError, ValueError):
+            pass
+
+        self._used_files = {}
+
+    def lookup(self, relative_path, stat):
+        """Return the manifest entry of a file if its size and mtime are unchanged, else None"""
+        entry = self.files.get(relative_path)
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return entry
+        return None
+
+    def record(self, relative_path, entry):
+        """Keep an entry for the next save"""
+        self.files[relative_path] = entry
+        self._used_files[relative_path] = entry
+
+    @staticmethod
+    def make_entry(stat, sha256):
+        """Manifest entry of a file from its stat result and content hash"""
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256,
+                "decode_key": decode_cache_key(sha256)}
+
+    def fingerprint(self, file_paths):
+        """Content digest of file_paths, hashing only files that changed since their entry
+
+        Entries of hashed files are recorded, so once saved an untouched tree
+        is fingerprinted from stat calls alone, and touching a file without
+        changing its content keeps the fingerprint.
+        """
+        digest = hashlib.sha256()
+        for file_path in file_paths:
+            relative_path = os.path.relpath(file_path, self.directory)
+            try:
+                stat = os.stat(file_path)
+                entry = self.lookup(relative_path, stat)
+                if entry is None:
+                    entry = self.make_entry(stat, hash_file(file_path))
+            except OSError:
+                digest.update(f"{relative_path}\0missing\n".encode('utf-8'))
+                continue
+            self.record(relative_path, entry)
+            digest.update(f"{relative_path}\0{entry['sha256']}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def save(self):
+        """Write the entries recorded by this load"""
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        with open(self.manifest_path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump({"version": self.MANIFEST_VERSION, "directory": self.directory, "files": self._used_files}, f)
+        os.replace(self.manifest_path + ".tmp", self.manifest_path)
@@ -0,0 +1,316 @@
+"""
+Block-parallel gzip and xz compression
+
+The input stream is split into fixed-size blocks which are compressed on a
+thread pool (zlib and lzma release the GIL while compressing).
+
+For gzip each block is primed with the last 32 KiB of the preceding input as a
+preset dictionary and ended with a sync flush, so the concatenated blocks form
+one ordinary deflate stream inside a single gzip member. Per-block CRCs are
+merged with crc32_combine.
+
+For xz each block is an independent xz block; the writer adds the stream
+header, index and footer so the result is one multi-block xz stream.
+"""
+
+import lzma
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_BLOCK_SIZE = 128 * 1024
+DICTIONARY_SIZE = 32 * 1024
+
+_GF2_DIM = 32
+_CRC32_POLY = 0xEDB88320
+_combine_operators = {}
+
+
+def _gf2_matrix_times(matrix, vector):
+    """Multiply a GF(2) 32x32 matrix by a vector"""
+    result = 0
+    i = 0
+    while vector:
+        if vector & 1:
+            result ^= matrix[i]
+        vector >>= 1
+        i += 1
+    return result
+
+
+def _gf2_matrix_square(matrix):
+    """Square a GF(2) 32x32 matrix"""
+    return [_gf2_matrix_times(matrix, matrix[n]) for n in range(_GF2_DIM)]
+
+
+def _crc32_shift_operator(length):
+    """Return the matrix that advances a CRC-32 over length zero bytes"""
+    operator = _combine_operators.get(length)
+    if operator is not None:
+        return operator
+
+    # Operator for one zero bit, then square up to one zero byte
+    odd = [_CRC32_POLY] + [1 << n for n in range(_GF2_DIM - 1)]
+    even = _gf2_matrix_square(odd)   # two zero bits
+    odd = _gf2_matrix_square(even)   # four zero bits
+
+    operator = [1 << n for n in range(_GF2_DIM)]  # identity
+    remaining = length
+    while remaining:
+        # Apply zeros operator for the next power of two bytes
+        even = _gf2_matrix_square(odd)
+        if remaining & 1:
+            operator = [_gf2_matrix_times(even, column) for column in operator]
+        remaining >>= 1
+        if not remaining:
+            break
+        odd = _gf2_matrix_square(even)
+        if remaining & 1:
+            operator = [_gf2_matrix_times(odd, column) for column in operator]
+        remaining >>= 1
+
+    _combine_operators[length] = operator
+    return operator
+
+
+def crc32_combine(crc1, crc2, length2):
+    """Combine CRC-32 values of two sequences, where length2 is the length of the second one
+
+    The shift operator only depends on length2, so it is computed once per length
+    and combining equally sized blocks costs a single matrix-vector product.
+    """
+    if length2 <= 0:
+        return crc1
+    return _gf2_matrix_times(_crc32_shift_operator(length2), crc1) ^ crc2
+
+
+def _compress_block(block, dictionary, level, last):
+    """Deflate one block, returning (compressed data, crc32)"""
+    if dictionary:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS, 9)
+
+    data = compressor.compress(block)
+    data += compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+    return data, zlib.crc32(block)
+
+
+class _ParallelBlockWriter:
+    """Write-only file object that compresses fixed-size blocks on a thread pool
+
+    Subclasses provide _submit_args, _write_block, _write_header and _write_trailer.
+    Compressed blocks are written in input order, with at most two blocks per
+    worker in flight to bound memory use.
+    """
+
+    def __init__(self, fileobj, workers, block_size):
+        self.fileobj = fileobj
+        self.block_size = block_size
+        self.workers = workers if workers and workers > 0 else (os.cpu_count() or 1)
+
+        self._buffer = bytearray()
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers) if self.workers > 1 else None
+        self._size = 0
+        self._closed = False
+
+    def write(self, data):
+        """Buffer data and submit every full block for compression"""
+        if self._closed:
+            raise ValueError(f"write to closed {type(self).__name__}")
+
+        self._buffer += data
+        self._size += len(data)
+
+        while len(self._buffer) >= self.block_size:
+            block = bytes(self._buffer[:self.block_size])
+            del self._buffer[:self.block_size]
+            self._submit(block, False)
+
+        return len(data)
+
+    def tell(self):
+        """Return the number of uncompressed bytes written"""
+        return self._size
+
+    def _submit(self, block, last):
+        """Compress a block inline or on the pool"""
+        func, args = self._submit_args(block, last)
+
+        if self._executor is None:
+            self._write_block(func(*args), len(block))
+            return
+
+        self._pending.append((self._executor.submit(func, *args), len(block)))
+        while len(self._pending) > self.workers * 2:
+            self._drain_one()
+
+    def _drain_one(self):
+        """Write the oldest pending block once it is compressed"""
+        future, length = self._pending.popleft()
+        self._write_block(future.result(), length)
+
+    def flush(self):
+        """Pending blocks are written in order on close, there is nothing to flush early"""
+
+    def close(self):
+        """Compress the final block and write the trailer"""
+        if self._closed:
+            return
+        self._closed = True
+
+        try:
+            block = bytes(self._buffer)
+            self._buffer = bytearray()
+            if block or self._has_empty_final_block():
+                self._submit(block, True)
+            while self._pending:
+                self._drain_one()
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+
+        self._write_trailer()
+
+    def _has_empty_final_block(self):
+        """Whether an empty final block must still be written"""
+        return True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class ParallelGzipWriter(_ParallelBlockWriter):
+    """Write-only file object producing a single gzip member with parallel compression"""
+
+    def __init__(self, fileobj, level=6, workers=0, block_size=DEFAULT_BLOCK_SIZE, mtime=None):
+        super().__init__(fileobj, workers, max(block_size, DICTIONARY_SIZE))
+        self.level = level
+        self._dictionary = b""
+        self._crc = 0
+        self._write_header(int(time.time()) if mtime is None else int(mtime))
+
+    def _write_header(self, mtime):
+        """Write the gzip member header"""
+        extra_flags = 2 if self.level == 9 else (4 if self.level == 1 else 0)
+        self.fileobj.write(b"\x1f\x8b\x08\x00" + struct.pack("<I", mtime & 0xFFFFFFFF) + bytes((extra_flags, 3)))
+
+    def _submit_args(self, block, last):
+        """Prime each block with the last 32 KiB of the input before it"""
+        dictionary = self._dictionary
+        self._dictionary = (dictionary + block)[-DICTIONARY_SIZE:]
+        return _compress_block, (block, dictionary, self.level, last)
+
+    def _write_block(self, result, length):
+        """Write compressed block data and merge its CRC"""
+        data, crc = result
+        self.fileobj.write(data)
+        self._crc = crc32_combine(self._crc, crc, length)
+
+    def _write_trailer(self):
+        """Write CRC32 and ISIZE"""
+        self.fileobj.write(struct.pack("<II", self._crc & 0xFFFFFFFF, self._size & 0xFFFFFFFF))
+
+
+XZ_HEADER_MAGIC = b"\xfd7zXZ\x00"
+XZ_FOOTER_MAGIC = b"YZ"
+_XZ_STREAM_FLAGS = b"\x00" + bytes((lzma.CHECK_CRC64,))
+
+
+def _encode_varint(value):
+    """Encode an xz multibyte integer"""
+    data = bytearray()
+    while value >= 0x80:
+        data.append((value & 0x7F) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
+
+def _decode_varint(data, offset):
+    """Decode an xz multibyte integer, returning (value, next offset)"""
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def _compress_xz_block(block, preset):
+    """Compress one block as an xz block, returning (block bytes, unpadded size)
+
+    liblzma writes a complete single-block stream; the block is cut out of it
+    and its unpadded size is read from the stream index.
+    """
+    stream = lzma.compress(block, format=lzma.FORMAT_XZ, check=lzma.CHECK_CRC64, preset=preset)
+
+    backward_size = (struct.unpack("<I", stream[-8:-4])[0] + 1) * 4
+    index_start = len(stream) - 12 - backward_size
+
+    # Index: indicator, record count, then (unpadded size, uncompressed size)
+    _, offset = _decode_varint(stream, index_start + 1)
+    unpadded_size, _ = _decode_varint(stream, offset)
+
+    return stream[12:index_start], unpadded_size
+
+
+def xz_block_size(preset):
+    """Default block size for a preset, three times its dictionary like xz --threads"""
+    dictionary_sizes = [256 * 1024, 1 << 20, 2 << 20, 4 << 20, 4 << 20, 8 << 20, 8 << 20, 16 << 20, 32 << 20, 64 << 20]
+    return 3 * dictionary_sizes[max(0, min(9, preset & 0x1F))]
+
+
+class ParallelXzWriter(_ParallelBlockWriter):
+    """Write-only file object producing a multi-block xz stream with parallel compression
+
+    Blocks are independent, so they compress in parallel and can later be
+    decompressed individually using the index at the end of the stream.
+    """
+
+    def __init__(self, fileobj, preset=6, workers=0, block_size=None):
+        super().__init__(fileobj, workers, block_size or xz_block_size(preset))
+        self.preset = preset
+        self._records = []
+        self._write_header()
+
+    def _write_header(self):
+        """Write the stream header"""
+        self.fileobj.write(XZ_HEADER_MAGIC + _XZ_STREAM_FLAGS + struct.pack("<I", zlib.crc32(_XZ_STREAM_FLAGS)))
+
+    def _submit_args(self, block, last):
+        return _compress_xz_block, (block, self.preset)
+
+    def _has_empty_final_block(self):
+        """An xz stream may have no blocks at all"""
+        return False
+
+    def _write_block(self, result, length):
+        """Write a compressed block and remember its index record"""
+        block_data, unpadded_size = result
+        self.fileobj.write(block_data)
+        self._records.append((unpadded_size, length))
+
+    def _write_trailer(self):
+        """Write the index and the stream footer"""
+        index = bytearray(b"\x00")
+        index += _encode_varint(len(self._records))
+        for unpadded_size, uncompressed_size in self._records:
+            index += _encode_varint(unpadded_size)
+            index += _encode_varint(uncompressed_size)
+        index += b"\x00" * (-len(index) % 4)
+        index += struct.pack("<I", zlib.crc32(index))
+        self.fileobj.write(index)
+
+        footer = struct.pack("<I", len(index) // 4 - 1) + _XZ_STREAM_FLAGS
+        self.fileobj.write(struct.pack("<I", zlib.crc32(footer)) + footer + XZ_FOOTER_MAGIC)
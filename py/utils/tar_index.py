@@ -0,0 +1,338 @@
+"""
+Seekable member index for compressed tarballs
+
+The first pass over a tarball records every member and where its data starts
+in the uncompressed stream, together with checkpoints into the compressed
+stream. Later reads of single members start at the nearest checkpoint and only
+decompress a small window instead of the whole archive.
+
+gzip checkpoints are copies of the inflate state taken every CHECKPOINT_SPAN
+bytes of output (as in zlib's zran example); xz checkpoints are the block
+boundaries listed in the stream index. Uncompressed tarballs are read directly.
+"""
+
+import bisect
+import lzma
+import struct
+import tarfile
+import threading
+import zlib
+from collections import OrderedDict
+
+try:
+    from .parallel_compress import XZ_HEADER_MAGIC, XZ_FOOTER_MAGIC, _decode_varint
+    from .deb_reader import tar_member_path, resolve_hardlink, iter_tar_members
+except ImportError:
+    from utils.parallel_compress import XZ_HEADER_MAGIC, XZ_FOOTER_MAGIC, _decode_varint
+    from utils.deb_reader import tar_member_path, resolve_hardlink, iter_tar_members
+
+CHECKPOINT_SPAN = 1 << 20
+READ_SIZE = 64 * 1024
+INDEX_CACHE_SIZE = 8
+
+# Tar indexes keyed by (package path, size, mtime, member name), least recently used first
+_index_cache = OrderedDict()
+_index_cache_lock = threading.Lock()
+
+
+def tar_compression(member_name):
+    """Return 'gzip', 'xz' or 'none' for an indexable tarball name, otherwise None"""
+    if member_name.endswith(".tar.gz"):
+        return "gzip"
+    if member_name.endswith(".tar.xz"):
+        return "xz"
+    if member_name.endswith(".tar"):
+        return "none"
+    return None
+
+
+def _inflate(fileobj, position, decompressor, new_decompressor, uncompressed=0,
+             checkpoints=None, span=CHECKPOINT_SPAN, end=None):
+    """Yield decompressed data read from position, following concatenated streams
+
+    If checkpoints is a list, (uncompressed offset, compressed offset,
+    decompressor copy) is appended at least every span bytes of output.
+    """
+    next_checkpoint = uncompressed + span
+    fileobj.seek(position)
+
+    while end is None or position < end:
+        chunk = fileobj.read(READ_SIZE if end is None else min(READ_SIZE, end - position))
+        if not chunk:
+            return
+        position += len(chunk)
+
+        while chunk:
+            data = decompressor.decompress(chunk)
+            chunk = b""
+            if decompressor.eof:
+                # Another stream may follow, possibly after zero padding
+                chunk = decompressor.unused_data.lstrip(b"\x00")
+                decompressor = new_decompressor()
+            if data:
+                uncompressed += len(data)
+                yield data
+
+        # All input up to position is consumed, so the state can be resumed here
+        if checkpoints is not None and uncompressed >= next_checkpoint:
+            checkpoints.append((uncompressed, position, decompressor.copy()))
+            next_checkpoint = uncompressed + span
+
+
+class _StreamCursor:
+    """Forward-only random reads over an iterator of decompressed chunks"""
+
+    def __init__(self, pieces, position):
+        self._pieces = iter(pieces)
+        self._buffer = memoryview(b"")
+        self.position = position
+
+    def read_at(self, offset, size):
+        """Return size bytes at an offset at or after the current position"""
+        parts = []
+        while size > 0:
+            if not self._buffer:
+                data = next(self._pieces, None)
+                if data is None:
+                    raise ValueError("compressed stream ended before the member data")
+                self._buffer = memoryview(data)
+
+            skip = offset - self.position
+            if skip >= len(self._buffer):
+                self.position += len(self._buffer)
+                self._buffer = memoryview(b"")
+                continue
+
+            part = self._buffer[skip:skip + size]
+            parts.append(bytes(part))
+            size -= len(part)
+            offset += len(part)
+            self.position += skip + len(part)
+            self._buffer = self._buffer[skip + len(part):]
+
+        return b"".join(parts)
+
+
+class _IterReader:
+    """Read-only file object over an iterator of byte chunks"""
+
+    def __init__(self, pieces):
+        self._pieces = iter(pieces)
+        self._buffer = bytearray()
+
+    def read(self, size=-1):
+        while size is None or size < 0 or len(self._buffer) < size:
+            data = next(self._pieces, None)
+            if data is None:
+                break
+            self._buffer += data
+
+        if size is None or size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+
+def _new_gzip_decompressor():
+    return zlib.decompressobj(zlib.MAX_WBITS | 16)
+
+
+def _parse_xz_blocks(fileobj, size):
+    """Return [(uncompressed offset, compressed offset, compressed end, stream flags)] for every xz block
+
+    The stream indexes are read backwards from the end of the data, so
+    concatenated streams and stream padding are supported. Returns None if the
+    data is not a well-formed xz file.
+    """
+    streams = []
+    end = size
+    while end > 0:
+        # Skip stream padding
+        while end >= 4:
+            fileobj.seek(end - 4)
+            if fileobj.read(4) != b"\x00\x00\x00\x00":
+                break
+            end -= 4
+        if end < 24:
+            return None
+
+        fileobj.seek(end - 12)
+        footer = fileobj.read(12)
+        if footer[10:12] != XZ_FOOTER_MAGIC:
+            return None
+        backward_size = (struct.unpack("<I", footer[4:8])[0] + 1) * 4
+        flags = footer[8:10]
+
+        index_start = end - 12 - backward_size
+        if index_start < 12:
+            return None
+        fileobj.seek(index_start)
+        index = fileobj.read(backward_size)
+        if index[0] != 0:
+            return None
+
+        count, offset = _decode_varint(index, 1)
+        records = []
+        for _ in range(count):
+            unpadded_size, offset = _decode_varint(index, offset)
+            uncompressed_size, offset = _decode_varint(index, offset)
+            records.append((unpadded_size, uncompressed_size))
+
+        stream_start = index_start - sum((unpadded + 3) & ~3 for unpadded, _ in records) - 12
+        if stream_start < 0:
+            return None
+        fileobj.seek(stream_start)
+        if fileobj.read(8) != XZ_HEADER_MAGIC + flags:
+            return None
+
+        position = stream_start + 12
+        stream_blocks = []
+        for unpadded_size, uncompressed_size in records:
+            stream_blocks.append((position, position + unpadded_size, uncompressed_size, flags))
+            position += (unpadded_size + 3) & ~3
+        streams.append(stream_blocks)
+        end = stream_start
+
+    blocks = []
+    uncompressed = 0
+    for stream_blocks in reversed(streams):
+        for start, block_end, uncompressed_size, flags in stream_blocks:
+            blocks.append((uncompressed, start, block_end, flags))
+            uncompressed += uncompressed_size
+    return blocks
+
+
+class TarIndex:
+    """Members of a tarball and checkpoints for reading their data directly"""
+
+    def __init__(self, compression, members, checkpoints):
+        self.compression = compression
+        self.members = members
+        self.checkpoints = checkpoints
+        self._offsets = [checkpoint[0] for checkpoint in checkpoints]
+
+    def read_member(self, fileobj, member):
+        """Read the data of a regular file member, decompressing from the nearest checkpoint"""
+        return next(self.read_members(fileobj, [member]))[1]
+
+    def read_members(self, fileobj, members):
+        """Yield (member, content) for regular file members in archive order
+
+        One decompression run is continued from member to member, and only
+        restarted when a checkpoint lies between the run and the next member.
+        """
+        cursor = None
+        for member in sorted(members, key=lambda member: member.offset_data):
+            if self.compression == "none":
+                fileobj.seek(member.offset_data)
+                data = fileobj.read(member.size)
+                if len(data) != member.size:
+                    raise ValueError("tarball ended before the member data")
+                yield member, data
+                continue
+
+            first = bisect.bisect_right(self._offsets, member.offset_data) - 1
+            if cursor is None or self._offsets[first] > cursor.position:
+                cursor = _StreamCursor(self._stream_from(fileobj, first), self._offsets[first])
+            yield member, cursor.read_at(member.offset_data, member.size)
+
+    def read_entries(self, fileobj, select=None):
+        """Return (member, content) for every member, like deb_reader.iter_tar_members
+
+        Selected hardlinks get the data of their target, which is read even
+        when the target itself is not selected.
+        """
+        targets = {}
+        entries = []
+        wanted = {}
+        for member in self.members:
+            source = None
+            if member.isfile():
+                targets[tar_member_path(member.name)] = member
+                if select is None or select(member):
+                    source = member
+            elif member.islnk():
+                resolved = resolve_hardlink(member, targets)
+                if resolved is not None and (select is None or select(resolved[0])):
+                    member, source = resolved
+            if source is not None:
+                wanted[source.name] = source
+            entries.append((member, source))
+
+        # Every target is decompressed once, however many links name it
+        contents = {member.name: content for member, content in self.read_members(fileobj, wanted.values())}
+        return [(member, contents[source.name] if source is not None else None) for member, source in entries]
+
+    def _stream_from(self, fileobj, checkpoint):
+        """Yield the decompressed data from a checkpoint to the end of the tarball"""
+        if self.compression == "gzip":
+            uncompressed, position, state = self.checkpoints[checkpoint]
+            return _inflate(fileobj, position, state.copy(), _new_gzip_decompressor, uncompressed)
+        return (data for block in self.checkpoints[checkpoint:] for data in self._inflate_xz_block(fileobj, block))
+
+    def _inflate_xz_block(self, fileobj, block):
+        """Yield the decompressed data of a single xz block"""
+        _, start, end, flags = block
+        decompressor = lzma.LZMADecompressor(lzma.FORMAT_XZ)
+        decompressor.decompress(XZ_HEADER_MAGIC + flags + struct.pack("<I", zlib.crc32(flags)))
+        return _inflate(fileobj, start, decompressor, lzma.LZMADecompressor, end=end)
+
+
+def index_tar_stream(fileobj, member_name, select=None, span=CHECKPOINT_SPAN):
+    """Read a tarball in one pass, building its TarIndex
+
+    Returns (index, entries), where entries is a list of (member, content) as
+    produced by deb_reader.iter_tar_stream. member_name must be indexable
+    according to tar_compression.
+    """
+    compression = tar_compression(member_name)
+    checkpoints = []
+
+    if compression == "gzip":
+        checkpoints.append((0, 0, _new_gzip_decompressor()))
+        stream = _IterReader(_inflate(fileobj, 0, _new_gzip_decompressor(), _new_gzip_decompressor,
+                                      checkpoints=checkpoints, span=span))
+    elif compression == "xz":
+        fileobj.seek(0, 2)
+        blocks = _parse_xz_blocks(fileobj, fileobj.tell())
+        if blocks is None:
+            raise ValueError(f"cannot read the xz index of {member_name}")
+        checkpoints = blocks
+        stream = _IterReader(_inflate(fileobj, 0, lzma.LZMADecompressor(), lzma.LZMADecompressor))
+    elif compression == "none":
+        fileobj.seek(0)
+        stream = fileobj
+    else:
+        raise ValueError(f"unsupported tarball: {member_name}")
+
+    with tarfile.open(fileobj=stream, mode="r|") as tar_file:
+        entries = list(iter_tar_members(tar_file, select))
+        # The index keeps the members as archived, hardlinks are resolved again when read
+        members = tar_file.getmembers()
+
+    return TarIndex(compression, members, checkpoints), entries
+
+
+def get_cached_tar_index(key):
+    """Return the cached TarIndex for key, or None"""
+    with _index_cache_lock:
+        index = _index_cache.get(key)
+        if index is not None:
+            _index_cache.move_to_end(key)
+        return index
+
+
+def cache_tar_index(key, index):
+    """Store a TarIndex, evicting the least recently used ones"""
+    with _index_cache_lock:
+        _index_cache[key] = index
+        _index_cache.move_to_end(key)
+        while len(_index_cache) > INDEX_CACHE_SIZE:
+            _index_cache.popitem(last=False)
+
+
+def clear_tar_index_cache():
+    """Drop all cached tar indexes"""
+    with _index_cache_lock:
+        _index_cache.clear()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the shared ar archive reader and writer
+"""
+
+import unittest
+import os
+import sys
+import io
+import tempfile
+import shutil
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.ar_archive import ArArchive, ArWriter, iter_ar_members
+
+
+class TestArArchive(unittest.TestCase):
+    """Test ArArchive and ArWriter"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+
+    def write_archive(self, members, long_names=()):
+        path = os.path.join(self.test_dir, "test.a")
+        with open(path, 'wb') as f:
+            writer = ArWriter(f, long_names=long_names)
+            for name, content in members:
+                writer.add(name, len(content), io.BytesIO(content), mtime=0)
+        return path
+
+    def test_round_trip(self):
+        members = [("debian-binary", b"2.0\n"), ("odd", b"abc"),
+                   ("a-very-long-member-name.tar.gz", os.urandom(5001))]
+        path = self.write_archive(members, long_names=[name for name, _ in members])
+
+        with ArArchive(path) as archive:
+            self.assertEqual(list(archive.members), [name for name, _ in members])
+            self.assertEqual(archive.find("a-very"), "a-very-long-member-name.tar.gz")
+            self.assertIsNone(archive.find("data.tar"))
+            for name, content in members:
+                self.assertEqual(archive.read(name), content)
+                reader = archive.open(name)
+                self.assertEqual(reader.read(2) + reader.read(), content)
+
+    def test_gnu_tables(self):
+        """Symbol tables are skipped and long names resolved from the name table"""
+        names = b"first-long-name.dci/\nsecond-long-name.dci/\n"
+        data = bytearray(b"!<arch>\n")
+        for name, content in (("/", b"\x00" * 4), ("//", names), ("/0", b"one"), ("/21", b"two!")):
+            data += f"{name:<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(content):<10}`\n".encode('ascii') + content
+            if len(content) % 2:
+                data += b"\n"
+
+        members = [(name, bytes(data[offset:offset + size])) for name, offset, size in iter_ar_members(io.BytesIO(data))]
+        self.assertEqual(members, [("first-long-name.dci", b"one"), ("second-long-name.dci", b"two!")])
+
+    def test_undeclared_long_name(self):
+        with self.assertRaises(ValueError):
+            self.write_archive([("a-very-long-member-name", b"x")])
+
+    def test_invalid_archive(self):
+        for content in (b"", b"not an archive"):
+            path = os.path.join(self.test_dir, "invalid.a")
+            with open(path, 'wb') as f:
+                f.write(content)
+            with self.assertRaises(ValueError):
+                ArArchive(path)
+
+
+if __name__ == '__main__':
+    unittest.main()
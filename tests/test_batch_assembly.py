@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Unit tests for padded preview batch assembly
+"""
+
+import unittest
+import os
+import sys
+import numpy as np
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.image_utils import pil_list_to_batch, pil_to_tensor
+
+
+def to_numpy(value):
+    """Return a numpy view of a torch tensor or numpy array"""
+    return value.numpy() if hasattr(value, 'numpy') else value
+
+
+class TestBatchAssembly(unittest.TestCase):
+    """Test pil_list_to_batch"""
+
+    def test_heterogeneous_sizes(self):
+        """Images of different sizes are padded to the largest size"""
+        images = [
+            Image.new('RGB', (40, 20), (255, 0, 0)),
+            Image.new('RGBA', (10, 30), (0, 255, 0, 255)),
+            Image.new('L', (5, 5), 128),
+        ]
+        batch, mask = pil_list_to_batch(images, fill_value=0.5, with_mask=True)
+        batch, mask = to_numpy(batch), to_numpy(mask)
+
+        self.assertEqual(batch.shape, (3, 30, 40, 3))
+        self.assertEqual(mask.shape, (3, 30, 40))
+        self.assertEqual(batch.dtype, np.float32)
+
+        # Image content
+        np.testing.assert_allclose(batch[0, 0, 0], [1.0, 0.0, 0.0])
+        np.testing.assert_allclose(batch[1, 29, 9], [0.0, 1.0, 0.0])
+        np.testing.assert_allclose(batch[2, 4, 4], [128 / 255.0] * 3, rtol=1e-6)
+
+        # Padding
+        np.testing.assert_allclose(batch[0, 25, 0], [0.5, 0.5, 0.5])
+        np.testing.assert_allclose(batch[1, 0, 10], [0.5, 0.5, 0.5])
+
+        # Mask marks the valid region of each slot
+        self.assertEqual(mask[0].sum(), 40 * 20)
+        self.assertEqual(mask[1].sum(), 10 * 30)
+        self.assertEqual(mask[2].sum(), 5 * 5)
+        self.assertEqual(mask[1, 29, 9], 1.0)
+        self.assertEqual(mask[1, 29, 10], 0.0)
+
+    def test_matches_pil_to_tensor(self):
+        """Same-size images give the same values as pil_to_tensor"""
+        image = Image.new('RGBA', (16, 8), (10, 20, 30, 128))
+        batch, mask = pil_list_to_batch([image, image])
+        expected = to_numpy(pil_to_tensor(image))[0]
+
+        self.assertIsNone(mask)
+        np.testing.assert_allclose(to_numpy(batch)[1], expected, rtol=1e-6)
+
+    def test_empty_list(self):
+        """An empty list gives no batch"""
+        self.assertEqual(pil_list_to_batch([]), (None, None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the DCI command line tools
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+import cli
+from dci_reader import DCIReader
+
+
+def layer_paths(dci_path):
+    reader = DCIReader(dci_path)
+    assert reader.read()
+    return {entry['path']: entry['is_symlink'] for entry in reader.get_layer_entries()}
+
+
+class TestBuildCommand(unittest.TestCase):
+    """Test the build subcommand"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.source_dir = os.path.join(self.test_dir, "src")
+        self.output_dir = os.path.join(self.test_dir, "out")
+
+        self.write_png("edit_16.png")
+        self.write_png("edit_16.hover.dark@2x.png")
+        self.write_png("apps/app.png", size=48)
+        self.messages = []
+
+    def write_png(self, name, size=32, color=(255, 0, 0, 255)):
+        path = os.path.join(self.source_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        Image.new('RGBA', (size, size), color).save(path)
+        return path
+
+    def build(self, args=(), workers=1):
+        return cli.main(["build", self.source_dir, self.output_dir, "--workers", str(workers), *args])
+
+    def options(self, **overrides):
+        options = {"format": "png", "quality": 90, "webp_lossless": False, "webp_alpha_quality": 100,
+                   "png_compress_level": 6, "scales": [1.0], "size": 0, "state": "normal", "tone": "universal"}
+        options.update(overrides)
+        return options
+
+    def test_name_mapping(self):
+        icons, unmatched = cli.map_sources(self.source_dir, [
+            os.path.join(self.source_dir, name) for name in
+            ("edit_16.hover.dark@2x.png", "apps/my-icon.light.png", "apps/app-24@1.5x.png", "notes.txt")
+        ])
+        self.assertEqual(icons["edit.dci"], [(os.path.join(self.source_dir, "edit_16.hover.dark@2x.png"),
+                                              16, "hover", "dark", 2.0)])
+        self.assertEqual(icons[os.path.join("apps", "my-icon.dci")][0][1:], (None, "normal", "light", None))
+        self.assertEqual(icons[os.path.join("apps", "app.dci")][0][1:], (24, "normal", "universal", 1.5))
+        self.assertEqual(len(unmatched), 1)
+
+    def test_build(self):
+        self.assertEqual(self.build(["--scales", "1,2", "--format", "png"]), 0)
+
+        self.assertEqual(layer_paths(os.path.join(self.output_dir, "edit.dci")), {
+            "16/hover.dark/2": False,
+            "16/normal.light/1": False, "16/normal.dark/1": True,
+            "16/normal.light/2": False, "16/normal.dark/2": True,
+        })
+        # Without a size in the name the source width is used
+        self.assertIn("48/normal.light/2", layer_paths(os.path.join(self.output_dir, "apps", "app.dci")))
+
+    def test_unchanged_icons_are_skipped(self):
+        options = self.options()
+        stats = cli.build(self.source_dir, self.output_dir, options, workers=1)
+        self.assertEqual((stats["built"], stats["skipped"]), (2, 0))
+
+        edit_path = os.path.join(self.output_dir, "edit.dci")
+        edit_mtime = os.stat(edit_path).st_mtime_ns
+        stats = cli.build(self.source_dir, self.output_dir, options, workers=1)
+        self.assertEqual((stats["built"], stats["skipped"]), (0, 2))
+
+        # Touching a source keeps its content hash
+        source = os.path.join(self.source_dir, "edit_16.png")
+        stat = os.stat(source)
+        os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        stats = cli.build(self.source_dir, self.output_dir, options, workers=1)
+        self.assertEqual(stats["built"], 0)
+        self.assertEqual(os.stat(edit_path).st_mtime_ns, edit_mtime)
+
+        self.write_png("apps/app.png", size=48, color=(0, 0, 255, 255))
+        stats = cli.build(self.source_dir, self.output_dir, options, workers=1)
+        self.assertEqual((stats["built"], stats["skipped"]), (1, 1))
+
+        # Changed settings rebuild everything, and so does a deleted output
+        stats = cli.build(self.source_dir, self.output_dir, self.options(scales=[1.0, 2.0]), workers=1)
+        self.assertEqual(stats["built"], 2)
+        os.remove(edit_path)
+        stats = cli.build(self.source_dir, self.output_dir, self.options(scales=[1.0, 2.0]), workers=1)
+        self.assertEqual((stats["built"], stats["skipped"]), (1, 1))
+
+    def test_failures_are_reported(self):
+        with open(os.path.join(self.source_dir, "broken_16.png"), 'wb') as f:
+            f.write(b"not a png")
+        self.write_png("copy_16.light.png")
+        self.write_png("copy_16.normal.light.png")
+
+        stats = cli.build(self.source_dir, self.output_dir, self.options(), workers=1, log=self.messages.append)
+        self.assertEqual((stats["built"], stats["failed"]), (2, 2))
+        self.assertTrue(any("copy.dci" in message and "both map to" in message for message in self.messages))
+        self.assertFalse(os.path.exists(os.path.join(self.output_dir, "broken.dci")))
+
+        # Failed icons are retried on the next build
+        stats = cli.build(self.source_dir, self.output_dir, self.options(), workers=1, log=self.messages.append)
+        self.assertEqual((stats["skipped"], stats["failed"]), (2, 2))
+        self.assertEqual(self.build(["--format", "png"]), 1)
+
+    def test_explicit_tones_replace_universal_halves(self):
+        self.write_png("edit_16.dark.png", color=(0, 0, 255, 255))
+        self.write_png("copy_32.png")
+        self.write_png("copy_32.light.png", color=(0, 255, 0, 255))
+        self.write_png("copy_32.dark.png", size=64)
+        self.write_png("copy_32@2x.png", size=64)
+        self.write_png("copy_32.light@2x.png", size=64, color=(0, 255, 0, 255))
+
+        stats = cli.build(self.source_dir, self.output_dir, self.options(), workers=1, log=self.messages.append)
+        self.assertEqual((stats["built"], stats["failed"]), (3, 0), self.messages)
+
+        self.assertEqual(layer_paths(os.path.join(self.output_dir, "edit.dci")), {
+            "16/hover.dark/2": False, "16/normal.light/1": False, "16/normal.dark/1": False,
+        })
+        # The universal 1x source is covered by both tones, the 2x one only fills the dark tone
+        self.assertEqual(layer_paths(os.path.join(self.output_dir, "copy.dci")), {
+            "32/normal.light/1": False, "32/normal.dark/1": False,
+            "32/normal.light/2": False, "32/normal.dark/2": False,
+        })
+
+        reader = DCIReader(os.path.join(self.output_dir, "edit.dci"))
+        self.assertTrue(reader.read())
+        colors = {(image['tone'], image['scale']): image['image'].getpixel((0, 0)) for image in reader.get_icon_images()
+                  if image['state'] == 'normal'}
+        self.assertEqual(colors, {('light', 1.0): (255, 0, 0, 255), ('dark', 1.0): (0, 0, 255, 255)})
+
+    def test_process_pool_matches_sequential_build(self):
+        for i in range(6):
+            self.write_png(f"icon{i}_16.png", color=(i * 40, 0, 0, 255))
+        sequential_dir = os.path.join(self.test_dir, "sequential")
+        cli.build(self.source_dir, sequential_dir, self.options(), workers=1)
+        stats = cli.build(self.source_dir, self.output_dir, self.options(), workers=3)
+        self.assertEqual(stats["built"], 8)
+
+        for name in ["edit.dci", os.path.join("apps", "app.dci")] + [f"icon{i}.dci" for i in range(6)]:
+            with open(os.path.join(sequential_dir, name), 'rb') as a, open(os.path.join(self.output_dir, name), 'rb') as b:
+                self.assertEqual(a.read(), b.read(), name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the SQLite DCI catalogue
+"""
+
+import unittest
+import os
+import sys
+import io
+import tarfile
+import tempfile
+import shutil
+from unittest import mock
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from dci_format import DCIIconBuilder
+from dci_catalog import DCICatalog
+from utils.ar_archive import ArWriter
+from utils.enums import CatalogQuery, get_enum_default_ui_value
+from utils.i18n import t
+from nodes.catalog_node import DCICatalogQuery
+
+
+def dci_bytes(variants, color=(255, 0, 0, 255)):
+    """Build a DCI from (size, state, tone, scale) tuples"""
+    builder = DCIIconBuilder()
+    image = Image.new('RGBA', (8, 8), color)
+    for size, state, tone, scale in variants:
+        builder.add_icon_image(image, size, state, tone, scale, format='png')
+    return builder.to_binary()
+
+
+class TestDCICatalog(unittest.TestCase):
+    """Test DCICatalog updates and queries"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.theme = os.path.join(self.test_dir, "theme")
+
+        self.write("actions/edit.dci", dci_bytes([(16, 'normal', 'universal', 1), (16, 'hover', 'dark', 2)]))
+        self.write("actions/copy.dci", dci_bytes([(16, 'normal', 'universal', 1), (16, 'hover', 'light', 2)]))
+        self.write("apps/app.dci", dci_bytes([(32, 'normal', 'light', 1)], color=(0, 0, 255, 255)))
+        self.write("apps/readme.txt", b"not an icon")
+
+        self.catalog = DCICatalog(os.path.join(self.test_dir, "catalog.db"))
+        self.addCleanup(self.catalog.close)
+
+    def write(self, relative_path, content, mtime_offset=0):
+        path = os.path.join(self.theme, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if mtime_offset:
+            # Rewrites within the filesystem's timestamp granularity keep the old mtime
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+        return path
+
+    def test_layers_are_recorded(self):
+        stats = self.catalog.update(self.theme)
+        self.assertEqual((stats["scanned"], stats["parsed"], stats["invalid"]), (3, 3, 0))
+
+        rows = self.catalog.query("SELECT l.state, l.tone, l.scale, l.format, l.is_link, l.link_target, l.priority, "
+                                  "l.payload_size FROM layers l JOIN icons i ON i.id = l.icon_id "
+                                  "WHERE i.path = 'actions/edit.dci' ORDER BY l.state, l.tone")
+        self.assertEqual([row[:5] for row in rows], [('hover', 'dark', 2.0, 'png', 0), ('normal', 'dark', 1.0, 'png', 1),
+                                                     ('normal', 'light', 1.0, 'png', 0)])
+        # The universal dark link resolves to the light payload
+        self.assertEqual(rows[1][5], "../../normal.light/1/1.0p.-1.0_0_0_0_0_0_0.png")
+        self.assertEqual(rows[1][7], rows[2][7])
+        self.assertEqual(rows[0][6], 1)
+
+    def test_queries(self):
+        self.catalog.update(self.theme)
+
+        self.assertEqual(self.catalog.missing_variants(scale=2, state='hover', tone='dark'),
+                         [(self.theme, "actions/copy.dci"), (self.theme, "apps/app.dci")])
+        self.assertEqual(self.catalog.coverage(size=16, state='normal'), (2, 3))
+        self.assertEqual(self.catalog.coverage(), (3, 3))
+        self.assertIn((16, 'hover', 'dark', 2.0, 1, 1), self.catalog.variant_counts())
+
+        report = {row[0]: row[1:] for row in self.catalog.size_report("is_link")}
+        self.assertEqual(report[1][0], 2)
+        self.assertEqual(report[0][0], 5)
+        # Identical red payloads are counted once in the unique bytes
+        self.assertLess(report[0][2], report[0][1])
+
+        largest = self.catalog.largest_icons(limit=1)
+        self.assertEqual(len(largest), 1)
+        with self.assertRaises(ValueError):
+            self.catalog.size_report("path; DROP TABLE icons")
+
+    def test_incremental_update(self):
+        self.catalog.update(self.theme)
+
+        with mock.patch('dci_catalog.catalog_layers', side_effect=AssertionError("parsed")):
+            stats = self.catalog.update(self.theme)
+        self.assertEqual((stats["unchanged"], stats["parsed"]), (3, 0))
+
+        # Touched without changes: hashed again but not parsed
+        path = os.path.join(self.theme, "apps/app.dci")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        with mock.patch('dci_catalog.catalog_layers', side_effect=AssertionError("parsed")):
+            stats = self.catalog.update(self.theme)
+        self.assertEqual((stats["unchanged"], stats["rehashed"]), (2, 1))
+
+        self.write("actions/copy.dci", dci_bytes([(16, 'hover', 'dark', 2)]), mtime_offset=10 ** 9)
+        os.remove(os.path.join(self.theme, "actions/edit.dci"))
+        stats = self.catalog.update(self.theme)
+        self.assertEqual((stats["parsed"], stats["removed"]), (1, 1))
+        self.assertEqual(self.catalog.missing_variants(scale=2, state='hover', tone='dark'),
+                         [(self.theme, "apps/app.dci")])
+
+    def test_invalid_files_are_kept_out_of_queries(self):
+        self.write("broken.dci", b"DCI\x00\x02broken")
+        stats = self.catalog.update(self.theme)
+        self.assertEqual(stats["invalid"], 1)
+        self.assertNotIn((self.theme, "broken.dci"), self.catalog.missing_variants())
+        self.assertEqual(self.catalog.coverage()[1], 3)
+
+    def test_deb_source(self):
+        deb_path = os.path.join(self.test_dir, "theme.deb")
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode='w:gz') as tar_file:
+            for relative_path in ("actions/edit.dci", "apps/app.dci", "apps/readme.txt"):
+                tar_file.add(os.path.join(self.theme, relative_path), f"./usr/share/icons/{relative_path}")
+            # A hardlink, as written by DebPackager's deduplication, is catalogued with its target's data
+            link = tarfile.TarInfo("./usr/share/icons/actions/edit-copy.dci")
+            link.type = tarfile.LNKTYPE
+            link.linkname = "./usr/share/icons/actions/edit.dci"
+            tar_file.addfile(link)
+        with open(deb_path, 'wb') as f:
+            writer = ArWriter(f)
+            writer.add("debian-binary", 4, b"2.0\n")
+            writer.add("data.tar.gz", len(data.getvalue()), data.getvalue())
+
+        stats = self.catalog.update(deb_path)
+        self.assertEqual((stats["scanned"], stats["parsed"]), (3, 3))
+        self.assertEqual(self.catalog.missing_variants(state='hover', source=deb_path),
+                         [(os.path.abspath(deb_path), "usr/share/icons/apps/app.dci")])
+        self.assertEqual(self.catalog.missing_variants(state='hover', tone='light', source=deb_path),
+                         [(os.path.abspath(deb_path), path) for path in
+                          ("usr/share/icons/actions/edit-copy.dci", "usr/share/icons/actions/edit.dci",
+                           "usr/share/icons/apps/app.dci")])
+
+        # An unchanged package is not opened again
+        with mock.patch('dci_catalog.ArArchive', side_effect=AssertionError("opened")):
+            stats = self.catalog.update(deb_path)
+        self.assertEqual(stats["unchanged"], 3)
+
+    def test_deb_update_adds_link_to_unchanged_file(self):
+        deb_path = os.path.join(self.test_dir, "theme.deb")
+        edit_path = os.path.join(self.theme, "actions/edit.dci")
+
+        def write_deb(links, mtime_offset):
+            data = io.BytesIO()
+            with tarfile.open(fileobj=data, mode='w:gz') as tar_file:
+                tar_file.add(edit_path, "./usr/share/icons/a.dci")
+                for name, linkname in links:
+                    link = tarfile.TarInfo(f"./usr/share/icons/{name}")
+                    link.type = tarfile.LNKTYPE
+                    link.linkname = f"./usr/share/icons/{linkname}"
+                    tar_file.addfile(link)
+            with open(deb_path, 'wb') as f:
+                writer = ArWriter(f)
+                writer.add("debian-binary", 4, b"2.0\n")
+                writer.add("data.tar.gz", len(data.getvalue()), data.getvalue())
+            mtime = os.stat(deb_path).st_mtime + mtime_offset
+            os.utime(deb_path, (mtime, mtime))
+
+        write_deb([], 0)
+        self.assertEqual(self.catalog.update(deb_path)["parsed"], 1)
+
+        # v2 adds links to the unchanged a.dci, one of them through another link
+        write_deb([("b.dci", "a.dci"), ("c.dci", "b.dci")], 10)
+        stats = self.catalog.update(deb_path)
+        self.assertEqual((stats["scanned"], stats["unchanged"], stats["parsed"]), (3, 1, 2))
+        self.assertEqual(self.catalog.missing_variants(state='hover', tone='light', source=deb_path),
+                         [(os.path.abspath(deb_path), f"usr/share/icons/{name}") for name in
+                          ("a.dci", "b.dci", "c.dci")])
+
+    def test_query_node(self):
+        database_path = os.path.join(self.test_dir, "node.db")
+        node = DCICatalogQuery()
+        report, paths = node._execute_impl(self.theme, CatalogQuery.MISSING_VARIANTS, database_path,
+                                           state="hover", tone="dark", scale=2.0)
+        self.assertEqual(paths, ["actions/copy.dci", "apps/app.dci"])
+        self.assertIn("hover", report)
+
+        report, paths = node._execute_impl(self.theme, CatalogQuery.COVERAGE, database_path, update_catalog=False,
+                                           icon_size=16)
+        self.assertIn("2/3", report)
+        self.assertEqual(paths, [])
+
+        report, _ = node._execute_impl(self.theme, CatalogQuery.SIZE_REPORT, database_path, group_by="format")
+        self.assertIn("png: 7", report)
+
+        _, paths = node._execute_impl("", CatalogQuery.LARGEST_ICONS, database_path, limit=2)
+        self.assertEqual(len(paths), 2)
+        self.assertTrue(all(path.startswith(self.theme) for path in paths))
+
+        report, paths = node._execute_impl(os.path.join(self.test_dir, "missing"), CatalogQuery.COVERAGE, database_path)
+        self.assertIn("❌", report)
+
+    def test_query_node_is_changed(self):
+        database_path = os.path.join(self.test_dir, "node.db")
+
+        def fingerprint(source_path=self.theme, **kwargs):
+            query_type = get_enum_default_ui_value(CatalogQuery.COVERAGE, t)
+            return DCICatalogQuery.IS_CHANGED(source_path=source_path, query_type=query_type,
+                                              database_path=database_path, **kwargs)
+
+        first = fingerprint()
+        self.assertEqual(fingerprint(), first)
+        self.assertNotEqual(fingerprint(state="hover"), first)
+
+        # Only files matching the filter are covered
+        self.write("apps/readme.txt", b"still not an icon", mtime_offset=10 ** 9)
+        self.assertEqual(fingerprint(), first)
+        self.write("apps/app.dci", dci_bytes([(32, 'normal', 'dark', 1)]), mtime_offset=10 ** 9)
+        changed = fingerprint()
+        self.assertNotEqual(changed, first)
+        self.write("apps/new.dci", dci_bytes([(32, 'normal', 'dark', 1)]))
+        self.assertNotEqual(fingerprint(), changed)
+
+        # A deb source is covered by its own stat, a query of the whole database by the database file
+        deb_path = self.write("theme.deb", b"package")
+        deb_fingerprint = fingerprint(deb_path)
+        self.write("theme.deb", b"package 2")
+        self.assertNotEqual(fingerprint(deb_path), deb_fingerprint)
+
+        self.catalog.update(self.theme)
+        all_sources = fingerprint("")
+        DCICatalog(database_path).close()
+        self.assertNotEqual(fingerprint(""), all_sources)
+
+
+if __name__ == '__main__':
+    unittest.main()
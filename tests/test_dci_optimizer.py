@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the lossless DCI optimizer
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+import struct
+import zlib
+from io import BytesIO
+from unittest import mock
+import numpy as np
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+import cli
+from dci_format import DCIFile, DCIIconBuilder, DCIStreamWriter
+from dci_reader import DCIReader
+from dci_optimizer import optimize_dci, optimize_dci_file, recompress_layer, is_lossless_webp, pixels_equal
+
+
+def noisy_image(seed=0, size=64):
+    rng = np.random.default_rng(seed)
+    return Image.fromarray((rng.integers(0, 4, (size, size, 4)) * 60).astype(np.uint8))
+
+
+def encode(image, **params):
+    output = BytesIO()
+    image.save(output, **params)
+    return output.getvalue()
+
+
+def png_16bit(size=32):
+    """Encode uncompressed 16-bit RGBA noise, which Pillow can only decode to 8 bits"""
+    def chunk(kind, body):
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body))
+    rows = np.random.default_rng(0).integers(0, 65536, (size, size * 4)).astype('>u2')
+    raw = b"".join(b"\x00" + row.tobytes() for row in rows)
+    return (b'\x89PNG\r\n\x1a\n' + chunk(b'IHDR', struct.pack(">IIBBBBB", size, size, 16, 6, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(raw, 0)) + chunk(b'IEND', b''))
+
+
+def build_icon_bytes():
+    builder = DCIIconBuilder()
+    image = noisy_image()
+    for size in (16, 24):
+        builder.add_icon_image(image, size, 'normal', 'universal', 1, format='png', png_compress_level=1)
+        builder.add_icon_image(image, size, 'hover', 'light', 1, format='png', png_compress_level=1)
+        builder.add_icon_image(image, size, 'normal', 'universal', 2, format='webp', webp_lossless=True)
+        builder.add_icon_image(image, size, 'pressed', 'dark', 1, format='webp', quality=50)
+    return builder.to_binary()
+
+
+def layers(data):
+    reader = DCIReader(binary_data=data)
+    assert reader.read()
+    return {f"{entry['path']}/{entry['filename']}": entry for entry in reader.get_layer_entries()}
+
+
+class TestLayerRecompression(unittest.TestCase):
+    """Test recompress_layer and the format checks"""
+
+    def test_png_is_recompressed_losslessly(self):
+        data = encode(noisy_image(), format='PNG', compress_level=0)
+        recompressed = recompress_layer(data)
+        self.assertLess(len(recompressed), len(data))
+        self.assertTrue(pixels_equal(data, recompressed))
+
+    def test_16bit_png_is_kept(self):
+        data = png_16bit()
+        self.assertEqual(data[24], 16)
+        self.assertIs(recompress_layer(data), data)
+
+    def test_lossy_and_unknown_payloads_are_kept(self):
+        lossy = encode(noisy_image(), format='WEBP', quality=50)
+        self.assertFalse(is_lossless_webp(lossy))
+        self.assertIs(recompress_layer(lossy), lossy)
+        self.assertIs(recompress_layer(b"not an image"), b"not an image")
+
+        lossless = encode(noisy_image(), format='WEBP', lossless=True)
+        self.assertTrue(is_lossless_webp(lossless))
+        self.assertTrue(pixels_equal(lossless, recompress_layer(lossless)))
+
+    def test_pixels_equal(self):
+        data = encode(noisy_image(), format='PNG')
+        self.assertFalse(pixels_equal(data, encode(noisy_image(1), format='PNG')))
+        self.assertFalse(pixels_equal(data, encode(noisy_image().convert('RGB'), format='PNG')))
+
+
+class TestOptimizeDCI(unittest.TestCase):
+    """Test optimize_dci and the optimize subcommand"""
+
+    def setUp(self):
+        self.data = build_icon_bytes()
+
+    def test_optimized_file_shows_the_same_pixels(self):
+        optimized, stats = optimize_dci(self.data)
+        self.assertLess(len(optimized), len(self.data))
+        self.assertEqual(stats["optimized_bytes"], len(optimized))
+        self.assertGreater(stats["recompressed"], 0)
+
+        before, after = layers(self.data), layers(optimized)
+        self.assertEqual(before.keys(), after.keys())
+        for path, entry in before.items():
+            self.assertIsNotNone(after[path]['content'], path)
+            self.assertTrue(pixels_equal(entry['content'], after[path]['content']), path)
+        # The lossy layer is copied unchanged
+        self.assertEqual(after["16/pressed.dark/1/1.0p.-1.0_0_0_0_0_0_0.webp"]['content'],
+                         before["16/pressed.dark/1/1.0p.-1.0_0_0_0_0_0_0.webp"]['content'])
+
+        # A second run finds nothing left to do
+        self.assertEqual(optimize_dci(optimized), (optimized, dict(stats, original_bytes=len(optimized),
+                                                                   recompressed=0, linked=0)))
+
+    def test_duplicates_become_links_without_chains(self):
+        optimized, stats = optimize_dci(self.data)
+        self.assertEqual(stats["linked"], 2)
+
+        after = layers(optimized)
+        self.assertFalse(after["16/hover.light/1/1.0p.-1.0_0_0_0_0_0_0.png"]['is_symlink'])
+        self.assertEqual(after["16/normal.light/1/1.0p.-1.0_0_0_0_0_0_0.png"]['symlink_target'],
+                         "../../hover.light/1/1.0p.-1.0_0_0_0_0_0_0.png")
+        # The dark link pointed at normal.light, which is now a link itself
+        self.assertEqual(after["16/normal.dark/1/1.0p.-1.0_0_0_0_0_0_0.png"]['symlink_target'],
+                         "../../hover.light/1/1.0p.-1.0_0_0_0_0_0_0.png")
+
+        _, stats = optimize_dci(self.data, dedupe=False)
+        self.assertEqual(stats["linked"], 0)
+
+    def test_entries_are_reordered(self):
+        output = BytesIO()
+        writer = DCIStreamWriter(output, 2)
+        for size in ("10", "2"):
+            content = DCIIconBuilder()._create_directory_content([])
+            writer.write_entry(DCIFile.FILE_TYPE_DIRECTORY, size, len(content), content)
+
+        optimized, _ = optimize_dci(output.getvalue())
+        reader = DCIReader(binary_data=optimized)
+        self.assertTrue(reader.read())
+        self.assertEqual([file_info['name'] for file_info in reader.files], ["2", "10"])
+
+    def test_changed_pixels_are_rejected(self):
+        other = encode(noisy_image(1), format='PNG')
+        with mock.patch('dci_optimizer.recompress_layer', side_effect=lambda data: other):
+            with self.assertRaises(ValueError):
+                optimize_dci(self.data)
+        with self.assertRaises(ValueError):
+            optimize_dci(b"DCI\x00\x01broken")
+
+    def test_optimize_command(self):
+        test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, test_dir)
+        for name in ("actions/edit.dci", "apps/app.dci"):
+            os.makedirs(os.path.dirname(os.path.join(test_dir, name)), exist_ok=True)
+            with open(os.path.join(test_dir, name), 'wb') as f:
+                f.write(self.data)
+
+        messages = []
+        stats = cli.optimize_files([(os.path.join(test_dir, "apps/app.dci"), None)], workers=1, dry_run=True,
+                                   log=messages.append)
+        self.assertEqual(stats["written"], 0)
+        self.assertIn("saved", messages[0])
+        self.assertEqual(os.path.getsize(os.path.join(test_dir, "apps/app.dci")), len(self.data))
+
+        self.assertEqual(cli.main(["optimize", test_dir, "--workers", "2"]), 0)
+        optimized, _ = optimize_dci(self.data)
+        for name in ("actions/edit.dci", "apps/app.dci"):
+            with open(os.path.join(test_dir, name), 'rb') as f:
+                self.assertEqual(f.read(), optimized)
+
+        # Unchanged files are not rewritten
+        self.assertFalse(optimize_dci_file(os.path.join(test_dir, "apps/app.dci"))["written"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Unit tests for unpacking DCI files to trees and packing them back
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+import cli
+from dci_format import DCIFile, DCIIconBuilder
+from dci_reader import DCIReader
+from dci_tree import unpack_dci, pack_dci
+
+
+def build_icon_bytes():
+    builder = DCIIconBuilder()
+    image = Image.new('RGBA', (8, 8), (255, 0, 0, 255))
+    for size in (16, 24, 128):
+        for scale in (1, 1.25, 2, 10):
+            builder.add_icon_image(image, size, 'normal', 'universal', scale, format='png')
+        builder.add_icon_image(image, size, 'hover', 'dark', 1, format='webp')
+    return builder.to_binary()
+
+
+class TestDCITree(unittest.TestCase):
+    """Test unpack_dci and pack_dci"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.data = build_icon_bytes()
+        self.dci_path = self.write("icon.dci", self.data)
+        self.tree = os.path.join(self.test_dir, "tree")
+
+    def write(self, name, data):
+        path = os.path.join(self.test_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_round_trip_is_byte_identical(self):
+        stats = unpack_dci(self.dci_path, self.tree)
+        self.assertEqual((stats["files"], stats["links"]), (15, 12))
+
+        link = os.path.join(self.tree, "16", "normal.dark", "1.25", "1.0p.-1.0_0_0_0_0_0_0.png")
+        self.assertTrue(os.path.islink(link))
+        self.assertEqual(os.readlink(link), "../../normal.light/1.25/1.0p.-1.0_0_0_0_0_0_0.png")
+        with open(os.path.join(self.tree, "16", "hover.dark", "1", "1.0p.-1.0_0_0_0_0_0_0.webp"), 'rb') as f:
+            self.assertEqual(f.read(4), b"RIFF")
+
+        output_path = os.path.join(self.test_dir, "packed.dci")
+        self.assertEqual(pack_dci(self.tree, output_path), stats)
+        with open(output_path, 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_edited_tree_is_packed(self):
+        unpack_dci(self.dci_path, self.tree)
+        extra_dir = os.path.join(self.tree, "32", "normal.light", "1")
+        os.makedirs(extra_dir)
+        with open(os.path.join(extra_dir, "1.0p.-1.0_0_0_0_0_0_0.png"), 'wb') as f:
+            f.write(Image.new('RGBA', (32, 32)).tobytes())
+
+        output_path = os.path.join(self.test_dir, "packed.dci")
+        pack_dci(self.tree, output_path)
+        reader = DCIReader(output_path)
+        self.assertTrue(reader.read())
+        self.assertEqual([file_info['name'] for file_info in reader.files], ["16", "24", "32", "128"])
+        self.assertIn("32/normal.light/1", reader.directory_structure)
+
+    def test_existing_trees_are_kept(self):
+        unpack_dci(self.dci_path, self.tree)
+        with self.assertRaises(FileExistsError):
+            unpack_dci(self.dci_path, self.tree)
+        self.assertEqual(unpack_dci(self.dci_path, self.tree, replace=True)["files"], 15)
+
+    def test_unsafe_entries_are_rejected(self):
+        for name, make in (
+            ("dotdot.dci", lambda dci: dci.add_directory("..", [{'name': 'x.png', 'content': b"x"}])),
+            # A directory with the name of an earlier link must not be written through the link
+            ("link.dci", lambda dci: (dci.add_file("a", self.test_dir.encode(), DCIFile.FILE_TYPE_LINK),
+                                      dci.add_directory("a", [{'name': 'escaped', 'content': b"x"}]))),
+        ):
+            dci = DCIFile()
+            make(dci)
+            path = self.write(name, dci.to_binary())
+            with self.assertRaises((ValueError, FileExistsError)):
+                unpack_dci(path, self.tree)
+            self.assertFalse(os.path.exists(self.tree))
+        self.assertFalse(os.path.exists(os.path.join(self.test_dir, "escaped")))
+
+    def test_truncated_file_leaves_no_tree(self):
+        path = self.write("truncated.dci", self.data[:-10])
+        with self.assertRaises(ValueError):
+            unpack_dci(path, self.tree)
+        self.assertFalse(os.path.exists(self.tree))
+
+
+class TestTreeCommands(unittest.TestCase):
+    """Test the unpack and pack subcommands over a theme"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.theme = os.path.join(self.test_dir, "theme")
+        self.names = ["actions/edit.dci", "actions/copy.dci", "apps/app.dci"]
+        data = build_icon_bytes()
+        for name in self.names:
+            os.makedirs(os.path.dirname(os.path.join(self.theme, name)), exist_ok=True)
+            with open(os.path.join(self.theme, name), 'wb') as f:
+                f.write(data)
+
+    def test_theme_round_trip(self):
+        trees = os.path.join(self.test_dir, "trees")
+        packed = os.path.join(self.test_dir, "packed")
+        self.assertEqual(cli.main(["unpack", self.theme, trees, "--workers", "2"]), 0)
+        self.assertTrue(os.path.isdir(os.path.join(trees, "apps", "app.dci", "128")))
+        self.assertEqual(cli.main(["unpack", self.theme, trees, "--workers", "1"]), 1)
+
+        self.assertEqual(cli.main(["pack", trees, packed, "--workers", "2"]), 0)
+        for name in self.names:
+            with open(os.path.join(self.theme, name), 'rb') as a, open(os.path.join(packed, name), 'rb') as b:
+                self.assertEqual(a.read(), b.read(), name)
+
+        single = os.path.join(self.test_dir, "single.dci")
+        self.assertEqual(cli.main(["pack", os.path.join(trees, "apps", "app.dci"), single, "--workers", "1"]), 0)
+        self.assertTrue(os.path.isfile(single))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the streaming Debian package reader
+"""
+
+import unittest
+import os
+import sys
+import io
+import tarfile
+from unittest import mock
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.ar_archive import iter_ar_members, ArMemberReader
+from utils.deb_reader import tar_stream_mode, iter_tar_stream
+
+
+def build_tar(entries, mode):
+    """Build a tarball from (name, content) pairs, content None meaning a symlink"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as tar_file:
+        for name, content in entries:
+            info = tarfile.TarInfo(name)
+            if content is None:
+                info.type = tarfile.SYMTYPE
+                info.linkname = "target.dci"
+                tar_file.addfile(info)
+            else:
+                info.size = len(content)
+                tar_file.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def build_ar(members):
+    """Build an ar archive from (name, content) pairs"""
+    data = bytearray(b"!<arch>\n")
+    for name, content in members:
+        header = f"{name + '/':<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(content):<10}`\n"
+        data += header.encode('ascii') + content
+        if len(content) % 2:
+            data += b"\n"
+    return bytes(data)
+
+
+class TestArMembers(unittest.TestCase):
+    """Test locating ar members in place"""
+
+    def test_members_are_located_without_reading_content(self):
+        archive = build_ar([("debian-binary", b"2.0\n"), ("odd", b"abc"), ("data.tar", b"x" * 10)])
+        f = io.BytesIO(archive)
+
+        members = list(iter_ar_members(f))
+        self.assertEqual([name for name, _, _ in members], ["debian-binary", "odd", "data.tar"])
+
+        for name, offset, size in members:
+            reader = ArMemberReader(f, offset, size)
+            content = reader.read(2) + reader.read()
+            self.assertEqual(content, {"debian-binary": b"2.0\n", "odd": b"abc", "data.tar": b"x" * 10}[name])
+            self.assertEqual(reader.read(), b"")
+
+    def test_invalid_magic(self):
+        with self.assertRaises(ValueError):
+            list(iter_ar_members(io.BytesIO(b"not an archive")))
+
+
+class TestTarStream(unittest.TestCase):
+    """Test single-pass tar reading"""
+
+    def test_stream_modes(self):
+        self.assertEqual(tar_stream_mode("data.tar.gz"), "r|gz")
+        self.assertEqual(tar_stream_mode("data.tar.xz"), "r|xz")
+        self.assertEqual(tar_stream_mode("data.tar.bz2"), "r|bz2")
+        self.assertEqual(tar_stream_mode("data.tar"), "r|")
+        self.assertEqual(tar_stream_mode("data.tar.zst"), "r|*")
+
+    def test_only_selected_files_are_read(self):
+        entries = [("./icons/a.dci", b"a" * 5000), ("./icons/b.png", b"b" * 3000), ("./icons/link.dci", None)]
+
+        for compression in ("gz", "xz", "bz2"):
+            archive = build_ar([("data.tar." + compression, build_tar(entries, "w:" + compression))])
+            f = io.BytesIO(archive)
+            name, offset, size = next(iter_ar_members(f))
+
+            with mock.patch.object(tarfile.TarFile, "getmembers", side_effect=AssertionError("not streaming")):
+                results = {member.name: content for member, content in
+                           iter_tar_stream(ArMemberReader(f, offset, size), tar_stream_mode(name),
+                                           lambda member: member.name.endswith(".dci"))}
+
+            self.assertEqual(results, {"./icons/a.dci": b"a" * 5000, "./icons/b.png": None, "./icons/link.dci": None})
+
+    def test_hardlinks_resolve_to_their_target(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as tar_file:
+            for name, content in (("./icons/a.dci", b"a" * 5000), ("./icons/b.png", b"b" * 3000)):
+                info = tarfile.TarInfo(name)
+                info.size = len(content)
+                tar_file.addfile(info, io.BytesIO(content))
+            for name, target in (("./icons/copy.dci", "./icons/a.dci"), ("./icons/copy2.dci", "./icons/copy.dci"),
+                                 ("./icons/b.dci", "./icons/b.png"), ("./icons/missing.dci", "./icons/none.dci")):
+                info = tarfile.TarInfo(name)
+                info.type = tarfile.LNKTYPE
+                info.linkname = target
+                tar_file.addfile(info)
+
+        def select(member):
+            return member.name.endswith(".dci")
+
+        results = {member.name: (member.size, content) for member, content in
+                   iter_tar_stream(io.BytesIO(buffer.getvalue()), "r|gz", select)}
+        self.assertEqual(results, {
+            "./icons/a.dci": (5000, b"a" * 5000), "./icons/b.png": (3000, None),
+            "./icons/copy.dci": (5000, b"a" * 5000), "./icons/copy2.dci": (5000, b"a" * 5000),
+            # A stream pass cannot go back for a target that was not selected
+            "./icons/b.dci": (3000, None), "./icons/missing.dci": (0, None),
+        })
+
+        # Targets can be read back from elsewhere instead of being kept in memory
+        requested = []
+        link_content = lambda name: requested.append(name) or b"staged"
+        results = {member.name: content for member, content in
+                   iter_tar_stream(io.BytesIO(buffer.getvalue()), "r|gz", select, link_content)}
+        self.assertEqual((results["./icons/copy.dci"], results["./icons/b.dci"]), (b"staged", b"staged"))
+        self.assertEqual(requested, ["./icons/a.dci", "./icons/a.dci", "./icons/b.png"])
+
+
+if __name__ == '__main__':
+    unittest.main()
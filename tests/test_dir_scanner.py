@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the scandir based directory scanner
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+from unittest import mock
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.dir_scanner import scan_directory
+
+
+class TestScanDirectory(unittest.TestCase):
+    """Test scan_directory"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+        for relative_path in ("top.dci", "notes.txt", "actions/edit.dci", "actions/48/edit.dci",
+                              "apps/64/deep/app.dci", "build/cache.dci"):
+            path = os.path.join(self.root, relative_path)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, 'w') as f:
+                f.write(relative_path)
+
+        self.has_symlinks = hasattr(os, "symlink")
+        if self.has_symlinks:
+            try:
+                os.symlink("top.dci", os.path.join(self.root, "link.dci"))
+                os.symlink(self.root, os.path.join(self.root, "actions", "loop"))
+            except OSError:
+                self.has_symlinks = False
+
+    def relative(self, paths):
+        return [os.path.relpath(path, self.root).replace(os.sep, '/') for path in paths]
+
+    def test_filter_and_sorting(self):
+        files, skipped = scan_directory(self.root, "*.dci", skip_symlinks=True)
+        self.assertEqual(self.relative(files), ["actions/48/edit.dci", "actions/edit.dci",
+                                                "apps/64/deep/app.dci", "build/cache.dci", "top.dci"])
+        if self.has_symlinks:
+            self.assertEqual(self.relative(skipped), ["actions/loop", "link.dci"])
+
+        files, _ = scan_directory(self.root, "*/48/*.dci; *.txt", skip_symlinks=True)
+        self.assertEqual(self.relative(files), ["actions/48/edit.dci", "notes.txt"])
+
+    def test_exclude_and_depth(self):
+        files, _ = scan_directory(self.root, "*.dci", skip_symlinks=True, exclude="build, */48")
+        self.assertEqual(self.relative(files), ["actions/edit.dci", "apps/64/deep/app.dci", "top.dci"])
+
+        files, _ = scan_directory(self.root, "*.dci", skip_symlinks=True, max_depth=1)
+        self.assertEqual(self.relative(files), ["actions/edit.dci", "build/cache.dci", "top.dci"])
+
+        for kwargs in ({"recursive": False}, {"max_depth": 0}):
+            files, _ = scan_directory(self.root, "*.dci", skip_symlinks=True, **kwargs)
+            self.assertEqual(self.relative(files), ["top.dci"])
+
+    def test_followed_symlinks_terminate(self):
+        if not self.has_symlinks:
+            self.skipTest("symlinks are not available")
+        os.symlink(os.path.join(self.root, "apps"), os.path.join(self.root, "alias"))
+        files, skipped = scan_directory(self.root, "*.dci", exclude="build")
+        self.assertEqual(skipped, [])
+        # The link back to the root is not entered again, other linked directories are
+        self.assertEqual(self.relative(files), ["actions/48/edit.dci", "actions/edit.dci", "alias/64/deep/app.dci",
+                                                "apps/64/deep/app.dci", "link.dci", "top.dci"])
+
+    def test_workers_give_same_result(self):
+        expected = scan_directory(self.root, "*.dci", skip_symlinks=True)
+        self.assertEqual(scan_directory(self.root, "*.dci", skip_symlinks=True, workers=4), expected)
+
+    def test_no_stat_calls_for_plain_entries(self):
+        with mock.patch('os.stat', side_effect=AssertionError("stat called")), \
+                mock.patch('os.path.isfile', side_effect=AssertionError("isfile called")):
+            files, _ = scan_directory(self.root, "*.dci", skip_symlinks=True)
+        self.assertEqual(len(files), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Unit tests for compiled file filters
+"""
+
+import unittest
+import os
+import sys
+from unittest import mock
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.file_utils import compile_file_filter
+
+
+class TestCompileFileFilter(unittest.TestCase):
+    """Test compile_file_filter"""
+
+    def test_name_patterns(self):
+        matches = compile_file_filter("*.dci; *.png")
+        self.assertTrue(matches("usr/share/icons/edit.dci"))
+        self.assertTrue(matches("logo.png"))
+        self.assertFalse(matches("usr/share/icons/edit.svg"))
+        self.assertFalse(matches("usr/share/dci.dir/readme"))
+
+    def test_path_patterns(self):
+        matches = compile_file_filter("*/48/*.dci,./usr/share/doc/*")
+        self.assertTrue(matches("usr/share/icons/48/edit.dci"))
+        self.assertFalse(matches("usr/share/icons/64/edit.dci"))
+        self.assertFalse(matches("48/edit.dci"))
+        self.assertTrue(matches("usr/share/doc/copyright"))
+
+    def test_case_follows_the_platform(self):
+        """Patterns ignore case on Windows only, like fnmatch.fnmatch"""
+        with mock.patch('os.name', 'posix'):
+            self.assertFalse(compile_file_filter("*.dci")("Edit.DCI"))
+        with mock.patch('os.name', 'nt'):
+            matches = compile_file_filter("*.dci,*/48/*.png")
+            self.assertTrue(matches("Edit.DCI"))
+            self.assertTrue(matches("Icons/48/Logo.PNG"))
+
+    def test_empty_filter_matches_nothing(self):
+        matches = compile_file_filter(" , ")
+        self.assertFalse(matches("edit.dci"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the IS_CHANGED fingerprints of the file-reading nodes
+"""
+
+import unittest
+import os
+import sys
+import tempfile
+import shutil
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.fingerprint import file_fingerprint, tree_fingerprint
+from nodes.directory_loader_node import DirectoryLoader
+from nodes.deb_loader_node import DebLoader
+
+try:
+    from py.nodes.file_node import BinaryFileLoader
+except ImportError:
+    BinaryFileLoader = None
+
+
+class FingerprintTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+
+    def write(self, name, content, mtime_offset=0):
+        path = os.path.join(self.test_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if mtime_offset:
+            # Rewrites within the filesystem's timestamp granularity keep the old mtime
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+        return path
+
+    def touch(self, path):
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestFingerprintHelpers(FingerprintTestCase):
+    """Test file_fingerprint and tree_fingerprint"""
+
+    def test_file_fingerprint(self):
+        path = self.write("icon.dci", b"one")
+        stat_value = file_fingerprint(path)
+        content_value = file_fingerprint(path, hash_content=True)
+
+        self.touch(path)
+        self.assertNotEqual(file_fingerprint(path), stat_value)
+        self.assertEqual(file_fingerprint(path, hash_content=True), content_value)
+
+        self.write("icon.dci", b"two")
+        self.assertNotEqual(file_fingerprint(path, hash_content=True), content_value)
+
+        os.remove(path)
+        self.assertEqual(file_fingerprint(path), file_fingerprint(path))
+
+    def test_tree_fingerprint(self):
+        paths = [self.write(name, name.encode()) for name in ("a.dci", "sub/b.dci")]
+        value = tree_fingerprint(paths, self.test_dir, "*.dci")
+
+        self.assertEqual(tree_fingerprint(paths, self.test_dir, "*.dci"), value)
+        self.assertNotEqual(tree_fingerprint(paths, self.test_dir, "*.png"), value)
+        self.assertNotEqual(tree_fingerprint(paths[:1], self.test_dir, "*.dci"), value)
+
+        # Moving the whole tree keeps relative names
+        moved = self.test_dir + "_moved"
+        shutil.copytree(self.test_dir, moved, copy_function=shutil.copy2)
+        self.addCleanup(shutil.rmtree, moved)
+        moved_paths = [os.path.join(moved, os.path.relpath(path, self.test_dir)) for path in paths]
+        self.assertEqual(tree_fingerprint(moved_paths, moved, "*.dci"), value)
+
+        self.touch(paths[1])
+        self.assertNotEqual(tree_fingerprint(paths, self.test_dir, "*.dci"), value)
+
+
+class TestNodeFingerprints(FingerprintTestCase):
+    """Test IS_CHANGED of the loader nodes"""
+
+    def test_directory_loader_without_cache(self):
+        self.write("a.dci", b"a")
+        kwargs = {"directory_path": self.test_dir, "file_filter": "*.dci", "use_cache": False}
+        value = DirectoryLoader.IS_CHANGED(**kwargs)
+        self.assertEqual(DirectoryLoader.IS_CHANGED(**kwargs), value)
+
+        self.write("notes.txt", b"ignored")
+        self.assertEqual(DirectoryLoader.IS_CHANGED(**kwargs), value)
+
+        self.write("sub/b.dci", b"b")
+        self.assertNotEqual(DirectoryLoader.IS_CHANGED(**kwargs), value)
+
+        missing = dict(kwargs, directory_path=os.path.join(self.test_dir, "missing"))
+        self.assertEqual(DirectoryLoader.IS_CHANGED(**missing), DirectoryLoader.IS_CHANGED(**missing))
+
+    def test_deb_loader(self):
+        deb_path = self.write("icons.deb", b"!<arch>\n")
+        kwargs = {"deb_file_path": deb_path, "file_filter": "*.dci"}
+        value = DebLoader.IS_CHANGED(**kwargs)
+
+        self.assertEqual(DebLoader.IS_CHANGED(**kwargs), value)
+        self.assertNotEqual(DebLoader.IS_CHANGED(**dict(kwargs, skip_symlinks=False)), value)
+        self.touch(deb_path)
+        self.assertNotEqual(DebLoader.IS_CHANGED(**kwargs), value)
+
+        # Directory inputs also change when a package is added
+        directory_value = DebLoader.IS_CHANGED(deb_file_path=self.test_dir)
+        self.write("more.deb", b"!<arch>\n")
+        self.assertNotEqual(DebLoader.IS_CHANGED(deb_file_path=self.test_dir), directory_value)
+
+    @unittest.skipIf(BinaryFileLoader is None, "Binary file loader node not available")
+    def test_binary_file_loader(self):
+        path = self.write("icon.dci", b"one")
+        value = BinaryFileLoader.IS_CHANGED(file_path=path, hash_content=True)
+        self.touch(path)
+        self.assertEqual(BinaryFileLoader.IS_CHANGED(file_path=path, hash_content=True), value)
+        self.assertEqual(BinaryFileLoader.IS_CHANGED(file_path=path), file_fingerprint(path))
+
+
+if __name__ == '__main__':
+    unittest.main()
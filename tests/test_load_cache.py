@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the directory manifest, decode cache and DirectoryLoader.IS_CHANGED
+"""
+
+import unittest
+import os
+import sys
+import io
+import tempfile
+import shutil
+from unittest import mock
+import numpy as np
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+import utils.load_cache as load_cache
+from utils.load_cache import DirectoryManifest, get_cached_decode, cache_decode, clear_decode_cache
+from nodes.directory_loader_node import DirectoryLoader
+
+
+def png_bytes(color, size=(8, 6)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestDecodeCache(unittest.TestCase):
+    """Test the bounded decode cache"""
+
+    def tearDown(self):
+        clear_decode_cache()
+
+    def test_evicts_least_recently_used(self):
+        with mock.patch.object(load_cache, 'DECODE_CACHE_BYTES', 100):
+            for key in ("a", "b", "c"):
+                cache_decode(key, b"x" * 40, None)
+            self.assertIsNone(get_cached_decode("a"))
+
+            get_cached_decode("b")
+            cache_decode("d", b"x" * 40, None)
+            self.assertIsNotNone(get_cached_decode("b"))
+            self.assertIsNone(get_cached_decode("c"))
+
+            # Entries larger than the whole budget are not cached
+            cache_decode("e", b"x" * 101, None)
+            self.assertIsNone(get_cached_decode("e"))
+
+
+class TestDirectoryLoaderCache(unittest.TestCase):
+    """Test DirectoryLoader serves unchanged files from the cache"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.addCleanup(clear_decode_cache)
+        clear_decode_cache()
+
+        patcher = mock.patch('nodes.directory_loader_node.get_cache_directory',
+                             side_effect=lambda name="": os.path.join(self.cache_dir, name))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        for i in range(3):
+            self.write(f"icon{i}.png", png_bytes((i * 40, 0, 0)))
+        self.write("notes.txt", b"notes")
+
+    def write(self, name, content, mtime_offset=0):
+        path = os.path.join(self.test_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if mtime_offset:
+            # Rewrites within the filesystem's timestamp granularity keep the old mtime
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + mtime_offset))
+
+    def load(self):
+        return DirectoryLoader()._execute_impl(self.test_dir, "*", max_workers=2)
+
+    def test_unchanged_files_are_not_read(self):
+        first = self.load()
+        with mock.patch('nodes.directory_loader_node.load_binary_data', side_effect=AssertionError("file read")), \
+                mock.patch('nodes.directory_loader_node.decode_image_array', side_effect=AssertionError("decoded")):
+            second = self.load()
+
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(second[1], first[1])
+        np.testing.assert_array_equal(np.asarray(second[2][0]), np.asarray(first[2][0]))
+
+    def test_changed_file_is_reloaded(self):
+        self.load()
+        self.write("icon1.png", png_bytes((255, 255, 0)), mtime_offset=10 ** 9)
+        binary_data_list, relative_paths, images = self.load()[:3]
+
+        self.assertEqual(binary_data_list[relative_paths.index("icon1.png")], png_bytes((255, 255, 0)))
+        self.assertEqual(float(np.asarray(images[0])[1, 0, 0, 1]), 1.0)
+
+    def test_manifest_is_persistent(self):
+        self.load()
+        manifest = DirectoryManifest(os.path.join(self.cache_dir, DirectoryLoader.MANIFEST_CACHE_NAME), self.test_dir)
+        self.assertEqual(sorted(manifest.files), ["icon0.png", "icon1.png", "icon2.png", "notes.txt"])
+        entry = manifest.files["notes.txt"]
+        self.assertEqual(entry["size"], 5)
+        self.assertEqual(entry["mtime_ns"], os.stat(os.path.join(self.test_dir, "notes.txt")).st_mtime_ns)
+        self.assertTrue(entry["decode_key"].startswith(entry["sha256"]))
+
+    def test_is_changed(self):
+        kwargs = {"directory_path": self.test_dir, "file_filter": "*.png"}
+        fingerprint = DirectoryLoader.IS_CHANGED(**kwargs)
+        self.load()
+        self.assertEqual(DirectoryLoader.IS_CHANGED(**kwargs), fingerprint)
+
+        # Files outside the filter and touched files with the same content do not count
+        self.write("notes.txt", b"changed")
+        path = os.path.join(self.test_dir, "icon0.png")
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        self.assertEqual(DirectoryLoader.IS_CHANGED(**kwargs), fingerprint)
+
+        self.write("icon0.png", png_bytes((1, 2, 3)), mtime_offset=2 * 10 ** 9)
+        changed = DirectoryLoader.IS_CHANGED(**kwargs)
+        self.assertNotEqual(changed, fingerprint)
+
+        os.remove(path)
+        self.assertNotEqual(DirectoryLoader.IS_CHANGED(**kwargs), changed)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Unit tests for loading several deb files concurrently with DebLoader
+"""
+
+import unittest
+import os
+import sys
+import io
+import tarfile
+import tempfile
+import shutil
+import contextlib
+from unittest import mock
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from nodes.deb_loader_node import DebLoader, _load_deb_package
+
+
+def build_tar_gz(entries):
+    """Build a gzip tarball from (name, content) pairs"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar_file:
+        for name, content in entries:
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar_file.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def build_deb(path, files, data=None):
+    """Write a minimal deb with the (relative path, content) pairs below ./usr/share/icons
+
+    data replaces the data.tar.gz member when given.
+    """
+    if data is None:
+        data = build_tar_gz([(f"./usr/share/icons/{name}", content) for name, content in files])
+    members = [
+        ("debian-binary", b"2.0\n"),
+        ("control.tar.gz", build_tar_gz([("./control", b"Package: test\n")])),
+        ("data.tar.gz", data),
+    ]
+    with open(path, 'wb') as f:
+        f.write(b"!<arch>\n")
+        for name, content in members:
+            f.write(f"{name + '/':<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(content):<10}`\n".encode('ascii') + content)
+            if len(content) % 2:
+                f.write(b"\n")
+
+
+class TestMultiDebLoader(unittest.TestCase):
+    """Test DebLoader._load_multiple_debs through the node and its worker"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+        self.deb_dir = os.path.join(self.test_dir, "debs")
+        os.makedirs(self.deb_dir)
+
+        # Incompressible payloads so the memory budget counts real bytes
+        self.packages = {
+            "a.deb": [("a1.dci", os.urandom(300 * 1024)), ("a2.dci", os.urandom(300 * 1024)), ("a.txt", b"text")],
+            "b.deb": [("b1.dci", os.urandom(300 * 1024))],
+            "c.deb": [("c1.dci", os.urandom(300 * 1024)), ("c2.dci", os.urandom(300 * 1024))],
+        }
+        for name, files in self.packages.items():
+            build_deb(os.path.join(self.deb_dir, name), files)
+
+        # Spilled files go below the test directory instead of the system temp directory
+        patcher = mock.patch.object(DebLoader, '_get_spill_root', return_value=self.test_dir)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def load(self, deb_file_path, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            result = DebLoader()._execute_impl(deb_file_path, "*.dci", **kwargs)
+        return result, output.getvalue()
+
+    def expected_files(self, packages=("a.deb", "b.deb", "c.deb")):
+        return [(package, f"usr/share/icons/{name}", content) for package in packages
+                for name, content in self.packages[package] if name.endswith(".dci")]
+
+    def test_files_keep_package_order_and_source(self):
+        expected = self.expected_files()
+        for max_workers in (1, 3):
+            with self.subTest(max_workers=max_workers):
+                (binary_data_list, relative_paths, _, _, skipped, source_packages, spilled, _), _ = self.load(
+                    self.deb_dir, max_workers=max_workers)
+                self.assertEqual(relative_paths, [path for _, path, _ in expected])
+                self.assertEqual(binary_data_list, [content for _, _, content in expected])
+                self.assertEqual(source_packages, [package for package, _, _ in expected])
+                self.assertEqual((skipped, spilled), ([], []))
+
+        # A glob selects packages the same way
+        (_, relative_paths, _, _, _, source_packages, _, _), _ = self.load(os.path.join(self.deb_dir, "[ac].deb"))
+        self.assertEqual(source_packages, ["a.deb", "a.deb", "c.deb", "c.deb"])
+        self.assertEqual(relative_paths, [path for _, path, _ in self.expected_files(("a.deb", "c.deb"))])
+
+    def test_memory_budget_spills_to_disk(self):
+        expected = self.expected_files()
+        # 1 MB holds the first three 300 KB files, the other two are left on disk
+        (binary_data_list, relative_paths, _, _, _, source_packages, spilled, _), output = self.load(
+            self.deb_dir, max_workers=2, memory_budget_mb=1)
+
+        self.assertEqual(relative_paths, [path for _, path, _ in expected[:3]])
+        self.assertEqual(binary_data_list, [content for _, _, content in expected[:3]])
+        self.assertEqual(source_packages, ["a.deb", "a.deb", "b.deb"])
+        self.assertEqual(len(spilled), 2)
+        for spilled_path, (_, relative_path, content) in zip(spilled, expected[3:]):
+            self.assertTrue(spilled_path.startswith(self.test_dir))
+            self.assertTrue(spilled_path.endswith(relative_path))
+            with open(spilled_path, 'rb') as f:
+                self.assertEqual(f.read(), content)
+        self.assertIn("2 个文件写入磁盘", output)
+
+        # Files read back into memory are removed from the staging directory
+        staged = [os.path.join(root, name) for root, _, names in os.walk(self.test_dir) if "dci_deb_" in root
+                  for name in names]
+        self.assertEqual(sorted(staged), sorted(spilled))
+
+    def test_corrupt_package_is_reported(self):
+        # A gzip header followed by garbage fails while the data archive is read
+        build_deb(os.path.join(self.deb_dir, "b.deb"), [], data=b"\x1f\x8b\x08\x00" + os.urandom(4096))
+
+        (_, relative_paths, _, _, _, source_packages, _, _), output = self.load(self.deb_dir, max_workers=3)
+        self.assertEqual(relative_paths, [path for _, path, _ in self.expected_files(("a.deb", "c.deb"))])
+        self.assertEqual(source_packages, ["a.deb", "a.deb", "c.deb", "c.deb"])
+        self.assertIn("❌ b.deb", output)
+
+    def test_worker_streams_files_to_staging(self):
+        staging_dir = os.path.join(self.test_dir, "staging")
+        deb_path = os.path.join(self.deb_dir, "a.deb")
+        # No member index is built, so the tarball is never held in memory as a whole
+        with mock.patch('nodes.deb_loader_node.index_tar_stream', side_effect=AssertionError("index built")):
+            result = _load_deb_package(deb_path, "*.dci", True, staging_dir)
+
+        self.assertNotIn("error", result)
+        self.assertEqual(result["file_count"], 4)
+        files = self.packages["a.deb"]
+        self.assertEqual([(path, content, size) for path, content, _, size in result["files"]],
+                         [(f"usr/share/icons/{name}", None, len(data)) for name, data in files[:2]])
+        for (_, _, staged_path, _), (_, data) in zip(result["files"], files):
+            with open(staged_path, 'rb') as f:
+                self.assertEqual(f.read(), data)
+
+        # Without a staging directory the content is returned inline
+        result = _load_deb_package(deb_path, "*.dci")
+        self.assertEqual([content for _, content, _, _ in result["files"]], [data for _, data in files[:2]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Unit tests for paged, resolution-capped DCI previews
+"""
+
+import unittest
+import os
+import sys
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from dci_format import DCIIconBuilder
+from dci_reader import DCIReader, DCIPreviewGenerator
+
+
+def build_test_images(size=512, states=('normal', 'hover', 'pressed', 'disabled')):
+    """Build a DCI with large icons and return the images read back from it"""
+    builder = DCIIconBuilder()
+    image = Image.new('RGBA', (64, 64), (255, 0, 0, 255))
+    for state in states:
+        for tone in ('light', 'dark'):
+            builder.add_icon_image(image, size, state, tone, 1, 'png')
+            builder.add_icon_image(image, size, state, tone, 2, 'jpg')
+
+    reader = DCIReader(binary_data=builder.to_binary())
+    assert reader.read()
+    return reader.get_icon_images()
+
+
+class TestPagedPreview(unittest.TestCase):
+    """Test DCIPreviewGenerator.create_preview_pages"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.images = build_test_images()
+
+    def test_pages_respect_canvas_limit(self):
+        """Every page fits in the canvas limit and all pages share one size"""
+        generator = DCIPreviewGenerator(font_size=10)
+        pages = generator.create_preview_pages(self.images, 8, (240, 240, 240),
+                                               max_canvas_width=1024, max_canvas_height=1024,
+                                               max_cell_image_size=64)
+
+        self.assertGreater(len(pages), 1)
+        for page in pages:
+            self.assertLessEqual(page.width, 1024)
+            self.assertLessEqual(page.height, 1024)
+            self.assertEqual(page.size, pages[0].size)
+
+    def test_thumbnail_larger_than_canvas(self):
+        """A thumbnail limit above the canvas size still keeps pages and cells in the canvas"""
+        generator = DCIPreviewGenerator(font_size=10)
+        images = build_test_images(size=1024, states=('normal',))[:1]
+        pages = generator.create_preview_pages(images, 4, (240, 240, 240),
+                                               max_canvas_width=512, max_canvas_height=512,
+                                               max_cell_image_size=1024)
+
+        self.assertEqual(len(pages), 1)
+        self.assertLessEqual(pages[0].width, 512)
+        self.assertLessEqual(pages[0].height, 512)
+        # The icon is drawn inside the page instead of spilling over its cell
+        self.assertEqual(pages[0].getpixel((pages[0].width - 1, pages[0].height // 2)), (240, 240, 240))
+
+    def test_single_page_when_everything_fits(self):
+        """A large canvas renders all icons on one page"""
+        generator = DCIPreviewGenerator(font_size=10)
+        pages = generator.create_preview_pages(self.images, 16, (240, 240, 240),
+                                               max_canvas_width=8192, max_canvas_height=8192,
+                                               max_cell_image_size=32)
+        self.assertEqual(len(pages), 1)
+
+    def test_max_pages_limit(self):
+        """max_pages truncates the page list"""
+        generator = DCIPreviewGenerator(font_size=10)
+        pages = generator.create_preview_pages(self.images, 1, (240, 240, 240),
+                                               max_canvas_width=1024, max_canvas_height=512,
+                                               max_cell_image_size=64, max_pages=2)
+        self.assertEqual(len(pages), 2)
+
+    def test_empty_images(self):
+        """An empty image list still produces one placeholder page"""
+        generator = DCIPreviewGenerator()
+        pages = generator.create_preview_pages([])
+        self.assertEqual(len(pages), 1)
+
+    def test_cell_thumbnail_is_reduced(self):
+        """Cell thumbnails are decoded close to the target size"""
+        generator = DCIPreviewGenerator()
+        for img_info in self.images[:4]:
+            thumbnail = generator._load_cell_thumbnail(img_info, 64)
+            self.assertLess(max(thumbnail.size), max(img_info['image'].size))
+            self.assertGreaterEqual(max(thumbnail.size), 64)
+
+
+class TestAtlasPreview(unittest.TestCase):
+    """Test DCIPreviewGenerator.create_atlas"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.images = build_test_images()
+
+    def test_atlas_placements(self):
+        """Every icon is placed inside its atlas without overlapping others"""
+        generator = DCIPreviewGenerator()
+        atlases, atlas_map = generator.create_atlas(self.images, max_atlas_size=128, max_cell_image_size=48)
+
+        self.assertEqual(len(atlas_map), len(self.images))
+        self.assertGreater(len(atlases), 1)
+        for atlas in atlases:
+            self.assertEqual(atlas.size, atlases[0].size)
+            self.assertLessEqual(max(atlas.size), 128)
+
+        for i, entry in enumerate(atlas_map):
+            self.assertLessEqual(max(entry['width'], entry['height']), 48)
+            self.assertLessEqual(entry['x'] + entry['width'], atlases[entry['atlas']].width)
+            self.assertLessEqual(entry['y'] + entry['height'], atlases[entry['atlas']].height)
+            self.assertEqual(entry['state'], self.images[i]['state'])
+            for other in atlas_map[:i]:
+                if other['atlas'] != entry['atlas']:
+                    continue
+                self.assertTrue(entry['x'] + entry['width'] <= other['x'] or other['x'] + other['width'] <= entry['x'] or
+                                entry['y'] + entry['height'] <= other['y'] or other['y'] + other['height'] <= entry['y'])
+
+    def test_thumbnail_larger_than_atlas(self):
+        """A thumbnail limit above the atlas size still keeps every atlas within its cap"""
+        generator = DCIPreviewGenerator()
+        images = build_test_images(size=1024, states=('normal',))[:2]
+        atlases, atlas_map = generator.create_atlas(images, max_atlas_size=256, max_cell_image_size=1024, padding=4)
+
+        self.assertEqual(len(atlases), 2)
+        for atlas in atlases:
+            self.assertLessEqual(max(atlas.size), 256)
+        for entry in atlas_map:
+            self.assertLessEqual(entry['x'] + entry['width'], atlases[entry['atlas']].width)
+            self.assertLessEqual(entry['y'] + entry['height'], atlases[entry['atlas']].height)
+
+    def test_atlas_pixels(self):
+        """Atlas rectangles contain the icon thumbnails"""
+        generator = DCIPreviewGenerator()
+        atlases, atlas_map = generator.create_atlas(self.images[:2], max_atlas_size=1024, max_cell_image_size=32)
+
+        self.assertEqual(len(atlases), 1)
+        entry = atlas_map[0]
+        pixel = atlases[0].getpixel((entry['x'] + entry['width'] // 2, entry['y'] + entry['height'] // 2))
+        self.assertGreater(pixel[0], 200)
+        self.assertGreater(pixel[3], 200)
+
+    def test_empty_atlas(self):
+        """No images produce no atlases"""
+        self.assertEqual(DCIPreviewGenerator().create_atlas([]), ([], []))
+
+
+if __name__ == '__main__':
+    unittest.main()
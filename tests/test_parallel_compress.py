@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Unit tests for block-parallel gzip compression
+"""
+
+import unittest
+import os
+import sys
+import io
+import gzip
+import random
+import zlib
+import lzma
+import struct
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.parallel_compress import ParallelGzipWriter, ParallelXzWriter, crc32_combine
+
+
+class TestCrc32Combine(unittest.TestCase):
+    """Test crc32_combine"""
+
+    def test_matches_zlib(self):
+        """Combined CRCs equal the CRC of the concatenation"""
+        rng = random.Random(1)
+        for _ in range(30):
+            first = bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 300)))
+            second = bytes(rng.getrandbits(8) for _ in range(rng.randint(0, 3000)))
+            self.assertEqual(crc32_combine(zlib.crc32(first), zlib.crc32(second), len(second)),
+                             zlib.crc32(first + second))
+
+
+class TestParallelGzipWriter(unittest.TestCase):
+    """Test ParallelGzipWriter"""
+
+    def setUp(self):
+        rng = random.Random(2)
+        # Mix of incompressible and repetitive data spanning many blocks
+        self.data = b"".join(os.urandom(100) + b"dci icon " * rng.randint(0, 400) for _ in range(300))
+
+    def compress(self, data, workers, level=6, chunk_size=7919):
+        buffer = io.BytesIO()
+        with ParallelGzipWriter(buffer, level, workers, block_size=64 * 1024) as writer:
+            for offset in range(0, len(data), chunk_size):
+                writer.write(data[offset:offset + chunk_size])
+        return buffer.getvalue()
+
+    def test_round_trip(self):
+        """Output is one valid gzip member for any worker count"""
+        for workers in (1, 4):
+            compressed = self.compress(self.data, workers)
+            self.assertEqual(gzip.decompress(compressed), self.data)
+
+            # Single member: a raw inflate consumes everything except the 8 byte trailer
+            decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+            self.assertEqual(decompressor.decompress(compressed[10:]), self.data)
+            self.assertEqual(len(decompressor.unused_data), 8)
+
+    def test_empty_and_small_inputs(self):
+        """Empty and sub-block inputs produce valid output"""
+        for data in (b"", b"x", os.urandom(1000)):
+            self.assertEqual(gzip.decompress(self.compress(data, 2)), data)
+
+    def test_compression_ratio(self):
+        """Preset dictionaries keep the ratio close to single-stream gzip"""
+        compressed = self.compress(self.data, 4)
+        self.assertLess(len(compressed), len(gzip.compress(self.data, 6)) * 1.05)
+
+    def test_tell(self):
+        """tell() reports uncompressed bytes written"""
+        writer = ParallelGzipWriter(io.BytesIO(), workers=1)
+        writer.write(b"abc")
+        writer.write(b"de")
+        self.assertEqual(writer.tell(), 5)
+        writer.close()
+
+
+class TestParallelXzWriter(unittest.TestCase):
+    """Test ParallelXzWriter"""
+
+    def compress(self, data, workers, block_size=256 * 1024):
+        buffer = io.BytesIO()
+        with ParallelXzWriter(buffer, 1, workers, block_size=block_size) as writer:
+            for offset in range(0, len(data), 10007):
+                writer.write(data[offset:offset + 10007])
+        return buffer.getvalue()
+
+    def test_round_trip(self):
+        """Output is one multi-block xz stream"""
+        data = b"".join(os.urandom(64) + b"layer" * (i % 500) for i in range(1000))
+        for workers in (1, 3):
+            compressed = self.compress(data, workers)
+            self.assertEqual(lzma.decompress(compressed), data)
+
+            # Single stream: the footer's backward size points at an index listing every block
+            backward_size = (struct.unpack("<I", compressed[-8:-4])[0] + 1) * 4
+            index = compressed[-12 - backward_size:-12]
+            self.assertEqual(index[0], 0)
+            self.assertEqual(index[1], (len(data) + 256 * 1024 - 1) // (256 * 1024))
+
+    def test_empty_input(self):
+        """An empty stream has no blocks"""
+        self.assertEqual(lzma.decompress(self.compress(b"", 2)), b"")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Unit tests for thread-pooled file loading and image decoding in the loaders
+"""
+
+import unittest
+import os
+import sys
+import io
+import tempfile
+import shutil
+import numpy as np
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.image_utils import decode_image_array, decode_image_arrays, array_list_to_batch, batch_image_arrays
+from utils.enums import ImageBatchMode
+from nodes.directory_loader_node import DirectoryLoader
+from nodes.deb_loader_node import DebLoader
+
+
+def to_numpy(value):
+    """Return a numpy view of a torch tensor or numpy array"""
+    return value.numpy() if hasattr(value, 'numpy') else value
+
+
+def png_bytes(color, mode='RGB', size=(8, 6)):
+    buffer = io.BytesIO()
+    Image.new(mode, size, color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestImageDecoding(unittest.TestCase):
+    """Test decode_image_arrays and array_list_to_batch"""
+
+    def test_decode_keeps_order(self):
+        contents = [png_bytes((i * 20, 0, 0)) for i in range(10)] + [b"not an image", png_bytes(128, mode='L')]
+        arrays = decode_image_arrays(contents, workers=4)
+
+        self.assertEqual(len(arrays), len(contents))
+        for i in range(10):
+            self.assertEqual(arrays[i].shape, (6, 8, 3))
+            self.assertEqual(arrays[i][0, 0, 0], i * 20)
+        self.assertIsNone(arrays[10])
+        self.assertEqual(arrays[11][0, 0].tolist(), [128, 128, 128])
+
+    def test_batch_is_filled_in_parallel(self):
+        arrays = [decode_image_array(png_bytes((i, 255, 0))) for i in range(7)]
+        batch = to_numpy(array_list_to_batch(arrays, workers=3))
+
+        self.assertEqual(batch.shape, (7, 6, 8, 3))
+        self.assertEqual(batch.dtype, np.float32)
+        expected = np.stack(arrays).astype(np.float32) / 255.0
+        np.testing.assert_allclose(batch, expected, rtol=1e-6)
+
+    def test_batch_rejects_mixed_sizes(self):
+        arrays = [np.zeros((4, 4, 3), np.uint8), np.zeros((5, 4, 3), np.uint8)]
+        with self.assertRaises(ValueError):
+            array_list_to_batch(arrays)
+
+
+class TestImageBatching(unittest.TestCase):
+    """Test batch_image_arrays groups or pads images of mixed sizes"""
+
+    def setUp(self):
+        sizes = [(8, 6), (4, 4), (8, 6), (16, 2)]
+        self.arrays = [decode_image_array(png_bytes((50 * i + 10, 0, 0), size=size)) for i, size in enumerate(sizes)]
+
+    def test_bucket_by_size(self):
+        batches, masks, order = batch_image_arrays(self.arrays, workers=2)
+
+        self.assertEqual(order, [0, 2, 1, 3])
+        self.assertEqual([tuple(batch.shape) for batch in batches], [(2, 6, 8, 3), (1, 4, 4, 3), (1, 2, 16, 3)])
+        self.assertEqual([tuple(mask.shape) for mask in masks], [(2, 6, 8), (1, 4, 4), (1, 2, 16)])
+        self.assertTrue(all(to_numpy(mask).min() == 1.0 for mask in masks))
+        self.assertAlmostEqual(float(to_numpy(batches[0])[1, 5, 7, 0]), 110 / 255.0, places=6)
+
+    def test_pad_to_largest(self):
+        batches, masks, order = batch_image_arrays(self.arrays, pad=True, fill_value=0.5)
+
+        self.assertEqual(order, [0, 1, 2, 3])
+        self.assertEqual(len(batches), 1)
+        batch, mask = to_numpy(batches[0]), to_numpy(masks[0])
+        self.assertEqual(batch.shape, (4, 6, 16, 3))
+        self.assertEqual(mask.shape, (4, 6, 16))
+
+        # Image pixels are copied to the top-left corner, the rest is padding
+        self.assertEqual(mask[1].sum(), 16)
+        self.assertEqual(mask[3, :2].sum(), 32)
+        self.assertEqual(mask[3, 2:].sum(), 0)
+        self.assertAlmostEqual(float(batch[1, 3, 3, 0]), 60 / 255.0, places=6)
+        self.assertEqual(float(batch[1, 4, 4, 0]), 0.5)
+
+    def test_empty(self):
+        self.assertEqual(batch_image_arrays([]), ([], [], []))
+
+
+class TestLoaderOutputs(unittest.TestCase):
+    """Test the loaders decode on worker threads with ordered outputs"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+
+        self.files = {f"icon{i:02d}.png": png_bytes((i * 10, 0, 255)) for i in range(12)}
+        self.files["readme.txt"] = b"text"
+        for name, content in self.files.items():
+            with open(os.path.join(self.test_dir, name), 'wb') as f:
+                f.write(content)
+
+    def test_directory_loader(self):
+        results = [DirectoryLoader()._execute_impl(self.test_dir, "*", max_workers=workers) for workers in (1, 4)]
+        for binary_data_list, relative_paths, images, image_paths, _, masks in results:
+            self.assertEqual(relative_paths, sorted(self.files))
+            self.assertEqual(binary_data_list, [self.files[name] for name in sorted(self.files)])
+            self.assertEqual(image_paths, sorted(name for name in self.files if name.endswith(".png")))
+            self.assertEqual([to_numpy(batch).shape for batch in images], [(12, 6, 8, 3)])
+            self.assertEqual([to_numpy(mask).shape for mask in masks], [(12, 6, 8)])
+        np.testing.assert_array_equal(to_numpy(results[0][2][0]), to_numpy(results[1][2][0]))
+        self.assertAlmostEqual(float(to_numpy(results[1][2][0])[3, 0, 0, 0]), 30 / 255.0, places=6)
+
+    def test_directory_loader_mixed_sizes(self):
+        with open(os.path.join(self.test_dir, "large.png"), 'wb') as f:
+            f.write(png_bytes((0, 0, 0), size=(16, 16)))
+
+        _, _, images, image_paths, _, masks = DirectoryLoader()._execute_impl(self.test_dir, "*.png")
+        self.assertEqual([to_numpy(batch).shape for batch in images], [(12, 6, 8, 3), (1, 16, 16, 3)])
+        self.assertEqual(image_paths[-1], "large.png")
+
+        _, _, images, image_paths, _, masks = DirectoryLoader()._execute_impl(self.test_dir, "*.png",
+                                                                             batch_mode=ImageBatchMode.PAD)
+        self.assertEqual([to_numpy(batch).shape for batch in images], [(13, 16, 16, 3)])
+        self.assertEqual(image_paths, sorted(name for name in os.listdir(self.test_dir) if name.endswith(".png")))
+        self.assertEqual(to_numpy(masks[0])[1].sum(), 6 * 8)
+
+    def test_deb_loader_outputs(self):
+        entries = [("icons.deb", f"usr/share/{name}", content) for name, content in sorted(self.files.items())]
+        outputs = DebLoader()._build_outputs(entries, [], [], 0.0, 0.0, decode_workers=4)
+
+        self.assertEqual(outputs[1], [path for _, path, _ in entries])
+        self.assertEqual(outputs[3], [path for _, path, _ in entries if path.endswith(".png")])
+        self.assertEqual(len(outputs[2]), 1)
+        images = to_numpy(outputs[2][0])
+        self.assertEqual(images.shape, (12, 6, 8, 3))
+        self.assertAlmostEqual(float(images[11, 0, 0, 0]), 110 / 255.0, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Unit tests for parallel DCI preview rendering
+"""
+
+import unittest
+import os
+import sys
+import time
+import threading
+from unittest import mock
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from dci_format import DCIIconBuilder
+from nodes.preview_node import DCIPreviewNode
+from utils.enums import PreviewBackground, PreviewMode
+
+
+class TestParallelPreview(unittest.TestCase):
+    """Test worker pool helpers of DCIPreviewNode"""
+
+    def setUp(self):
+        self.node = DCIPreviewNode()
+
+    def test_resolve_worker_count(self):
+        """0 means one worker per core, always capped by the task count"""
+        self.assertEqual(self.node._resolve_worker_count(4, 2), 2)
+        self.assertEqual(self.node._resolve_worker_count(1, 10), 1)
+        self.assertEqual(self.node._resolve_worker_count(0, 1), 1)
+        self.assertEqual(self.node._resolve_worker_count(0, 1000), min(os.cpu_count() or 1, 1000))
+
+    def test_map_ordered_keeps_input_order(self):
+        """Results keep input order even when later tasks finish first"""
+        def work(item):
+            time.sleep(0.01 * (5 - item))
+            return item * 2
+
+        items = list(range(6))
+        self.assertEqual(self.node._map_ordered(work, items, 6), [item * 2 for item in items])
+        self.assertEqual(self.node._map_ordered(work, items, 1), [item * 2 for item in items])
+
+    def test_invalid_items_report_errors(self):
+        """Invalid entries and failed renders produce error previews in input order"""
+        builder = DCIIconBuilder()
+        builder.add_icon_image(Image.new('RGBA', (16, 16), (255, 0, 0, 255)), 16, 'normal', 'light', 1, 'png')
+        data = builder.to_binary()
+
+        # Output encoding needs torch, which the test environment may not have
+        with mock.patch.object(self.node, '_create_preview_with_special_background',
+                               side_effect=RuntimeError("render failed")), \
+                mock.patch('nodes.preview_node._image_support', True), \
+                mock.patch('nodes.preview_node.pil_to_comfyui_format', create=True, return_value={}), \
+                mock.patch('nodes.preview_node.pil_list_to_batch', create=True, return_value=(None, None)) as to_batch:
+            output = self.node._execute_impl([b'', "not bytes", data], PreviewBackground.LIGHT_GRAY,
+                                             PreviewBackground.DARK_GRAY, 12, PreviewMode.GRID, 1024, 64, 4,
+                                             max_workers=2)
+
+        texts = output["ui"]["text"]
+        self.assertEqual(len(texts), 3)
+        self.assertIn("第1个DCI二进制数据为空", texts[0])
+        self.assertIn("第2个DCI数据类型不正确", texts[1])
+        self.assertIn("处理第3个DCI文件时发生异常: render failed", texts[2])
+        # Every entry is represented by an error preview image
+        self.assertEqual(len(to_batch.call_args[0][0]), 3)
+
+    def test_single_dci_renders_tones_concurrently(self):
+        """The Light and Dark halves of one DCI render on two threads at the same time"""
+        builder = DCIIconBuilder()
+        image = Image.new('RGBA', (16, 16), (255, 0, 0, 255))
+        builder.add_icon_image(image, 16, 'normal', 'light', 1, 'png')
+        builder.add_icon_image(image, 16, 'normal', 'dark', 1, 'png')
+        data = builder.to_binary()
+
+        for preview_mode, method in ((PreviewMode.GRID, '_create_preview_with_special_background'),
+                                     (PreviewMode.PAGED, '_apply_special_background')):
+            # Each half waits for the other, which only returns if both run concurrently
+            barrier = threading.Barrier(2, timeout=5)
+            original = getattr(self.node, method)
+
+            def render(*args, **kwargs):
+                barrier.wait()
+                return original(*args, **kwargs)
+
+            # Output encoding needs torch, which the test environment may not have
+            with mock.patch.object(self.node, method, side_effect=render), \
+                    mock.patch('nodes.preview_node._image_support', True), \
+                    mock.patch('nodes.preview_node.pil_to_comfyui_format', create=True, return_value={}), \
+                    mock.patch('nodes.preview_node.pil_list_to_batch', create=True, return_value=(None, None)):
+                output = self.node._execute_impl(data, PreviewBackground.LIGHT_GRAY, PreviewBackground.DARK_GRAY, 12,
+                                                 preview_mode, 1024, 64, 4, max_workers=2)
+            self.assertEqual(len(output["ui"]["text"]), 1)
+            self.assertNotIn("❌", output["ui"]["text"][0], preview_mode)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -245,10 +245,11 @@ class TestPurePythonAR(unittest.TestCase):
             package_description="Test DCI package for pure Python implementation"
         )
 
-        deb_path, file_list = result
+        deb_path, file_list, _ = result
         self.assertTrue(os.path.exists(deb_path), "DEB package should be created")
         self.assertNotIn("错误", deb_path, "DEB package creation should not have errors")
-        self.assertEqual(len(file_list), 3, "Should package 3 files")
+        data_files = [path for path in file_list if path not in ("./control", "./md5sums")]
+        self.assertEqual(len(data_files), 3, "Should package 3 files")
 
         # Load DEB package
         loader = DebLoader()
@@ -257,7 +258,7 @@ class TestPurePythonAR(unittest.TestCase):
             file_filter="*.dci"
         )
 
-        binary_data_list, relative_paths, image_list, image_relative_paths = load_result
+        binary_data_list, relative_paths, image_list, image_relative_paths = load_result[:4]
 
         self.assertEqual(len(binary_data_list), 3, "Should load 3 files")
         self.assertEqual(len(relative_paths), 3, "Should have 3 relative paths")
@@ -54,7 +54,7 @@ def test_pure_python_ar_implementation():
             package_description="Test DCI package for pure Python implementation"
         )
 
-        deb_path, file_list = result
+        deb_path, file_list, _ = result
         print(f"Deb包创建结果: {deb_path}")
         print(f"包含文件数量: {len(file_list)}")
 
@@ -73,7 +73,7 @@ def test_pure_python_ar_implementation():
             file_filter="*.dci"
         )
 
-        binary_data_list, relative_paths, image_list, image_relative_paths = load_result
+        binary_data_list, relative_paths, image_list, image_relative_paths = load_result[:4]
 
         print(f"解析结果:")
         print(f"  二进制数据: {len(binary_data_list)} 个文件")
@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the streaming DebPackager build
+"""
+
+import unittest
+import os
+import sys
+import io
+import gzip
+import hashlib
+import tarfile
+import tempfile
+import threading
+import shutil
+import contextlib
+from unittest import mock
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from nodes import deb_packager_node
+from nodes.deb_packager_node import DebPackager
+from nodes.deb_loader_node import DebLoader
+from utils.tar_index import clear_tar_index_cache
+from utils.enums import DebCompression, DedupMode
+
+
+def read_ar_members(deb_path):
+    """Read all members of an ar archive into a dict"""
+    members = {}
+    with open(deb_path, 'rb') as f:
+        assert f.read(8) == b"!<arch>\n"
+        while True:
+            header = f.read(60)
+            if len(header) < 60:
+                break
+            name = header[0:16].decode('ascii').strip().rstrip('/')
+            size = int(header[48:58].decode('ascii').strip())
+            members[name] = f.read(size)
+            if size % 2 == 1:
+                f.read(1)
+    return members
+
+
+class TestStreamingDebPackager(unittest.TestCase):
+    """Test DebPackager._create_deb_package"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.test_dir)
+
+        self.source_dir = os.path.join(self.test_dir, "icons")
+        self.output_dir = os.path.join(self.test_dir, "output")
+        os.makedirs(os.path.join(self.source_dir, "actions"))
+        os.makedirs(self.output_dir)
+
+        self.contents = {
+            "actions/edit.dci": os.urandom(70001),
+            "home.dci": b"home icon",
+        }
+        for relative_path, content in self.contents.items():
+            with open(os.path.join(self.source_dir, relative_path), 'wb') as f:
+                f.write(content)
+
+        with open(os.path.join(self.source_dir, "notes.txt"), 'w') as f:
+            f.write("ignored")
+
+    def build(self, **kwargs):
+        packager = DebPackager()
+        result = packager._execute_impl(self.source_dir, "*.dci", True, "/usr/share/dsg/icons", self.output_dir,
+                                        package_name="test-icons", package_version="1.2.3", **kwargs)
+        return result
+
+    def test_package_contents(self):
+        """Data, md5sums and control members are consistent with the sources"""
+        deb_path, file_list, _ = self.build(file_permissions="640")
+
+        self.assertEqual(os.path.basename(deb_path), "test-icons_1.2.3_all.deb")
+        self.assertEqual(file_list, ["./control", "./md5sums",
+                                     "/usr/share/dsg/icons/actions/edit.dci", "/usr/share/dsg/icons/home.dci"])
+        self.assertEqual(os.listdir(self.output_dir), ["test-icons_1.2.3_all.deb"])
+
+        members = read_ar_members(deb_path)
+        self.assertEqual(list(members), ["debian-binary", "control.tar.gz", "data.tar.gz"])
+        self.assertEqual(members["debian-binary"], b"2.0\n")
+
+        with tarfile.open(fileobj=io.BytesIO(members["control.tar.gz"]), mode='r:gz') as tar:
+            control = tar.extractfile('./control').read().decode('utf-8')
+            md5sums = tar.extractfile('./md5sums').read().decode('utf-8')
+        self.assertIn("Package: test-icons\n", control)
+        self.assertIn("Version: 1.2.3\n", control)
+
+        expected_md5sums = sorted(
+            f"{hashlib.md5(content).hexdigest()}  usr/share/dsg/icons/{relative_path}"
+            for relative_path, content in self.contents.items()
+        )
+        self.assertEqual(md5sums.splitlines(), expected_md5sums)
+
+        with tarfile.open(fileobj=io.BytesIO(members["data.tar.gz"]), mode='r:gz') as tar:
+            names = tar.getnames()
+            self.assertIn("./usr/share/dsg/icons/actions", names)
+            for relative_path, content in self.contents.items():
+                member = tar.getmember(f"./usr/share/dsg/icons/{relative_path}")
+                self.assertEqual(member.mode, 0o640)
+                self.assertEqual(tar.extractfile(member).read(), content)
+
+    def test_no_staging_copy(self):
+        """Source files are not copied to a staging tree"""
+        with mock.patch('shutil.copy2', side_effect=AssertionError("staging copy")):
+            deb_path, _, _ = self.build()
+        self.assertTrue(os.path.exists(deb_path))
+
+    def test_symlinks(self):
+        """Symlinks from the CSV mapping are added to data.tar"""
+        csv_path = os.path.join(self.test_dir, "links.csv")
+        with open(csv_path, 'w') as f:
+            f.write("home,go-home\n")
+
+        deb_path, file_list, _ = self.build(symlink_csv_path=csv_path)
+        self.assertIn("/usr/share/dsg/icons/go-home.dci", file_list)
+
+        members = read_ar_members(deb_path)
+        with tarfile.open(fileobj=io.BytesIO(members["data.tar.gz"]), mode='r:gz') as tar:
+            member = tar.getmember("./usr/share/dsg/icons/go-home.dci")
+            self.assertTrue(member.issym())
+            self.assertEqual(member.linkname, "home.dci")
+
+    def test_symlinked_sources(self):
+        """Symlinked source files are packaged as regular files with their target's content"""
+        os.symlink("actions/edit.dci", os.path.join(self.source_dir, "linked.dci"))
+        os.makedirs(os.path.join(self.source_dir, "sub"))
+        os.symlink(os.path.join(self.source_dir, "actions", "edit.dci"), os.path.join(self.source_dir, "sub", "absolute.dci"))
+        expected = dict(self.contents, **{"linked.dci": self.contents["actions/edit.dci"],
+                                          "sub/absolute.dci": self.contents["actions/edit.dci"]})
+
+        # Prefetched and streamed files, and the incremental build
+        for prefetch_limit, incremental_build in ((deb_packager_node.PREFETCH_FILE_LIMIT, False), (0, False),
+                                                  (deb_packager_node.PREFETCH_FILE_LIMIT, True)):
+            with self.subTest(prefetch_limit=prefetch_limit, incremental_build=incremental_build), \
+                    mock.patch.object(deb_packager_node, 'PREFETCH_FILE_LIMIT', prefetch_limit):
+                deb_path, _, _ = self.build(incremental_build=incremental_build)
+
+                members = read_ar_members(deb_path)
+                with tarfile.open(fileobj=io.BytesIO(members["control.tar.gz"]), mode='r:gz') as tar:
+                    md5sums = tar.extractfile('./md5sums').read().decode('utf-8').splitlines()
+                self.assertEqual(md5sums, sorted(f"{hashlib.md5(content).hexdigest()}  usr/share/dsg/icons/{path}"
+                                                 for path, content in expected.items()))
+
+                with tarfile.open(fileobj=io.BytesIO(members["data.tar.gz"]), mode='r:gz') as tar:
+                    files = {member.name: member for member in tar.getmembers() if not member.isdir()}
+                    self.assertEqual(sorted(files), sorted(f"./usr/share/dsg/icons/{path}" for path in expected))
+                    for path, content in expected.items():
+                        member = files[f"./usr/share/dsg/icons/{path}"]
+                        self.assertTrue(member.isfile(), path)
+                        self.assertEqual((member.uname, member.uid), ("root", 0))
+                        self.assertEqual(tar.extractfile(member).read(), content)
+
+    def test_data_compression_choices(self):
+        """gzip, xz and uncompressed data members hold the same files"""
+        for compression, member_name, mode in ((DebCompression.GZIP, "data.tar.gz", "r:gz"),
+                                               (DebCompression.XZ, "data.tar.xz", "r:xz"),
+                                               (DebCompression.NONE, "data.tar", "r:")):
+            deb_path, _, build_summary = self.build(data_compression=compression, compression_workers=2)
+
+            members = read_ar_members(deb_path)
+            self.assertEqual(list(members), ["debian-binary", "control.tar.gz", member_name])
+            self.assertIn(member_name, build_summary)
+            self.assertIn(str(os.path.getsize(deb_path)), build_summary)
+
+            with tarfile.open(fileobj=io.BytesIO(members[member_name]), mode=mode) as tar:
+                member = tar.getmember("./usr/share/dsg/icons/actions/edit.dci")
+                self.assertEqual(tar.extractfile(member).read(), self.contents["actions/edit.dci"])
+
+    def test_parse_base_deb_reads_control_only(self):
+        """The base package is parsed from control.tar without reading data.tar"""
+        deb_path, _, _ = self.build()
+        members = read_ar_members(deb_path)
+
+        base_path = os.path.join(self.test_dir, "base.deb")
+        with open(base_path, 'wb') as f:
+            f.write(b"!<arch>\n")
+            for name, content in (("debian-binary", members["debian-binary"]),
+                                  ("control.tar.gz", members["control.tar.gz"]),
+                                  ("data.tar.gz", b"not a tarball")):
+                f.write(f"{name + '/':<16}{0:<12}{0:<6}{0:<6}{100644:<8}{len(content):<10}`\n".encode('ascii') + content)
+                if len(content) % 2:
+                    f.write(b"\n")
+
+        control_info, _ = DebPackager()._parse_base_deb(base_path)
+        self.assertEqual(control_info["Package"], "test-icons")
+        self.assertEqual(control_info["Version"], "1.2.3")
+
+    def test_sha256_manifest(self):
+        """Files are hashed on worker threads and an optional sha256 manifest is written next to the package"""
+        hash_threads = set()
+
+        def read_and_hash(*args):
+            hash_threads.add(threading.current_thread())
+            return real_read_and_hash(*args)
+
+        real_read_and_hash = deb_packager_node._read_and_hash
+        expected = sorted(
+            f"{hashlib.sha256(content).hexdigest()}  usr/share/dsg/icons/{relative_path}"
+            for relative_path, content in self.contents.items()
+        )
+        for incremental_build in (False, True):
+            with self.subTest(incremental_build=incremental_build):
+                with mock.patch.object(deb_packager_node, '_read_and_hash', side_effect=read_and_hash):
+                    deb_path, _, build_summary = self.build(sha256_manifest=True, incremental_build=incremental_build)
+
+                manifest_path = os.path.join(self.output_dir, "test-icons_1.2.3_all.sha256sums")
+                self.assertIn("test-icons_1.2.3_all.sha256sums", build_summary)
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    self.assertEqual(f.read().splitlines(), expected)
+
+        self.assertTrue(hash_threads)
+        self.assertNotIn(threading.main_thread(), hash_threads)
+
+    def test_incremental_rebuild(self):
+        """Incremental builds only recompress changed files"""
+        _, _, build_summary = self.build(incremental_build=True)
+        self.assertIn("复用 0/2", build_summary)
+
+        with mock.patch('gzip.compress', wraps=gzip.compress) as compress:
+            _, _, build_summary = self.build(incremental_build=True)
+        self.assertIn("复用 2/2", build_summary)
+        self.assertEqual(compress.call_count, 2)  # directories and trailer only
+
+        self.contents["home.dci"] = b"new home icon"
+        with open(os.path.join(self.source_dir, "home.dci"), 'wb') as f:
+            f.write(self.contents["home.dci"])
+        deb_path, _, build_summary = self.build(incremental_build=True)
+        self.assertIn("复用 1/2", build_summary)
+
+        members = read_ar_members(deb_path)
+        with tarfile.open(fileobj=io.BytesIO(members["control.tar.gz"]), mode='r:gz') as tar:
+            md5sums = tar.extractfile('./md5sums').read().decode('utf-8')
+        self.assertEqual(md5sums.splitlines(), sorted(
+            f"{hashlib.md5(content).hexdigest()}  usr/share/dsg/icons/{relative_path}"
+            for relative_path, content in self.contents.items()
+        ))
+
+        data = members["data.tar.gz"]
+        self.assertGreater(data.count(b"\x1f\x8b\x08"), 3)  # one gzip member per segment
+        with tarfile.open(fileobj=io.BytesIO(data), mode='r:gz') as tar:
+            for relative_path, content in self.contents.items():
+                member = tar.getmember(f"./usr/share/dsg/icons/{relative_path}")
+                self.assertEqual(tar.extractfile(member).read(), content)
+
+        # The segment of the replaced file is pruned from the cache
+        segment_dir = os.path.join(self.output_dir, ".dci_build_cache", "test-icons", "segments")
+        segments = [name for _, _, names in os.walk(segment_dir) for name in names]
+        self.assertEqual(len(segments), 2)
+
+        # A touched file keeps its content but gets a header with the new mtime
+        home_path = os.path.join(self.source_dir, "home.dci")
+        os.utime(home_path, (1700000000, 1700000000))
+        deb_path, _, build_summary = self.build(incremental_build=True)
+        self.assertIn("复用 1/2", build_summary)
+        with tarfile.open(fileobj=io.BytesIO(read_ar_members(deb_path)["data.tar.gz"]), mode='r:gz') as tar:
+            member = tar.getmember("./usr/share/dsg/icons/home.dci")
+            self.assertEqual(member.mtime, 1700000000)
+            self.assertEqual(tar.extractfile(member).read(), self.contents["home.dci"])
+
+
+    def test_deduplicate_files(self):
+        """Identical files are stored once and linked to the first copy"""
+        for relative_path in ("copy.dci", "actions/other.dci"):
+            self.contents[relative_path] = self.contents["actions/edit.dci"]
+            with open(os.path.join(self.source_dir, relative_path), 'wb') as f:
+                f.write(self.contents[relative_path])
+
+        for dedup_mode, incremental_build in ((DedupMode.HARDLINK, False), (DedupMode.HARDLINK, True),
+                                              (DedupMode.SYMLINK, False), (DedupMode.SYMLINK, True)):
+            with self.subTest(dedup_mode=dedup_mode, incremental_build=incremental_build):
+                deb_path, _, build_summary = self.build(dedup_mode=dedup_mode, incremental_build=incremental_build)
+                self.assertIn(f"去重({dedup_mode.value}): 2 个文件", build_summary)
+
+                members = read_ar_members(deb_path)
+                with tarfile.open(fileobj=io.BytesIO(members["control.tar.gz"]), mode='r:gz') as tar:
+                    md5sums = tar.extractfile('./md5sums').read().decode('utf-8').splitlines()
+                expected_paths = self.contents if dedup_mode == DedupMode.HARDLINK else ("actions/edit.dci", "home.dci")
+                self.assertEqual(md5sums, sorted(
+                    f"{hashlib.md5(self.contents[relative_path]).hexdigest()}  usr/share/dsg/icons/{relative_path}"
+                    for relative_path in expected_paths
+                ))
+
+                with tarfile.open(fileobj=io.BytesIO(members["data.tar.gz"]), mode='r:gz') as tar:
+                    self.assertTrue(tar.getmember("./usr/share/dsg/icons/actions/edit.dci").isfile())
+                    copy = tar.getmember("./usr/share/dsg/icons/copy.dci")
+                    nested_copy = tar.getmember("./usr/share/dsg/icons/actions/other.dci")
+                    if dedup_mode == DedupMode.HARDLINK:
+                        self.assertTrue(copy.islnk())
+                        self.assertEqual(copy.linkname, "./usr/share/dsg/icons/actions/edit.dci")
+                        self.assertEqual(tar.extractfile(copy).read(), self.contents["copy.dci"])
+                    else:
+                        self.assertTrue(copy.issym())
+                        self.assertEqual(copy.linkname, "actions/edit.dci")
+                        self.assertEqual(nested_copy.linkname, "edit.dci")
+
+    def test_hardlinks_load_back(self):
+        """Every file of a package deduplicated with hardlinks comes back from DebLoader"""
+        for relative_path in ("copy.dci", "actions/other.dci"):
+            self.contents[relative_path] = self.contents["actions/edit.dci"]
+            with open(os.path.join(self.source_dir, relative_path), 'wb') as f:
+                f.write(self.contents[relative_path])
+        deb_path, _, _ = self.build(dedup_mode=DedupMode.HARDLINK)
+        expected = {f"usr/share/dsg/icons/{relative_path}": content for relative_path, content in self.contents.items()}
+
+        clear_tar_index_cache()
+        self.addCleanup(clear_tar_index_cache)
+        loader = DebLoader()
+        with contextlib.redirect_stdout(io.StringIO()):
+            # Streamed while the index is built, then read through the cached index
+            results = [loader._execute_impl(deb_path, "*.dci", skip_symlinks) for skip_symlinks in (True, False)]
+            # The multi-package workers stage files on disk under a memory budget
+            with mock.patch.object(DebLoader, '_get_spill_root', return_value=self.test_dir):
+                results.append(loader._execute_impl(self.output_dir, "*.dci", max_workers=1, memory_budget_mb=64))
+
+        for binary_data_list, relative_paths, _, _, skipped, _, _, _ in results:
+            self.assertEqual(dict(zip(relative_paths, binary_data_list)), expected)
+            self.assertEqual(skipped, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
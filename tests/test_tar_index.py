@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the seekable tar member index
+"""
+
+import unittest
+import os
+import sys
+import io
+import gzip
+import lzma
+import random
+import tarfile
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils.tar_index import (index_tar_stream, tar_compression, get_cached_tar_index, cache_tar_index,
+                             clear_tar_index_cache, INDEX_CACHE_SIZE)
+from utils.parallel_compress import ParallelXzWriter
+
+
+def build_tar(count=40):
+    """Build an uncompressed tarball of files with mixed sizes"""
+    rng = random.Random(7)
+    contents = {}
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w') as tar_file:
+        for i in range(count):
+            size = rng.choice([0, 10, 4000, 60000])
+            content = rng.randbytes(size // 2) + bytes(size - size // 2)
+            name = f"./icons/{i}.dci"
+            contents[name] = content
+            info = tarfile.TarInfo(name)
+            info.size = size
+            tar_file.addfile(info, io.BytesIO(content))
+    return buffer.getvalue(), contents
+
+
+class TestTarIndex(unittest.TestCase):
+    """Test index_tar_stream and TarIndex reads"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.raw, cls.contents = build_tar()
+
+        xz_buffer = io.BytesIO()
+        with ParallelXzWriter(xz_buffer, preset=0, workers=1, block_size=256 * 1024) as writer:
+            writer.write(cls.raw)
+
+        half = len(cls.raw) // 2
+        cls.variants = {
+            "data.tar": cls.raw,
+            "data.tar.gz": gzip.compress(cls.raw),
+            "multi-member.tar.gz": gzip.compress(cls.raw[:half]) + gzip.compress(cls.raw[half:]),
+            "data.tar.xz": lzma.compress(cls.raw),
+            "multi-block.tar.xz": xz_buffer.getvalue(),
+            "multi-stream.tar.xz": lzma.compress(cls.raw[:half]) + b"\x00" * 4 + lzma.compress(cls.raw[half:]),
+        }
+
+    def test_tar_compression(self):
+        self.assertEqual(tar_compression("data.tar.gz"), "gzip")
+        self.assertEqual(tar_compression("data.tar.xz"), "xz")
+        self.assertEqual(tar_compression("data.tar"), "none")
+        self.assertIsNone(tar_compression("data.tar.zst"))
+
+    def test_index_pass_reads_selected_members(self):
+        for name, data in self.variants.items():
+            with self.subTest(name=name):
+                index, entries = index_tar_stream(io.BytesIO(data), name, lambda member: member.name.endswith("1.dci"))
+                self.assertEqual(len(index.members), len(self.contents))
+                for member, content in entries:
+                    expected = self.contents[member.name] if member.name.endswith("1.dci") else None
+                    self.assertEqual(content, expected)
+
+    def test_random_access_reads(self):
+        for name, data in self.variants.items():
+            with self.subTest(name=name):
+                fileobj = io.BytesIO(data)
+                index, _ = index_tar_stream(fileobj, name, span=32 * 1024)
+
+                for member in reversed(index.members):
+                    self.assertEqual(index.read_member(fileobj, member), self.contents[member.name])
+
+                selected = index.members[::3]
+                results = dict((member.name, content) for member, content in index.read_members(fileobj, selected))
+                self.assertEqual(results, {member.name: self.contents[member.name] for member in selected})
+
+    def test_read_entries_resolves_hardlinks(self):
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=io.BytesIO(self.raw)) as source, tarfile.open(fileobj=buffer, mode='w:gz') as tar_file:
+            for member in source.getmembers():
+                tar_file.addfile(member, source.extractfile(member))
+            for name, target in (("./icons/copy.dci", "./icons/2.dci"), ("./icons/other.dci", "./icons/5.dci")):
+                info = tarfile.TarInfo(name)
+                info.type = tarfile.LNKTYPE
+                info.linkname = target
+                tar_file.addfile(info)
+        data = buffer.getvalue()
+
+        def select(member):
+            return member.name in ("./icons/1.dci", "./icons/copy.dci", "./icons/other.dci")
+
+        index, entries = index_tar_stream(io.BytesIO(data), "data.tar.gz", select, span=32 * 1024)
+        # The index keeps the link members as archived
+        self.assertEqual(index.members[-1].size, 0)
+        entries = {member.name: (member.size, content) for member, content in entries}
+        self.assertEqual(entries["./icons/1.dci"], (len(self.contents["./icons/1.dci"]), self.contents["./icons/1.dci"]))
+        # The stream pass has not kept the data of a target that was not selected
+        self.assertEqual(entries["./icons/copy.dci"], (len(self.contents["./icons/2.dci"]), None))
+
+        # Random access reads it
+        results = {member.name: (member.size, content) for member, content in index.read_entries(io.BytesIO(data), select)}
+        self.assertEqual(results["./icons/1.dci"][1], self.contents["./icons/1.dci"])
+        self.assertEqual(results["./icons/2.dci"][1], None)
+        for name, target in (("./icons/copy.dci", "./icons/2.dci"), ("./icons/other.dci", "./icons/5.dci")):
+            self.assertEqual(results[name], (len(self.contents[target]), self.contents[target]))
+
+    def test_checkpoints(self):
+        index, _ = index_tar_stream(io.BytesIO(self.variants["data.tar.gz"]), "data.tar.gz", span=32 * 1024)
+        offsets = [checkpoint[0] for checkpoint in index.checkpoints]
+        self.assertGreater(len(offsets), 2)
+        self.assertEqual(offsets[0], 0)
+        self.assertTrue(all(b - a >= 32 * 1024 for a, b in zip(offsets, offsets[1:])))
+
+        index, _ = index_tar_stream(io.BytesIO(self.variants["multi-block.tar.xz"]), "multi-block.tar.xz")
+        self.assertEqual(len(index.checkpoints), -(-len(self.raw) // (256 * 1024)))
+
+    def test_invalid_xz_index(self):
+        with self.assertRaises(ValueError):
+            index_tar_stream(io.BytesIO(b"not xz data at all, not at all"), "data.tar.xz")
+
+    def test_cache_eviction(self):
+        clear_tar_index_cache()
+        for i in range(INDEX_CACHE_SIZE + 1):
+            cache_tar_index(("pkg.deb", i), object())
+        self.assertIsNone(get_cached_tar_index(("pkg.deb", 0)))
+        self.assertIsNotNone(get_cached_tar_index(("pkg.deb", INDEX_CACHE_SIZE)))
+        clear_tar_index_cache()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Unit tests for reduced-resolution thumbnail decoding
+"""
+
+import unittest
+import os
+import sys
+from io import BytesIO
+from unittest import mock
+from PIL import Image
+
+# Add project path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'py'))
+
+from utils import image_utils
+from utils.image_utils import load_thumbnail, clear_thumbnail_cache
+
+
+def encode_image(size, format):
+    """Encode a solid test image"""
+    buffer = BytesIO()
+    Image.new('RGB', (size, size), (0, 128, 255)).save(buffer, format=format)
+    return buffer.getvalue()
+
+
+class TestThumbnailCache(unittest.TestCase):
+    """Test load_thumbnail"""
+
+    def setUp(self):
+        clear_thumbnail_cache()
+
+    def test_jpeg_draft(self):
+        """JPEG thumbnails are scaled by the decoder"""
+        thumbnail = load_thumbnail(encode_image(1024, 'JPEG'), 100)
+        self.assertEqual(thumbnail.size, (128, 128))
+
+    def test_png_reduce(self):
+        """PNG thumbnails are reduced by an integer factor"""
+        thumbnail = load_thumbnail(encode_image(1024, 'PNG'), 100)
+        self.assertGreaterEqual(thumbnail.width, 100)
+        self.assertLess(thumbnail.width, 200)
+
+    def test_small_images_unchanged(self):
+        """Images already within the target size keep their size"""
+        thumbnail = load_thumbnail(encode_image(64, 'PNG'), 100)
+        self.assertEqual(thumbnail.size, (64, 64))
+
+    def test_cache_hits(self):
+        """The same content and size are decoded once"""
+        content = encode_image(512, 'PNG')
+        first = load_thumbnail(content, 64)
+        self.assertIs(load_thumbnail(bytes(content), 64), first)
+        self.assertIsNot(load_thumbnail(content, 128), first)
+
+    def test_cache_bounded_by_bytes(self):
+        """The least recently used thumbnails are evicted once their pixels exceed the byte budget"""
+        # Every 64x64 RGB thumbnail costs 12 KiB, so 40 KiB holds three of them
+        contents = []
+        for i in range(4):
+            buffer = BytesIO()
+            Image.new('RGB', (64, 64), (i, 0, 0)).save(buffer, format='PNG')
+            contents.append(buffer.getvalue())
+        with mock.patch.object(image_utils, 'THUMBNAIL_CACHE_BYTES', 40 * 1024):
+            first = load_thumbnail(contents[0], 64)
+            thumbnails = [load_thumbnail(content, 64) for content in contents[1:]]
+            self.assertEqual(image_utils._thumbnail_cache_bytes, 3 * 64 * 64 * 3)
+            self.assertIsNot(load_thumbnail(contents[0], 64), first)
+            self.assertIs(load_thumbnail(contents[3], 64), thumbnails[2])
+
+            # A thumbnail larger than the whole budget is returned without being cached
+            large = load_thumbnail(encode_image(128, 'PNG'), 128)
+            self.assertIsNot(load_thumbnail(encode_image(128, 'PNG'), 128), large)
+
+    def test_without_content(self):
+        """An already decoded image is reduced without caching"""
+        image = Image.new('RGBA', (400, 400))
+        self.assertEqual(load_thumbnail(None, 100, image).size, (100, 100))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for block-parallel gzip compression of data.tar streams
+
+Usage:
+    python tools/benchmark_compression.py [directory] [--workers 1,2,4,8] [--level 6]
+
+Without a directory a synthetic tar of DCI-like files is generated in memory.
+"""
+
+import argparse
+import gzip
+import io
+import os
+import sys
+import tarfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'py'))
+
+from utils.parallel_compress import ParallelGzipWriter
+
+
+def build_tar(directory=None, file_count=2000, file_size=48 * 1024):
+    """Build an uncompressed tar from a directory or from synthetic files"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w', format=tarfile.GNU_FORMAT) as tar:
+        if directory:
+            for root, _, files in os.walk(directory):
+                for name in sorted(files):
+                    path = os.path.join(root, name)
+                    tar.add(path, arcname=os.path.relpath(path, directory))
+        else:
+            for i in range(file_count):
+                # Half random, half repetitive, roughly like PNG/WebP layers with headers
+                content = os.urandom(file_size // 2) + (b"DCI\x00layer%05d" % i) * (file_size // 26)
+                info = tarfile.TarInfo(f"icons/icon_{i:05d}.dci")
+                info.size = len(content)
+                tar.addfile(info, io.BytesIO(content))
+    return buffer.getvalue()
+
+
+def measure(data, level, workers):
+    """Return (seconds, compressed size) for one compression run"""
+    output = io.BytesIO()
+    start = time.perf_counter()
+    if workers == 0:
+        output.write(gzip.compress(data, level))
+    else:
+        with ParallelGzipWriter(output, level, workers) as writer:
+            for offset in range(0, len(data), 10240):
+                writer.write(data[offset:offset + 10240])
+    return time.perf_counter() - start, len(output.getvalue())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark block-parallel gzip compression")
+    parser.add_argument("directory", nargs="?", help="directory to pack (default: synthetic data)")
+    parser.add_argument("--workers", default="1,2,4,8", help="comma separated worker counts")
+    parser.add_argument("--level", type=int, default=6, help="compression level 1-9")
+    args = parser.parse_args()
+
+    data = build_tar(args.directory)
+    size_mb = len(data) / (1024 * 1024)
+    print(f"tar size: {size_mb:.1f} MiB, level {args.level}, {os.cpu_count()} CPUs")
+    print(f"{'compressor':<18}{'seconds':>10}{'MiB/s':>10}{'ratio':>10}")
+
+    runs = [("gzip (stdlib)", 0)] + [(f"parallel x{w}", int(w)) for w in args.workers.split(",") if w.strip()]
+    for label, workers in runs:
+        seconds, compressed_size = measure(data, args.level, workers)
+        print(f"{label:<18}{seconds:>10.2f}{size_mb / seconds:>10.1f}{compressed_size / len(data):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()